@@ -0,0 +1,330 @@
+"""Parser of Scopus boolean queries, such as the search strings generated by `sesg`.
+
+Supports quoted phrases, bare words, `AND`, `OR`, `AND NOT`, parentheses, the
+`TITLE-ABS-KEY`, `TITLE-ABS`, `TITLE`, `ABS`, `KEY` and `ALL` fields, and `PUBYEAR`
+comparisons. Adjacent terms are joined with `AND`, as Scopus does.
+
+As on Scopus, `OR` is evaluated first, then `AND`, then `AND NOT`, so
+`a AND b OR c` is read as `a AND (b OR c)`, and `a AND NOT b AND c` as
+`a AND NOT (b AND c)`.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Literal, Union
+
+
+FIELDS: dict[str, frozenset[str]] = {
+    "ALL": frozenset({"title", "abstract", "keywords"}),
+    "TITLE-ABS-KEY": frozenset({"title", "abstract", "keywords"}),
+    "TITLE-ABS": frozenset({"title", "abstract"}),
+    "TITLE": frozenset({"title"}),
+    "ABS": frozenset({"abstract"}),
+    "KEY": frozenset({"keywords"}),
+}
+
+_TOKEN_PATTERN = re.compile(
+    r"""\s*(?:
+        (?P<lparen>\()
+        |(?P<rparen>\))
+        |"(?P<phrase>[^"]*)"
+        |\{(?P<exact>[^}]*)\}
+        |(?P<comparison>[<>=])
+        |(?P<word>[^\s()"{}<>=]+)
+    )""",
+    re.VERBOSE,
+)
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+class QuerySyntaxError(Exception):
+    """The query could not be parsed."""
+
+
+def tokenize_text(text: str) -> list[str]:
+    """Splits a text into normalized words, the same way terms of a query are split.
+
+    Words are lowercased, and a trailing `s` is removed from words longer than 3
+    characters, to loosely match plurals as Scopus does.
+
+    Examples:
+        >>> tokenize_text("Code Smells, in-the-wild")
+        ['code', 'smell', 'in', 'the', 'wild']
+    """
+    return [
+        word[:-1] if len(word) > 3 and word.endswith("s") else word
+        for word in _WORD_PATTERN.findall(text.lower())
+    ]
+
+
+@dataclass(frozen=True)
+class Term:
+    """A word or phrase, matched by documents containing its words in sequence."""
+
+    text: str
+
+    @property
+    def words(self) -> tuple[str, ...]:
+        return tuple(tokenize_text(self.text))
+
+    def to_string(self) -> str:
+        return f'"{self.text}"'
+
+
+@dataclass(frozen=True)
+class And:
+    children: tuple["Query", ...]
+
+    def to_string(self) -> str:
+        return " AND ".join(_to_operand_string(c) for c in self.children)
+
+
+@dataclass(frozen=True)
+class Or:
+    children: tuple["Query", ...]
+
+    def to_string(self) -> str:
+        return " OR ".join(_to_operand_string(c) for c in self.children)
+
+
+@dataclass(frozen=True)
+class AndNot:
+    include: "Query"
+    exclude: "Query"
+
+    def to_string(self) -> str:
+        return (
+            f"{_to_operand_string(self.include)} AND NOT "
+            f"{_to_operand_string(self.exclude)}"
+        )
+
+
+@dataclass(frozen=True)
+class Field:
+    """Restricts the matching of the child query to the given field."""
+
+    name: str
+    child: "Query"
+
+    @property
+    def fields(self) -> frozenset[str]:
+        return FIELDS[self.name]
+
+    def to_string(self) -> str:
+        return f"{self.name}({self.child.to_string()})"
+
+
+@dataclass(frozen=True)
+class PubYear:
+    operator: Literal[">", "<", "="]
+    year: int
+
+    def matches(self, year: int | None) -> bool:
+        # documents with an unknown year are not filtered out
+        if year is None:
+            return True
+
+        if self.operator == ">":
+            return year > self.year
+
+        if self.operator == "<":
+            return year < self.year
+
+        return year == self.year
+
+    def to_string(self) -> str:
+        return f"PUBYEAR {self.operator} {self.year}"
+
+
+Query = Union[Term, And, Or, AndNot, Field, PubYear]
+
+
+def _to_operand_string(query: Query) -> str:
+    if isinstance(query, (And, Or, AndNot)):
+        return f"({query.to_string()})"
+
+    return query.to_string()
+
+
+@dataclass
+class _Token:
+    kind: str
+    value: str
+
+
+def _tokenize_query(query: str) -> list[_Token]:
+    tokens: list[_Token] = []
+    position = 0
+
+    while position < len(query):
+        if query[position:].isspace():
+            break
+
+        match = _TOKEN_PATTERN.match(query, position)
+        if match is None or match.end() == position:
+            raise QuerySyntaxError(f"Unexpected character at position {position}.")
+
+        kind = match.lastgroup
+        assert kind is not None
+
+        value = match.group(kind)
+        if kind == "exact":
+            kind = "phrase"
+
+        tokens.append(_Token(kind, value))
+        position = match.end()
+
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens: list[_Token]) -> None:
+        self.tokens = tokens
+        self.position = 0
+
+    def _peek(self, offset: int = 0) -> _Token | None:
+        if self.position + offset < len(self.tokens):
+            return self.tokens[self.position + offset]
+
+        return None
+
+    def _is_operator(self, token: _Token | None, operator: str) -> bool:
+        return (
+            token is not None
+            and token.kind == "word"
+            and token.value.upper() == operator
+        )
+
+    def _next(self) -> _Token:
+        token = self._peek()
+        if token is None:
+            raise QuerySyntaxError("Unexpected end of query.")
+
+        self.position += 1
+
+        return token
+
+    def parse(self) -> Query:
+        query = self._parse_and_not()
+
+        if self._peek() is not None:
+            raise QuerySyntaxError(f"Unexpected token {self._peek()}.")
+
+        return query
+
+    def _is_and_not(self) -> bool:
+        return self._is_operator(self._peek(), "AND") and self._is_operator(
+            self._peek(1), "NOT"
+        )
+
+    def _parse_and_not(self) -> Query:
+        # Scopus evaluates OR first, then AND, then AND NOT
+        query = self._parse_and()
+
+        while self._is_and_not():
+            self._next()
+            self._next()
+            query = AndNot(query, self._parse_and())
+
+        return query
+
+    def _starts_operand(self, token: _Token | None) -> bool:
+        if token is None or token.kind == "rparen":
+            return False
+
+        return not (self._is_operator(token, "OR") or self._is_operator(token, "AND"))
+
+    def _parse_and(self) -> Query:
+        children = [self._parse_or()]
+
+        while True:
+            if self._is_and_not():
+                break
+
+            if self._is_operator(self._peek(), "AND"):
+                self._next()
+                children.append(self._parse_or())
+
+            elif self._starts_operand(self._peek()):
+                # adjacent terms are joined with AND
+                children.append(self._parse_or())
+
+            else:
+                break
+
+        return children[0] if len(children) == 1 else And(tuple(children))
+
+    def _parse_or(self) -> Query:
+        children = [self._parse_operand()]
+
+        while self._is_operator(self._peek(), "OR"):
+            self._next()
+            children.append(self._parse_operand())
+
+        return children[0] if len(children) == 1 else Or(tuple(children))
+
+    def _parse_parenthesized(self) -> Query:
+        # the opening parenthesis was already consumed
+        query = self._parse_and_not()
+
+        if self._next().kind != "rparen":
+            raise QuerySyntaxError("Unbalanced parentheses.")
+
+        return query
+
+    def _parse_operand(self) -> Query:
+        token = self._next()
+
+        if token.kind == "lparen":
+            return self._parse_parenthesized()
+
+        if token.kind == "phrase":
+            return Term(token.value)
+
+        if token.kind == "word":
+            return self._parse_word(token)
+
+        raise QuerySyntaxError(f"Unexpected token {token}.")
+
+    def _parse_word(self, token: _Token) -> Query:
+        name = token.value.upper()
+        next_token = self._peek()
+
+        if name in ("AND", "OR", "NOT"):
+            raise QuerySyntaxError(f"Unexpected operator {token.value}.")
+
+        if name in FIELDS and next_token is not None and next_token.kind == "lparen":
+            self._next()
+
+            return Field(name, self._parse_parenthesized())
+
+        if (
+            name == "PUBYEAR"
+            and next_token is not None
+            and next_token.kind == "comparison"
+        ):
+            operator = self._next().value
+            year = self._next()
+
+            if not year.value.isdigit():
+                raise QuerySyntaxError("PUBYEAR must be compared to a year.")
+
+            return PubYear(operator, int(year.value))  # type: ignore
+
+        return Term(token.value)
+
+
+def parse_query(query: str) -> Query:
+    """Parses a Scopus boolean query.
+
+    Raises:
+        QuerySyntaxError: If the query is not valid.
+
+    Examples:
+        >>> parse_query('TITLE-ABS-KEY(("code" OR "smell") AND "test") AND PUBYEAR > 2000').to_string()
+        'TITLE-ABS-KEY(("code" OR "smell") AND "test") AND PUBYEAR > 2000'
+        >>> parse_query('"code" AND "smell" OR "test" AND NOT "survey" AND "review"').to_string()
+        '("code" AND ("smell" OR "test")) AND NOT ("survey" AND "review")'
+    """  # noqa: E501
+    return _Parser(_tokenize_query(query)).parse()
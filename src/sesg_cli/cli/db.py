@@ -1,6 +1,20 @@
 import typer
+from rich import print
+from sqlalchemy import select, text
 
-from sesg_cli.database.connection import engine
+from sesg_cli.database.connection import Session, engine
+from sesg_cli.database.models import (
+    ResultsViewRefresh,
+    ScopusDocument,
+    ScopusSearchCursor,
+    SearchStringPerformance,
+)
+from sesg_cli.database.models.association_tables import (
+    PERFORMANCE_STUDIES_VIEWS,
+    PerformanceStudiesNotMigrated,
+    create_performance_studies_views_ddl,
+    get_tables,
+)
 from sesg_cli.database.models.base import Base
 
 
@@ -9,8 +23,15 @@ app = typer.Typer(rich_markup_mode="markdown", help="Create or drop the database
 
 @app.command()
 def create_tables():
-    """Creates the tables on the database."""
-    Base.metadata.create_all(bind=engine)
+    """Creates the tables on the database, along with its views.
+
+    Can be run on an existing database to create the missing tables and views.
+    """
+    try:
+        Base.metadata.create_all(bind=engine, tables=get_tables())
+    except PerformanceStudiesNotMigrated as e:
+        print(f"[red]{e}")
+        raise typer.Abort()
 
 
 @app.command()
@@ -23,4 +44,96 @@ def drop_tables():
     if not confirmed:
         raise typer.Abort()
 
-    Base.metadata.drop_all(bind=engine)
+    Base.metadata.drop_all(bind=engine, tables=get_tables())
+
+
+@app.command()
+def migrate_performance_studies():
+    """Moves the studies found by each string from the association tables to arrays on `search_string_performance`.
+
+    The association tables are replaced by views with the same name and columns, so queries that read from them keep working. Can be run more than once.
+    """  # noqa: E501
+    with engine.begin() as conn:
+        for view, column in PERFORMANCE_STUDIES_VIEWS.items():
+            conn.execute(
+                text(
+                    "ALTER TABLE search_string_performance "
+                    f"ADD COLUMN IF NOT EXISTS {column} integer[] NOT NULL DEFAULT '{{}}'"  # noqa: E501
+                )
+            )
+
+            relkind = conn.execute(
+                text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"),
+                {"name": view},
+            ).scalar_one_or_none()
+
+            if relkind == "r":
+                print(f"Moving [bright_cyan]{view}[/bright_cyan] to arrays...")
+
+                conn.execute(
+                    text(
+                        f"UPDATE search_string_performance ssp SET {column} = agg.ids "
+                        "FROM ("
+                        "SELECT search_string_performance_id, "
+                        "array_agg(study_id ORDER BY study_id) AS ids "
+                        f"FROM {view} GROUP BY search_string_performance_id"
+                        ") agg "
+                        "WHERE ssp.id = agg.search_string_performance_id"
+                    )
+                )
+                conn.execute(text(f"DROP TABLE {view}"))
+
+            conn.execute(
+                text(
+                    f"ALTER TABLE search_string_performance ALTER COLUMN {column} DROP DEFAULT"  # noqa: E501
+                )
+            )
+
+        for index in SearchStringPerformance.__table__.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+        for ddl in create_performance_studies_views_ddl():
+            conn.execute(ddl)
+
+    print("Done.")
+
+
+@app.command()
+def refresh_results_views(
+    force: bool = typer.Option(
+        False,
+        "--force",
+        help="Refresh the views even if the params and performances did not change.",
+    ),
+):
+    """Refreshes the materialized views with the results of each algorithm, if params or performances were added, removed or updated.
+
+    The views are also refreshed by the `sesg results` commands before exporting results.
+    """  # noqa: E501
+    with Session() as session:
+        refreshed = ResultsViewRefresh.refresh_if_stale(session, force=force)
+
+    if refreshed:
+        print("Refreshed the results views.")
+    else:
+        print("The results views are up to date.")
+
+
+@app.command()
+def compact_scopus_pages():
+    """Replaces the pages fetched for the strings that already have a performance by the documents they hold.
+
+    The documents are stored only once per SLR. New searches do it as soon as each performance is saved.
+    """  # noqa: E501
+    with Session() as session:
+        stmt = select(ScopusSearchCursor.search_string_id).where(
+            ScopusSearchCursor.search_string_id.in_(
+                select(SearchStringPerformance.search_string_id)
+            )
+        )
+        search_string_ids = list(session.execute(stmt).scalars())
+
+        ScopusDocument.move_from_pages(search_string_ids, session)
+        session.commit()
+
+    print(f"Compacted the pages of [bright_cyan]{len(search_string_ids)}[/] strings.")
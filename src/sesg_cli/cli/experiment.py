@@ -5,6 +5,7 @@ from typing import Any
 import typer
 from rich import print
 from rich.progress import Progress
+from sqlalchemy import orm
 
 from sesg_cli.config import Config
 from sesg_cli.database.connection import Session
@@ -14,12 +15,43 @@ from sesg_cli.database.models import (
     Params,
     SearchString,
 )
+from sesg_cli.search_string_simplification import (
+    SimplificationStats,
+    simplify_search_string,
+)
 from sesg_cli.topic_extraction_strategies import TopicExtractionStrategy
 
 
 app = typer.Typer(rich_markup_mode="markdown", help="Start an experiment for a SLR.")
 
 
+def _save_search_string(
+    string: str,
+    params: Params,
+    simplify: bool,
+    stats: SimplificationStats,
+    session: orm.Session,
+) -> bool:
+    """Saves the string generated with the params, simplifying it first if asked to.
+
+    Returns whether an equal string already existed, and was reused.
+    """
+    if simplify:
+        simplified_string = simplify_search_string(string)
+        stats.add(string, simplified_string)
+        string = simplified_string
+
+    db_search_string = SearchString.get_or_create_by_string(string, session)
+    reused = db_search_string.id is not None
+
+    db_search_string.params_list.append(params)
+
+    session.add(db_search_string)
+    session.commit()
+
+    return reused
+
+
 @app.command()
 def start(
     slr_name: str = typer.Argument(
@@ -45,11 +77,18 @@ def start(
         "-s",
         help="Which topic extraction strategies to use.",
     ),
+    simplify: bool = typer.Option(
+        True,
+        "--simplify/--no-simplify",
+        help="Remove redundant terms and groups from the generated strings, without changing their results.",  # noqa: E501
+    ),
 ):
     """Starts an experiment and generates search strings.
 
     Will only generate strings using unseen parameters from the config file. If a string was already
     generated for this experiment using a set of parameters for the strategy, will skip it.
+
+    Unless `--no-simplify` is passed, each string is simplified before being saved, so equivalent strings are only searched once.
     """  # noqa: E501
     from sesg.search_string import generate_search_string, set_pub_year_boundaries
     from sesg.similar_words.bert_strategy import BertSimilarWordsGenerator
@@ -115,6 +154,9 @@ def start(
             session=session,
         )
 
+        stats = SimplificationStats()
+        n_existing_strings = 0
+
         with Progress() as progress:
             for strategy in strategies_list:
                 config_params_list = Params.create_with_strategy(
@@ -195,14 +237,23 @@ def start(
                         min_year=slr.min_publication_year,
                     )
 
-                    db_search_string = SearchString.get_or_create_by_string(
+                    n_existing_strings += _save_search_string(
                         string,
-                        session,
+                        params,
+                        simplify=simplify,
+                        stats=stats,
+                        session=session,
                     )
 
-                    db_search_string.params_list.append(params)
+                progress.remove_task(task_id)
 
-                    session.add(db_search_string)
-                    session.commit()
+        if simplify and stats.n_strings > 0:
+            print(
+                f"Simplified [bright_cyan]{stats.n_simplified}[/] of [bright_cyan]{stats.n_strings}[/] strings, "  # noqa: E501
+                f"from [bright_cyan]{stats.n_chars_before}[/] to [bright_cyan]{stats.n_chars_after}[/] characters "  # noqa: E501
+                f"([bright_cyan]{stats.reduction:.1%}[/] shorter)."
+            )
 
-                progress.remove_task(task_id)
+        print(
+            f"[bright_cyan]{n_existing_strings}[/] strings were equal to already existing ones, and were reused."  # noqa: E501
+        )
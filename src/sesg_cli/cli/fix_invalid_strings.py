@@ -1,18 +1,33 @@
 import asyncio
-from functools import wraps
+from functools import partial, wraps
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
 import typer
+from rich import print
 from rich.progress import BarColumn, Progress, TaskProgressColumn, TextColumn
-from sqlalchemy import select
+from sqlalchemy import exists, orm, select
 from sqlalchemy.orm import joinedload
 
 from sesg_cli.config import Config
 from sesg_cli.database.connection import Session
 from sesg_cli.database.models import (
+    SLR,
+    Experiment,
+    Params,
+    ScopusProbe,
     SearchString,
     SearchStringPerformance,
 )
+from sesg_cli.scopus_api_key_scheduler import (
+    NotEnoughQuotaError,
+    ScopusAPIKeyScheduler,
+)
+from sesg_cli.scopus_checkpoint import retry_with_backoff
+
+
+if TYPE_CHECKING:
+    from sesg.scopus import ScopusClient
 
 
 class AsyncTyper(typer.Typer):
@@ -33,6 +48,53 @@ app = AsyncTyper(
 )
 
 
+async def _probe(
+    client: "ScopusClient",
+    search_string: SearchString,
+) -> tuple[SearchString, bool, Optional[int], Optional[Exception]]:
+    """Fetches the first page of the string, returning whether it's valid, its number of results, and the error that stopped the probe, if any."""  # noqa: E501
+    from sesg.scopus import InvalidStringError
+
+    try:
+        # since we only care if the string is invalid
+        # we can just fetch the first page
+        # and if it raises, we know it's invalid
+        first_page, _ = await retry_with_backoff(
+            client.fetch_first_page,
+            search_string.string,
+        )
+
+    except InvalidStringError:
+        return search_string, False, None, None
+
+    except Exception as e:
+        return search_string, False, None, e
+
+    return search_string, True, first_page.n_results, None
+
+
+def _save_probe(
+    search_string: SearchString,
+    is_valid: bool,
+    n_results: Optional[int],
+    session: orm.Session,
+) -> None:
+    if not is_valid:
+        print(f"String with ID {search_string.id} is invalid.")
+
+        if search_string.performance:
+            search_string.performance.n_scopus_results = -1
+            session.add(search_string.performance)
+
+    ScopusProbe.save_probe(
+        search_string_id=search_string.id,
+        is_valid=is_valid,
+        n_results=n_results,
+        session=session,
+    )
+    session.commit()
+
+
 @app.async_command()
 async def fix(
     config_file_path: Path = typer.Option(
@@ -41,9 +103,38 @@ async def fix(
         "-c",
         help="Path to the `config.toml` file.",
     ),
+    experiment_name: Optional[str] = typer.Option(
+        None,
+        "--experiment",
+        help="Only probe the strings of this experiment.",
+    ),
+    slr_name: Optional[str] = typer.Option(
+        None,
+        "--slr",
+        help="Only probe the strings of the experiments of this SLR.",
+    ),
+    max_concurrent: int = typer.Option(
+        10,
+        help="Maximum number of probes running at the same time. The probes are also limited to the requests per second allowed for the API keys.",  # noqa: E501
+    ),
+    reprobe: bool = typer.Option(
+        False,
+        "--reprobe",
+        help="Probe the strings again, even if they were already probed.",
+    ),
+    ignore_quota: bool = typer.Option(
+        False,
+        "--ignore-quota",
+        help="Start the probes even if the API keys do not have enough quota to complete them.",  # noqa: E501
+    ),
 ):
-    """Fixes invalid strings in the database."""
-    from sesg.scopus import InvalidStringError, ScopusClient
+    """Fixes invalid strings in the database.
+
+    Probes every string with no Scopus results, marking the invalid ones. The result of each probe is saved, so strings that were already probed are skipped on the next runs.
+    """  # noqa: E501
+    import aiometer
+    from sesg.scopus import OutOfAPIKeysError
+    from sesg.scopus.client import MAX_REQUESTS_PER_SECOND_PER_API_KEY
 
     config = Config.from_toml(config_file_path)
 
@@ -58,9 +149,44 @@ async def fix(
             .order_by(SearchString.id)
         )
 
-        search_strings = session.execute(stmt).scalars().all()
+        if experiment_name is not None:
+            experiment = Experiment.get_by_name(experiment_name, session)
+            stmt = stmt.where(
+                exists().where(
+                    Params.search_string_id == SearchString.id,
+                    Params.experiment_id == experiment.id,
+                )
+            )
+
+        if slr_name is not None:
+            slr = SLR.get_by_name(slr_name, session)
+            stmt = stmt.where(
+                exists().where(
+                    Params.search_string_id == SearchString.id,
+                    Params.experiment_id == Experiment.id,
+                    Experiment.slr_id == slr.id,
+                )
+            )
+
+        if not reprobe:
+            stmt = stmt.where(
+                ~exists().where(ScopusProbe.search_string_id == SearchString.id)
+            )
+
+        search_strings = session.execute(stmt).unique().scalars().all()
+
+        scheduler = ScopusAPIKeyScheduler.from_keys(config.scopus_api_keys, session)
+
+        # each probe only fetches the first page of the string
+        try:
+            scheduler.check_quota(len(search_strings))
+        except NotEnoughQuotaError as e:
+            print(f"[red]Not enough quota to probe the strings. {e}")
+
+            if not ignore_quota:
+                raise typer.Abort()
 
-        client = ScopusClient(config.scopus_api_keys)
+        client = scheduler.create_client(len(search_strings))
 
         with Progress(
             TextColumn(
@@ -74,24 +200,33 @@ async def fix(
                 total=len(search_strings),
             )
 
-            for search_string in search_strings:
-                try:
-                    pages_iterator = client.search(search_string.string).__aiter__()
-
-                    # since we only care if the string is invalid
-                    # we can just fetch the first page
-                    # and if it raises, we know it's invalid
-                    await pages_iterator.__anext__()
-
-                except InvalidStringError:
-                    print(f"String with ID {search_string.id} is invalid.")
-
-                    if search_string.performance:
-                        search_string.performance.n_scopus_results = -1
-                        session.add(search_string.performance)
-                        session.commit()
-
-                finally:
-                    progress.advance(overall_task)
+            try:
+                # `fetch_first_page` is not throttled by the client,
+                # so the probes are limited to the requests per second of the keys
+                async with aiometer.amap(
+                    partial(_probe, client),
+                    search_strings,
+                    max_at_once=max_concurrent,
+                    max_per_second=len(client.clients_list)
+                    * MAX_REQUESTS_PER_SECOND_PER_API_KEY,
+                ) as probes:
+                    async for search_string, is_valid, n_results, error in probes:
+                        progress.advance(overall_task)
+
+                        if isinstance(error, OutOfAPIKeysError):
+                            print("[red]All API keys are out of quota.")
+                            break
+
+                        # not saved, so the string is probed again on the next run
+                        if error is not None:
+                            print(
+                                f"[red]Could not probe the string with ID {search_string.id}: {error!r}"  # noqa: E501
+                            )
+                            continue
+
+                        _save_probe(search_string, is_valid, n_results, session)
+
+            finally:
+                scheduler.save()
 
             progress.remove_task(overall_task)
@@ -1,18 +1,27 @@
 import typer
 import pandas as pd
 
+from contextlib import ExitStack
 from pathlib import Path
 from rich.progress import Progress
-from typing import NoReturn
+from typing import Iterable, NoReturn
 
-from sesg_cli.database.models import SearchStringPerformance
+from sqlalchemy import Float, Text
+
+from sesg_cli.columnar_export import ColumnarFormat, write_result_set
+from sesg_cli.concurrent_queries import ConcurrentQueries
+from sesg_cli.database.models import ResultsViewRefresh, SearchStringPerformance
 from sesg_cli.database import Session
 from sesg_cli.database.util.results_queries import ResultQuery
 from sesg_cli.database.models import SLR
+from sesg_cli.results_cache import get_cache_key, restore_from_cache, save_to_cache
 
 _AVAILABLE_METRICS = ["start_set_f1_score", "bsb_recall", "sb_recall"]
 _DEFAULT_METRICS = ["start_set_precision", "start_set_recall"]
 _IMPLEMENTED_ALGORITHMS = ["lda", "bt"]
+_STATISTICS_COLUMNS = ('start_set_precision', 'start_set_recall', 'start_set_f1_score',
+                       'bsb_recall', 'sb_recall', 'n_scopus_results')
+_STATISTICS_INDEX = tuple(f'{stat}_{col}' for col in _STATISTICS_COLUMNS for stat in ('mean', 'stdev'))
 
 app = typer.Typer(
     rich_markup_mode="markdown", help="Get experiments' results."
@@ -35,94 +44,251 @@ def verify_metrics_and_algorithms(metrics: list[str] | None, algorithms: list[st
         raise InvalidAlgorithm()
 
 
-def adjust_max_col_width(df: pd.DataFrame, writer: pd.ExcelWriter, sheet_name: str):
-    for column in df:
-        max_col_width = max(df[column].astype(str).map(len).max(), len(column))
-        col_idx = df.columns.get_loc(column)
-        writer.sheets[sheet_name].set_column(col_idx, col_idx, max_col_width)
+class ColumnWidths:
+    """Tracks the length of the longest value of each column, as the rows are written."""
+
+    def __init__(self, header: Iterable):
+        self._widths: list[int] = [len(str(column)) for column in header]
+
+    def update(self, values: Iterable):
+        self._widths = list(map(max, self._widths, map(len, map(str, values))))
+
+    def set_columns(self, worksheet):
+        for col_idx, width in enumerate(self._widths):
+            worksheet.set_column(col_idx, col_idx, width)
+
+
+def create_excel_writer(path: Path, constant_memory: bool = False) -> pd.ExcelWriter:
+    """
+    Creates the Excel writer. In `constant_memory` mode, xlsxwriter flushes each row to disk as soon as
+    the next one starts, so only one row per sheet is held in memory. All the sheets are written row by row,
+    in order, so the workbook is the same in both modes.
+    """
+    return pd.ExcelWriter(path, engine='xlsxwriter',
+                          engine_kwargs={'options': {'constant_memory': constant_memory}})
+
+
+def get_worksheet(excel_writer: pd.ExcelWriter, sheet_name: str):
+    """Gets the sheet, if it was already added to keep the order of the sheets, or adds it."""
+    workbook = excel_writer.book
+
+    return workbook.get_worksheet_by_name(sheet_name) or workbook.add_worksheet(sheet_name)
 
 
-def graph_tab(slr_name: str, excel_writer: pd.ExcelWriter):
+def graph_tab(slr_name: str, excel_writers: list[pd.ExcelWriter]):
     sheet_name = 'graph_info'
 
     with Session() as session:
         slr = SLR.get_by_name(slr_name, session)
         number_of_components, mean_degree = slr.get_graph_statistics()
 
-    data = {'number_of_components': number_of_components,
-            'mean_degree': round(mean_degree, 3)}
+    for excel_writer in excel_writers:
+        worksheet = get_worksheet(excel_writer, sheet_name)
+
+        worksheet.write_row(0, 0, [None, 'values'])
+        worksheet.write_row(1, 0, ['number_of_components', number_of_components])
+        worksheet.write_row(2, 0, ['mean_degree', round(mean_degree, 3)])
+        worksheet.set_column(0, 1, 25)
+
+
+def write_sheet(excel_writers: list[pd.ExcelWriter], sheet_name: str, columns: tuple, data: Iterable) -> None:
+    """
+    Writes the rows to the sheet of each Excel file as they are iterated, with the `name` column first,
+    adjusting the width of each column to its longest value.
+    """
+    order = list(range(len(columns)))
+    if 'name' in columns:
+        order.remove(columns.index('name'))
+        order.insert(0, columns.index('name'))
+
+    worksheets = [get_worksheet(excel_writer, sheet_name) for excel_writer in excel_writers]
+
+    header = [columns[i] for i in order]
+    column_widths = ColumnWidths(header)
+    for excel_writer, worksheet in zip(excel_writers, worksheets):
+        header_format = excel_writer.book.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        worksheet.write_row(0, 0, header, header_format)
+
+    for row_idx, row in enumerate(data, start=1):
+        values = [row[i] for i in order]
+        for worksheet in worksheets:
+            worksheet.write_row(row_idx, 0, values)
+        column_widths.update(values)
+
+    for worksheet in worksheets:
+        column_widths.set_columns(worksheet)
+
+
+def get_statistics(result_query: ResultQuery, session) -> dict[str, dict]:
+    """
+    Computes the mean and standard deviation of the results of each algorithm on the database, ignoring the strings
+    without Scopus results.
 
-    df = pd.DataFrame().from_dict(data, orient='index')
+    Args:
+        result_query: the queries of the SLR.
+        session: A db session.
 
-    df.rename(columns={0: 'values'}, inplace=True)
-    df.to_excel(excel_writer=excel_writer, sheet_name=sheet_name)
-    excel_writer.sheets[sheet_name].set_column(0, 1, 25)
+    Returns: a dict with the following result sets:
+            - stats: the statistics of each algorithm, with all the experiments;
+            - stats_by_experiment: the statistics of each algorithm on each experiment;
 
+    """
+    columns = ('algorithm', 'name', *_STATISTICS_INDEX)
+    types = (Text(), Text(), *[Float()] * len(_STATISTICS_INDEX))
+
+    stats_data = []
+    stats_by_experiment_data = []
+
+    for algorithm, name, *values in session.execute(result_query.get_statistics_query(_STATISTICS_COLUMNS)):
+        values = [round(float(value), 5) if value is not None else None for value in values]
+
+        if name is None:
+            stats_data.append((algorithm, *values))
+        else:
+            stats_by_experiment_data.append((algorithm, name, *values))
+
+    stats_by_experiment_data.sort(key=lambda row: (row[1], row[0]))
+
+    return {
+        'stats': {'columns': (columns[0], *columns[2:]), 'types': (types[0], *types[2:]), 'data': stats_data},
+        'stats_by_experiment': {'columns': columns, 'types': types, 'data': stats_by_experiment_data},
+    }
+
+
+def get_data_version(result_query: ResultQuery, session) -> tuple:
+    """
+    Gets the version of the SLR data the results are made of, which is part of the key the results files are
+    cached with. It is cheap to compute, so it is checked before any results are retrieved.
+
+    Args:
+        result_query: the queries of the SLR.
+        session: A db session.
+
+    Returns: the data version.
+    """
+    return tuple(session.execute(result_query.data_version).one())
+
+
+def save_xlsx(excel_writer: pd.ExcelWriter, results: dict[str, dict], statistics: dict[str, dict], slr: str):
+    save_xlsx_files([excel_writer], [results], statistics, slr)
+
+
+def save_xlsx_files(excel_writers: list[pd.ExcelWriter], results: list[dict[str, dict]], statistics: dict[str, dict],
+                    slr: str):
+    """
+    Saves the sheets of each Excel file, along with the statistics and the graph info.
+
+    A sheet whose results are the same object on more than one Excel file, as the ones of
+    `ResultQuery.derive_all_results`, is written to all of them while its rows are iterated. So, the sheets of every
+    Excel file are added beforehand, to keep their order.
+
+    Args:
+        excel_writers: the writer of each Excel file.
+        results: the sheets of each Excel file.
+        statistics: the statistics, as returned by `get_statistics`.
+        slr: the SLR name.
+    """
+    sheets = []
+    for file_results in results:
+        for key, result in file_results.items():
+            if any(result is other for _, _, other in sheets):
+                continue
+
+            targets = [excel_writer for excel_writer, other_results in zip(excel_writers, results)
+                       if other_results.get(key) is result]
+            sheets.append((key, targets, result))
 
-def save_xlsx(excel_writer: pd.ExcelWriter, results: dict[str, dict], slr: str):
     with Progress() as progress:
         saving_progress = progress.add_task(
-            "[green]Saving...", total=len(results)
+            "[green]Saving...", total=len(sheets)
         )
-        with excel_writer:
-            for i, (key, result) in enumerate(results.items()):
-                df = pd.DataFrame(data=result['data'], columns=result['columns'])
+        with ExitStack() as stack:
+            for excel_writer, file_results in zip(excel_writers, results):
+                stack.enter_context(excel_writer)
 
-                if 'name' in df.columns:
-                    cols = df.columns.tolist()
-                    cols.remove('name')
-                    cols.insert(0, 'name')
-                    df = df[cols]
+                for key in (*file_results, 'stats', 'stats_by_experiment', 'graph_info'):
+                    get_worksheet(excel_writer, key)
 
-                df.to_excel(excel_writer=excel_writer, sheet_name=key, index=False)
-                adjust_max_col_width(df, excel_writer, key)
+            for i, (key, targets, result) in enumerate(sheets):
+                write_sheet(targets, key, result['columns'], result['data'])
 
                 progress.update(
                     saving_progress,
-                    description=f"[green]Saving {i + 1} of {len(results)}",
+                    description=f"[green]Saving {i + 1} of {len(sheets)}",
                     advance=1,
                     refresh=True,
                 )
 
-            overall_results = {key: value for key, value in results.items() if key in _IMPLEMENTED_ALGORITHMS}
-            statistics_tab(overall_results, excel_writer)
-            graph_tab(slr, excel_writer)
+            for excel_writer in excel_writers:
+                statistics_tab(statistics['stats'], excel_writer)
+            stats_by_experiment = statistics['stats_by_experiment']
+            write_sheet(excel_writers, 'stats_by_experiment', stats_by_experiment['columns'],
+                        stats_by_experiment['data'])
+            graph_tab(slr, excel_writers)
 
         progress.remove_task(saving_progress)
 
 
-def statistics_tab(results: dict[str, dict], excel_writer: pd.ExcelWriter) -> NoReturn:
-    root_cols = ['start_set_precision', 'start_set_recall', 'start_set_f1_score',
-                 'bsb_recall', 'sb_recall', 'n_scopus_results']
+def statistics_tab(stats: dict, excel_writer: pd.ExcelWriter) -> NoReturn:
     max_cols_highlight = ['mean_start_set_precision', 'mean_start_set_recall', 'mean_start_set_f1_score',
                           'mean_bsb_recall', 'mean_sb_recall']
+    min_cols_highlight = ['mean_n_scopus_results']
+
+    idx = _STATISTICS_INDEX
 
-    idx = list()
-    for col in root_cols:
-        idx.append(f'mean_{col}')
-        idx.append(f'stdev_{col}')
+    rows = {algorithm: values for algorithm, *values in stats['data']}
 
-    stats_df = pd.DataFrame(columns=_IMPLEMENTED_ALGORITHMS, index=idx)
+    highlighted = {}
+    for col_idx, col in enumerate(idx):
+        values = [row[col_idx] for row in rows.values() if row[col_idx] is not None]
 
-    for key, result in results.items():
-        temp_df = pd.DataFrame(data=result['data'], columns=result['columns'])
-        temp_df = temp_df.drop(temp_df[temp_df["n_scopus_results"] <= 0].index)
+        if values and col in max_cols_highlight:
+            highlighted[col_idx] = max(values)
+        elif values and col in min_cols_highlight:
+            highlighted[col_idx] = min(values)
 
-        for col in root_cols:
-            stats_df.loc[f'mean_{col}', key] = round(temp_df[col].mean(), 5)
-            stats_df.loc[f'stdev_{col}', key] = round(temp_df[col].std(), 5)
+    workbook = excel_writer.book
+    worksheet = get_worksheet(excel_writer, 'stats')
+    highlight_format = workbook.add_format({'bg_color': '#8aeda4'})
 
-    stats_df = stats_df.T
+    column_widths = ColumnWidths(['algorithm', *idx])
+    worksheet.write_row(0, 0, [None, *idx])
 
-    style_stats = stats_df.style \
-        .highlight_max(subset=max_cols_highlight, color='#8aeda4') \
-        .highlight_min(subset=['mean_n_scopus_results'], color='#8aeda4')
+    for row_idx, (algorithm, row) in enumerate(rows.items(), start=1):
+        worksheet.write(row_idx, 0, algorithm)
 
-    stats_df = stats_df.reset_index()
-    stats_df.rename(columns={'index': 'algorithm'}, inplace=True)
+        for col_idx, value in enumerate(row):
+            if col_idx in highlighted and value == highlighted[col_idx]:
+                worksheet.write(row_idx, col_idx + 1, value, highlight_format)
+            else:
+                worksheet.write(row_idx, col_idx + 1, value)
 
-    style_stats.to_excel(excel_writer=excel_writer, sheet_name='stats')
-    adjust_max_col_width(stats_df, excel_writer, 'stats')
+        column_widths.update([algorithm, *row])
+
+    column_widths.set_columns(worksheet)
+
+
+def save_columnar(base_dir: Path, results: dict[str, dict], file_format: ColumnarFormat):
+    with Progress() as progress:
+        saving_progress = progress.add_task(
+            "[green]Saving...", total=len(results)
+        )
+
+        for i, (key, result) in enumerate(results.items()):
+            # the top lists are small, and keep their ranking across experiments in a single file
+            partition_by = 'name' if key in _IMPLEMENTED_ALGORITHMS or key == 'qgs' else None
+
+            write_result_set(base_dir / key, result['columns'], result['types'], result['data'], file_format,
+                             partition_by=partition_by)
+
+            progress.update(
+                saving_progress,
+                description=f"[green]Saving {i + 1} of {len(results)}",
+                advance=1,
+                refresh=True,
+            )
+
+        progress.remove_task(saving_progress)
 
 
 @app.command(help='Creates a Excel file based on the given Path and SLR.')
@@ -144,6 +310,18 @@ def save(
                  f"(outside the defaults: {[f'`{i}`' for i in _DEFAULT_METRICS]})",
             show_default=False
         ),
+        constant_memory: bool = typer.Option(
+            False,
+            "--constant-memory",
+            help="Write each row to disk as soon as the next one starts, keeping the memory usage bounded "
+                 "regardless of the number of results.",
+        ),
+        force: bool = typer.Option(
+            False,
+            "--force",
+            help="Regenerate the Excel file, refreshing the results views, even if the results did not change since it "
+                 "was last saved.",
+        ),
         algorithms: list[str] = typer.Option(
             default=None,
             help=f"Bonus algorithms to generate Excel (outside the defaults: {[f'`{i}`' for i in _IMPLEMENTED_ALGORITHMS]}). "
@@ -158,12 +336,29 @@ def save(
     result_query: ResultQuery = ResultQuery(slr, metrics, algorithms)
     queries = result_query.get_queries()
 
-    with Session() as session:
-        results = SearchStringPerformance.get_results(queries, result_query.check_review, session)
+    output_path = path / f"{slr}.xlsx"
+
+    # the queries run concurrently, and their rows are streamed from the database while they are written
+    with Session() as session, ConcurrentQueries(Session) as concurrent_queries:
+        data_version = get_data_version(result_query, session)
+        cache_key = get_cache_key(data_version=data_version, command='save', slr=slr, metrics=metrics,
+                                  algorithms=algorithms)
+
+        if not force and restore_from_cache(cache_key, output_path):
+            print("The results did not change since they were last saved, reused the cached Excel file.")
+            return
+
+        if ResultsViewRefresh.refresh_if_stale(session, force=force):
+            print("Refreshed the results views with the new performances.")
 
-    excel_writer = pd.ExcelWriter(path / f"{slr}.xlsx", engine='xlsxwriter')
+        results = SearchStringPerformance.get_results(queries, result_query.check_review, session,
+                                                       concurrent_queries=concurrent_queries)
+        results = result_query.derive_results(results)
+        statistics = get_statistics(result_query, session)
 
-    save_xlsx(excel_writer, results, slr)
+        save_xlsx(create_excel_writer(output_path, constant_memory), results, statistics, slr)
+
+    save_to_cache(cache_key, output_path)
 
 
 @app.command(help='Creates a Excel file with the best `top` '
@@ -190,6 +385,18 @@ def save_by_row(
                  f"(outside the defaults: {[f'`{i}`' for i in _DEFAULT_METRICS]})",
             show_default=False
         ),
+        constant_memory: bool = typer.Option(
+            False,
+            "--constant-memory",
+            help="Write each row to disk as soon as the next one starts, keeping the memory usage bounded "
+                 "regardless of the number of results.",
+        ),
+        force: bool = typer.Option(
+            False,
+            "--force",
+            help="Regenerate the Excel file, refreshing the results views, even if the results did not change since it "
+                 "was last saved.",
+        ),
         algorithms: list[str] = typer.Option(
             default=None,
             help=f"Bonus algorithms to generate Excel sheets "
@@ -203,11 +410,167 @@ def save_by_row(
     print("Retrieving information from database...")
 
     result_query: ResultQuery = ResultQuery(slr, metrics, algorithms, top)
-    queries = result_query.get_queries_by_row()
+    queries = result_query.get_queries()
 
-    with Session() as session:
-        results = SearchStringPerformance.get_results(queries, result_query.check_review, session)
+    output_path = path / f"{slr}_top_per_exp.xlsx"
+
+    # the queries run concurrently, and their rows are streamed from the database while they are written
+    with Session() as session, ConcurrentQueries(Session) as concurrent_queries:
+        data_version = get_data_version(result_query, session)
+        cache_key = get_cache_key(data_version=data_version, command='save_by_row', slr=slr, top=top,
+                                  metrics=metrics, algorithms=algorithms)
+
+        if not force and restore_from_cache(cache_key, output_path):
+            print("The results did not change since they were last saved, reused the cached Excel file.")
+            return
+
+        if ResultsViewRefresh.refresh_if_stale(session, force=force):
+            print("Refreshed the results views with the new performances.")
+
+        results = SearchStringPerformance.get_results(queries, result_query.check_review, session,
+                                                       concurrent_queries=concurrent_queries)
+        results = result_query.derive_results_by_row(results)
+        statistics = get_statistics(result_query, session)
+
+        save_xlsx(create_excel_writer(output_path, constant_memory), results, statistics, slr)
+
+    save_to_cache(cache_key, output_path)
+
+
+@app.command(help='Creates both Excel files of `save` and `save-by-row` based on the given Path and SLR, '
+                  'retrieving the results only once.')
+def export_all(
+        path: Path = typer.Argument(
+            ...,
+            help="Path to the **folder** where the results Excel files should be saved.",
+            dir_okay=True,
+            exists=True,
+        ),
+        slr: str = typer.Argument(
+            ...,
+            help="Name of the SLR the results will be extracted."
+        ),
+        top: int = typer.Option(
+            default=10,
+            help="Number of best results per experiment to be retrieved.",
+        ),
+        metrics: list[str] = typer.Option(
+            default=None,
+            help="Bonus metrics to order the results and generate bonus lists. "
+                 f"Available metrics: {[f'`{i}`' for i in _AVAILABLE_METRICS]} "
+                 f"(outside the defaults: {[f'`{i}`' for i in _DEFAULT_METRICS]})",
+            show_default=False
+        ),
+        constant_memory: bool = typer.Option(
+            False,
+            "--constant-memory",
+            help="Write each row to disk as soon as the next one starts, keeping the memory usage bounded "
+                 "regardless of the number of results.",
+        ),
+        force: bool = typer.Option(
+            False,
+            "--force",
+            help="Regenerate the Excel files, refreshing the results views, even if the results did not change since "
+                 "they were last saved.",
+        ),
+        algorithms: list[str] = typer.Option(
+            default=None,
+            help=f"Bonus algorithms to generate Excel sheets "
+                 f"(outside the defaults: {[f'`{i}`' for i in _IMPLEMENTED_ALGORITHMS]}). "
+                 f"Important: a base query for the algorithm need to be previously implemented.",
+            hidden=True
+        )
+):
+    verify_metrics_and_algorithms(metrics, algorithms)
+
+    print("Retrieving information from database...")
+
+    result_query: ResultQuery = ResultQuery(slr, metrics, algorithms, top)
+    queries = result_query.get_queries()
+
+    output_path = path / f"{slr}.xlsx"
+    output_path_by_row = path / f"{slr}_top_per_exp.xlsx"
+
+    # the queries run concurrently, and their rows are streamed from the database while they are written
+    with Session() as session, ConcurrentQueries(Session) as concurrent_queries:
+        # the same cache keys of `save` and `save_by_row`, since the Excel files are the same
+        data_version = get_data_version(result_query, session)
+        cache_key = get_cache_key(data_version=data_version, command='save', slr=slr, metrics=metrics,
+                                  algorithms=algorithms)
+        cache_key_by_row = get_cache_key(data_version=data_version, command='save_by_row', slr=slr, top=top,
+                                         metrics=metrics, algorithms=algorithms)
+
+        if not force and restore_from_cache(cache_key, output_path) and restore_from_cache(cache_key_by_row,
+                                                                                           output_path_by_row):
+            print("The results did not change since they were last saved, reused the cached Excel files.")
+            return
+
+        if ResultsViewRefresh.refresh_if_stale(session, force=force):
+            print("Refreshed the results views with the new performances.")
+
+        results = SearchStringPerformance.get_results(queries, result_query.check_review, session,
+                                                       concurrent_queries=concurrent_queries)
+        results, results_by_row = result_query.derive_all_results(results)
+        statistics = get_statistics(result_query, session)
+
+        save_xlsx_files([create_excel_writer(output_path, constant_memory),
+                         create_excel_writer(output_path_by_row, constant_memory)],
+                        [results, results_by_row], statistics, slr)
+
+    save_to_cache(cache_key, output_path)
+    save_to_cache(cache_key_by_row, output_path_by_row)
+
+
+@app.command(help='Exports the same results of `save` (the results of each algorithm, the top ten lists, '
+                  'the QGS and the stats) as typed Parquet, Arrow or CSV files, partitioned by experiment.')
+def export(
+        path: Path = typer.Argument(
+            ...,
+            help="Path to the **folder** where the results should be saved. "
+                 "Each result set is saved to `{path}/{slr}/{result set}`, and the results of each algorithm "
+                 "and the QGS are partitioned into `name={experiment}` folders.",
+            dir_okay=True,
+            exists=True,
+        ),
+        slr: str = typer.Argument(
+            ...,
+            help="Name of the SLR the results will be extracted."
+        ),
+        file_format: ColumnarFormat = typer.Option(
+            ColumnarFormat.parquet,
+            "--format",
+            "-f",
+            help="Format of the files.",
+        ),
+        metrics: list[str] = typer.Option(
+            default=None,
+            help="Bonus metrics to order the results and generate bonus top 10 lists. "
+                 f"Available metrics: {[f'`{i}`' for i in _AVAILABLE_METRICS]} "
+                 f"(outside the defaults: {[f'`{i}`' for i in _DEFAULT_METRICS]})",
+            show_default=False
+        ),
+        algorithms: list[str] = typer.Option(
+            default=None,
+            help=f"Bonus algorithms to export (outside the defaults: {[f'`{i}`' for i in _IMPLEMENTED_ALGORITHMS]}). "
+                 f"Important: a base query for the algorithm need to be previously implemented.",
+            hidden=True
+        )
+):
+    verify_metrics_and_algorithms(metrics, algorithms)
+
+    print("Retrieving information from database...")
+
+    result_query: ResultQuery = ResultQuery(slr, metrics, algorithms)
+    queries = result_query.get_queries()
+
+    # the queries run concurrently, and their rows are streamed from the database while they are written
+    with Session() as session, ConcurrentQueries(Session) as concurrent_queries:
+        if ResultsViewRefresh.refresh_if_stale(session):
+            print("Refreshed the results views with the new performances.")
 
-    excel_writer = pd.ExcelWriter(path / f"{slr}_top_per_exp.xlsx", engine='xlsxwriter')
+        results = SearchStringPerformance.get_results(queries, result_query.check_review, session,
+                                                       concurrent_queries=concurrent_queries)
+        results = result_query.derive_results(results)
+        results.update(get_statistics(result_query, session))
 
-    save_xlsx(excel_writer, results, slr)
+        save_columnar(path / slr, results, file_format)
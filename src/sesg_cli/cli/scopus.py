@@ -1,16 +1,27 @@
 import asyncio
 from functools import wraps
 from pathlib import Path
+from typing import Optional
 
 import typer
 from rich import print
-from rich.progress import BarColumn, Progress, TaskProgressColumn, TextColumn
 
 from sesg_cli.config import Config
 from sesg_cli.database.connection import Session
 from sesg_cli.database.models import (
+    SLR,
     Experiment,
-    SearchStringPerformance,
+    SearchString,
+    SearchStringEstimate,
+)
+from sesg_cli.performance_writer import PerformanceWriter
+from sesg_cli.scopus_checkpoint import CheckpointedSearch
+from sesg_cli.scopus_search import (
+    EvaluationContext,
+    create_client,
+    create_evaluation_context,
+    create_progress,
+    search_and_evaluate,
 )
 
 
@@ -42,127 +53,383 @@ async def search(
         "-c",
         help="Path to the `config.toml` file.",
     ),
+    ignore_quota: bool = typer.Option(
+        False,
+        "--ignore-quota",
+        help="Start the search even if the API keys do not have enough quota to complete it.",  # noqa: E501
+    ),
+    fast_title_matching: bool = typer.Option(
+        False,
+        "--fast-title-matching",
+        help="Match the Scopus titles to their closest GS title through indexes, memoizing the matches. Faster, but a study may be found where the `sesg` rule (TF-IDF nearest title) would not find it, so the performances are not comparable with the ones found without this option.",  # noqa: E501
+    ),
+    min_estimated_recall: Optional[float] = typer.Option(
+        None,
+        help="Skip the strings whose recall estimated by `sesg scopus estimate` is lower than this. Strings that were not estimated are searched.",  # noqa: E501
+    ),
 ):
     """Searches the strings of the experiment on Scopus."""
-    from sesg.evaluation import EvaluationFactory, Study
-    from sesg.scopus import InvalidStringError, Page, ScopusClient
-
     with Session() as session:
         experiment = Experiment.get_by_name(experiment_name, session)
-        slr = experiment.slr
 
         config = Config.from_toml(config_file_path)
 
         print("Retrieving experiment search strings...")
         search_strings_list = experiment.get_search_strings_without_performance(session)
 
-        evaluation_gs = [
-            Study(
-                id=s.id,
-                title=s.title,
-                references=[Study(id=ref.id, title=ref.title) for ref in s.references],
-            )
-            for s in slr.gs
-        ]
-
-        evaluation_qgs = [
-            Study(
-                id=s.id,
-                title=s.title,
-                references=[Study(id=ref.id, title=ref.title) for ref in s.references],
+        if min_estimated_recall is not None:
+            estimates = SearchStringEstimate.get_by_slr(experiment.slr_id, session)
+            n_strings = len(search_strings_list)
+
+            search_strings_list = [
+                s
+                for s in search_strings_list
+                if s.id not in estimates
+                or estimates[s.id].estimated_recall >= min_estimated_recall
+            ]
+
+            print(
+                f"Skipping {n_strings - len(search_strings_list)} strings with an estimated recall lower than {min_estimated_recall}."  # noqa: E501
             )
-            for s in experiment.qgs
-        ]
 
-        evaluation_factory = EvaluationFactory(
-            gs=evaluation_gs,
-            qgs=evaluation_qgs,
+        context = create_evaluation_context(
+            experiment,
+            session,
+            Session,
+            fast_title_matching=fast_title_matching,
         )
 
-        client = ScopusClient(config.scopus_api_keys)
-
-        with Progress(
-            TextColumn(
-                "[progress.description]{task.description}: {task.completed} of {task.total}"  # noqa: E501
-            ),
-            BarColumn(),
-            TaskProgressColumn(),
-        ) as progress:
-            overall_task = progress.add_task(
-                "Overall",
-                total=len(search_strings_list),
-            )
+        scheduler, client = create_client(
+            config=config,
+            n_strings=len(search_strings_list),
+            ignore_quota=ignore_quota,
+            session=session,
+        )
+        checkpointed_search = CheckpointedSearch(
+            client=client,
+            session=session,
+            session_factory=Session,
+        )
 
-            for search_string in search_strings_list:
-                progress_task = progress.add_task(
-                    "Paginating",
+        try:
+            with create_progress() as progress:
+                overall_task = progress.add_task(
+                    "Overall",
+                    total=len(search_strings_list),
                 )
 
-                results: list[Page.Entry] = []
+                async with PerformanceWriter(session_factory=Session) as writer:
+                    for search_string in search_strings_list:
+                        performance = await search_and_evaluate(
+                            search_string=search_string,
+                            context=context,
+                            checkpointed_search=checkpointed_search,
+                            progress=progress,
+                        )
 
-                try:
-                    async for page in client.search(search_string.string):
-                        progress.update(
-                            progress_task,
-                            total=page.n_pages,
-                            advance=1,
+                        await writer.put(performance)
+
+                        progress.advance(overall_task)
+
+                progress.remove_task(overall_task)
+
+        finally:
+            scheduler.save()
+
+
+@app.async_command()
+async def search_all(
+    config_file_path: Path = typer.Option(
+        Path.cwd() / "config.toml",
+        "--config-file-path",
+        "-c",
+        help="Path to the `config.toml` file.",
+    ),
+    ignore_quota: bool = typer.Option(
+        False,
+        "--ignore-quota",
+        help="Start the search even if the API keys do not have enough quota to complete it.",  # noqa: E501
+    ),
+    fast_title_matching: bool = typer.Option(
+        False,
+        "--fast-title-matching",
+        help="Match the Scopus titles to their closest GS title through indexes, memoizing the matches. Faster, but a study may be found where the `sesg` rule (TF-IDF nearest title) would not find it, so the performances are not comparable with the ones found without this option.",  # noqa: E501
+    ),
+    batch_size: int = typer.Option(
+        100,
+        help="Number of search strings retrieved from the database at a time.",
+    ),
+    poll_interval: Optional[float] = typer.Option(
+        None,
+        help="If set, keeps running after all strings were searched, checking for new strings every `poll_interval` seconds.",  # noqa: E501
+    ),
+):
+    """Searches the strings of every experiment, of every SLR, that were not searched yet.
+
+    A string that belongs to more than one experiment is evaluated using the first experiment it was generated for.
+    """  # noqa: E501
+    with Session() as session:
+        config = Config.from_toml(config_file_path)
+
+        n_pending = SearchString.count_pending(session)
+        print(f"Found {n_pending} search strings to search.")
+
+        scheduler, client = create_client(
+            config=config,
+            n_strings=n_pending,
+            ignore_quota=ignore_quota,
+            session=session,
+        )
+        checkpointed_search = CheckpointedSearch(
+            client=client,
+            session=session,
+            session_factory=Session,
+        )
+
+        contexts: dict[int, EvaluationContext] = {}
+
+        try:
+            with create_progress() as progress:
+                overall_task = progress.add_task("Overall", total=n_pending)
+
+                async with PerformanceWriter(session_factory=Session) as writer:
+                    last_id = 0
+                    while True:
+                        batch = SearchString.get_pending_batch(
+                            session,
+                            after_id=last_id,
+                            limit=batch_size,
                         )
 
-                        results.extend(page.entries)
-
-                    evaluation = evaluation_factory.evaluate([r.title for r in results])
-                    performance = SearchStringPerformance.from_studies_lists(
-                        n_scopus_results=len(results),
-                        qgs_in_scopus=[
-                            slr.get_study_by_id(s.id) for s in evaluation.qgs_in_scopus
-                        ],
-                        gs_in_scopus=[
-                            slr.get_study_by_id(s.id) for s in evaluation.gs_in_scopus
-                        ],
-                        gs_in_bsb=[
-                            slr.get_study_by_id(s.id) for s in evaluation.gs_in_bsb
-                        ],
-                        gs_in_sb=[
-                            slr.get_study_by_id(s.id) for s in evaluation.gs_in_sb
-                        ],
-                        start_set_precision=evaluation.start_set_precision,
-                        start_set_recall=evaluation.start_set_recall,
-                        start_set_f1_score=evaluation.start_set_f1_score,
-                        bsb_recall=evaluation.bsb_recall,
-                        sb_recall=evaluation.sb_recall,
-                        search_string_id=search_string.id,
-                    )
-
-                    session.add(performance)
-                    session.commit()
-
-                except InvalidStringError:
-                    print("The following string raised an InvalidStringError")
-                    print(search_string.string)
-
-                    performance = SearchStringPerformance(
-                        n_scopus_results=-1,
-                        qgs_in_scopus=[],
-                        gs_in_bsb=[],
-                        gs_in_sb=[],
-                        n_gs_in_scopus=0,
-                        n_qgs_in_scopus=0,
-                        gs_in_scopus=[],
-                        n_gs_in_bsb=0,
-                        n_gs_in_sb=0,
-                        start_set_precision=0,
-                        start_set_recall=0,
-                        start_set_f1_score=0,
-                        bsb_recall=0,
-                        sb_recall=0,
-                        search_string_id=search_string.id,
-                    )
-
-                    session.add(performance)
-                    session.commit()
-
-                finally:
-                    progress.remove_task(progress_task)
-                    progress.advance(overall_task)
-
-            progress.remove_task(overall_task)
+                        if not batch:
+                            if poll_interval is None:
+                                break
+
+                            # the strings still being saved would be retrieved again
+                            await writer.flush()
+                            await asyncio.sleep(poll_interval)
+
+                            last_id = 0
+                            progress.update(
+                                overall_task,
+                                total=SearchString.count_pending(session),
+                                completed=0,
+                            )
+                            continue
+
+                        for search_string, experiment_id in batch:
+                            last_id = search_string.id
+
+                            if experiment_id not in contexts:
+                                experiment = Experiment.get_by_id(
+                                    experiment_id, session
+                                )
+                                contexts[experiment_id] = create_evaluation_context(
+                                    experiment,
+                                    session,
+                                    Session,
+                                    fast_title_matching=fast_title_matching,
+                                )
+
+                            performance = await search_and_evaluate(
+                                search_string=search_string,
+                                context=contexts[experiment_id],
+                                checkpointed_search=checkpointed_search,
+                                progress=progress,
+                            )
+
+                            await writer.put(performance)
+
+                            progress.advance(overall_task)
+
+                        scheduler.save()
+
+                progress.remove_task(overall_task)
+
+        finally:
+            scheduler.save()
+
+
+@app.command()
+def estimate(
+    experiment_name: str = typer.Argument(
+        ...,
+        help="Name of the experiment to retrieve the search strings from.",
+    ),
+    include_searched: bool = typer.Option(
+        False,
+        "--include-searched",
+        help="Also estimate the strings that were already searched, to compare the estimates with their performance.",  # noqa: E501
+    ),
+    top: int = typer.Option(
+        20,
+        help="Number of strings to show, ranked by estimated recall.",
+    ),
+):
+    """Estimates the recall of the strings of the experiment, without spending API quota.
+
+    Each string is evaluated against an index of the documents already fetched from Scopus, along with the GS of the SLR. The estimates are saved, and can be used by `sesg scopus search --min-estimated-recall` to skip strings that are unlikely to find the GS.
+    """  # noqa: E501
+    from rich.table import Table
+
+    from sesg_cli.boolean_query import QuerySyntaxError
+    from sesg_cli.search_string_estimation import SearchStringEstimator
+
+    with Session() as session:
+        experiment = Experiment.get_by_name(experiment_name, session)
+
+        if include_searched:
+            search_strings_list = experiment.get_search_strings(session)
+        else:
+            search_strings_list = experiment.get_search_strings_without_performance(
+                session
+            )
+
+        print("Indexing the documents fetched from Scopus and the GS...")
+        estimator = SearchStringEstimator.build(experiment.slr, session)
+        print(f"Indexed {estimator.index.n_documents} documents.")
+
+        estimates: list[SearchStringEstimate] = []
+        strings: dict[int, str] = {}
+
+        with create_progress() as progress:
+            task = progress.add_task("Estimating", total=len(search_strings_list))
+
+            for search_string in search_strings_list:
+                try:
+                    estimates.append(estimator.estimate(search_string))
+                    strings[search_string.id] = search_string.string
+
+                except QuerySyntaxError as e:
+                    print(f"Could not parse string with ID {search_string.id}: {e}")
+
+                progress.advance(task)
+
+            progress.remove_task(task)
+
+        SearchStringEstimate.save_many(estimates, session)
+
+        ranked = sorted(
+            estimates,
+            key=lambda e: (-e.estimated_recall, e.n_estimated_results),
+        )
+
+        table = Table("ID", "Estimated recall", "Estimated results", "String")
+        for e in ranked[:top]:
+            table.add_row(
+                str(e.search_string_id),
+                f"{e.estimated_recall:.3f}",
+                str(e.n_estimated_results),
+                strings[e.search_string_id],
+            )
+
+        print(table)
+
+
+@app.command()
+def mock_server(
+    host: str = typer.Option(
+        "127.0.0.1",
+        help="Host to bind the server to.",
+    ),
+    port: int = typer.Option(
+        8000,
+        help="Port to bind the server to.",
+    ),
+    corpus_file_path: Optional[Path] = typer.Option(
+        None,
+        "--corpus",
+        help="Path to a `.json` file mapping a query to its recorded Scopus entries. If not provided, generates a synthetic corpus.",  # noqa: E501
+        dir_okay=False,
+        file_okay=True,
+        exists=True,
+    ),
+    max_results: int = typer.Option(
+        2000,
+        help="Maximum number of results of a query on the synthetic corpus.",
+    ),
+    slr_name: Optional[str] = typer.Option(
+        None,
+        "--slr",
+        help="Name of a SLR whose GS titles will be included on the results of the synthetic corpus.",  # noqa: E501
+    ),
+    gs_hit_rate: float = typer.Option(
+        0.3,
+        help="Probability of including each GS study on the results of a query on the synthetic corpus.",  # noqa: E501
+    ),
+    latency: float = typer.Option(
+        0.0,
+        help="Seconds to wait before answering each request.",
+    ),
+    page_size: int = typer.Option(
+        25,
+        help="Number of entries per page.",
+    ),
+    quota_per_key: Optional[int] = typer.Option(
+        None,
+        help="Number of requests allowed per API key before answering with 429.",
+    ),
+    max_requests_per_second: Optional[float] = typer.Option(
+        None,
+        help="Requests per second allowed per API key before answering with 429.",
+    ),
+    max_query_length: Optional[int] = typer.Option(
+        None,
+        help="Queries longer than this are answered with 413 (invalid string).",
+    ),
+    error_rate: float = typer.Option(
+        0.0,
+        help="Probability of answering a request with 500.",
+    ),
+    seed: int = typer.Option(
+        0,
+        help="Seed used to generate the synthetic corpus and the errors.",
+    ),
+):
+    """Serves a local Scopus-compatible search API, to test searches without spending quota.
+
+    To point the CLI to the server, set the `SESG_SCOPUS_API_URL` environment variable to the URL printed on startup.
+    """  # noqa: E501
+    from sesg_cli.scopus_mock_server import (
+        MockCorpus,
+        MockScopusServer,
+        MockScopusSettings,
+        RecordedCorpus,
+        SyntheticCorpus,
+    )
+
+    corpus: MockCorpus
+    if corpus_file_path is not None:
+        corpus = RecordedCorpus.from_json(corpus_file_path)
+
+    else:
+        gs_titles: list[str] = []
+        if slr_name is not None:
+            with Session() as session:
+                gs_titles = [s.title for s in SLR.get_by_name(slr_name, session).gs]
+
+        corpus = SyntheticCorpus(
+            max_results=max_results,
+            seed=seed,
+            gs_titles=gs_titles,
+            gs_hit_rate=gs_hit_rate,
+        )
+
+    settings = MockScopusSettings(
+        latency=latency,
+        page_size=page_size,
+        quota_per_key=quota_per_key,
+        max_requests_per_second=max_requests_per_second,
+        max_query_length=max_query_length,
+        error_rate=error_rate,
+        seed=seed,
+    )
+
+    with MockScopusServer((host, port), corpus, settings) as server:
+        print(f"Serving a mock Scopus API on {server.url}")
+        print(f'Use it with [bright_cyan]SESG_SCOPUS_API_URL="{server.url}"')
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("Stopping the server...")
@@ -6,6 +6,7 @@ from rich.progress import Progress
 
 from sesg_cli.database.connection import Session
 from sesg_cli.database.models import SLR, Study
+from sesg_cli.snowballing_reachability import SnowballingReachability
 
 
 app = typer.Typer(rich_markup_mode="markdown", help="Create a SLR.")
@@ -88,6 +89,27 @@ def create_from_json(
         session.commit()
         session.refresh(slr)
 
+        SnowballingReachability.refresh(slr, session)
+
         print(
             f"Created {slr.to_string(['id', 'name', 'min_publication_year', 'max_publication_year'])}"  # noqa: E501
         )  # noqa: E501
+
+
+@app.command()
+def refresh_reachability(
+    slr_name: str = typer.Argument(
+        ...,
+        help="Name of the SLR.",
+    ),
+):
+    """Computes the studies reachable from each GS study through snowballing, used to evaluate the search strings.
+
+    The searches also compute them again when the GS or the citations of the SLR changed.
+    """  # noqa: E501
+    with Session() as session:
+        slr = SLR.get_by_name(slr_name, session)
+
+        SnowballingReachability.refresh(slr, session)
+
+        print(f"Refreshed the reachability of {len(slr.gs)} studies.")
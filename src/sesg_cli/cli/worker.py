@@ -0,0 +1,209 @@
+import asyncio
+import os
+import socket
+from datetime import timedelta
+from functools import wraps
+from pathlib import Path
+from typing import Optional
+
+import typer
+from rich import print
+
+from sesg_cli.config import Config
+from sesg_cli.database.connection import Session
+from sesg_cli.database.models import (
+    Experiment,
+    SearchString,
+    SearchStringLease,
+)
+from sesg_cli.performance_writer import PerformanceWriter
+from sesg_cli.scopus_checkpoint import CheckpointedSearch
+from sesg_cli.scopus_search import (
+    create_client,
+    create_evaluation_context,
+    create_progress,
+    search_and_evaluate,
+)
+
+
+class AsyncTyper(typer.Typer):
+    def async_command(self, *args, **kwargs):
+        def decorator(async_func):
+            @wraps(async_func)
+            def sync_func(*_args, **_kwargs):
+                return asyncio.run(async_func(*_args, **_kwargs))
+
+            self.command(*args, **kwargs)(sync_func)
+            return async_func
+
+        return decorator
+
+
+app = AsyncTyper(
+    rich_markup_mode="markdown",
+    help="Run workers that cooperate to perform Scopus searches.",
+)
+
+
+def _renew_leases(
+    search_string_ids: list[int],
+    worker_id: str,
+    lease_duration: timedelta,
+):
+    with Session() as session:
+        SearchStringLease.renew(search_string_ids, worker_id, lease_duration, session)
+
+
+async def _keep_leases_alive(
+    leased_ids: set[int],
+    worker_id: str,
+    lease_duration: timedelta,
+):
+    """Renews the leases held by the worker, so they don't expire while the strings are searched."""  # noqa: E501
+    while True:
+        await asyncio.sleep(lease_duration.total_seconds() / 3)
+
+        if leased_ids:
+            await asyncio.to_thread(
+                _renew_leases,
+                list(leased_ids),
+                worker_id,
+                lease_duration,
+            )
+
+
+@app.async_command()
+async def search(
+    experiment_name: str = typer.Argument(
+        ...,
+        help="Name of the experiment to retrieve the search strings from.",
+    ),
+    config_file_path: Path = typer.Option(
+        Path.cwd() / "config.toml",
+        "--config-file-path",
+        "-c",
+        help="Path to the `config.toml` file.",
+    ),
+    worker_id: str = typer.Option(
+        f"{socket.gethostname()}-{os.getpid()}",
+        help="Identifier of the worker, stored on the leases it holds.",
+    ),
+    batch_size: int = typer.Option(
+        5,
+        help="Number of search strings leased at a time.",
+    ),
+    lease_duration: int = typer.Option(
+        300,
+        help="Seconds a lease lasts without being renewed. Strings of a worker that stopped renewing its leases are searched by other workers.",  # noqa: E501
+    ),
+    max_attempts: int = typer.Option(
+        3,
+        help="Number of times a string is leased before it is given up.",
+    ),
+    poll_interval: Optional[float] = typer.Option(
+        None,
+        help="If set, keeps running after no strings are left to lease, checking for new strings every `poll_interval` seconds.",  # noqa: E501
+    ),
+    ignore_quota: bool = typer.Option(
+        False,
+        "--ignore-quota",
+        help="Start the search even if the API keys do not have enough quota to complete it.",  # noqa: E501
+    ),
+    fast_title_matching: bool = typer.Option(
+        False,
+        "--fast-title-matching",
+        help="Match the Scopus titles to their closest GS title through indexes, memoizing the matches. Faster, but a study may be found where the `sesg` rule (TF-IDF nearest title) would not find it, so the performances are not comparable with the ones found without this option.",  # noqa: E501
+    ),
+):
+    """Searches the strings of the experiment on Scopus, cooperating with other workers.
+
+    Each worker leases a few strings at a time, so many workers (on different machines, using different API keys) can search the same experiment without searching a string twice. If a worker stops, its strings are leased by other workers once the leases expire.
+    """  # noqa: E501
+    duration = timedelta(seconds=lease_duration)
+
+    with Session() as session:
+        experiment = Experiment.get_by_name(experiment_name, session)
+
+        config = Config.from_toml(config_file_path)
+
+        context = create_evaluation_context(
+            experiment,
+            session,
+            Session,
+            fast_title_matching=fast_title_matching,
+        )
+
+        scheduler, client = create_client(
+            config=config,
+            n_strings=batch_size,
+            ignore_quota=ignore_quota,
+            session=session,
+        )
+        checkpointed_search = CheckpointedSearch(
+            client=client,
+            session=session,
+            session_factory=Session,
+        )
+
+        print(f"Starting worker [bright_cyan]{worker_id}")
+
+        leased_ids: set[int] = set()
+        heartbeat = asyncio.create_task(
+            _keep_leases_alive(leased_ids, worker_id, duration)
+        )
+
+        try:
+            with create_progress() as progress:
+                overall_task = progress.add_task("Searched", total=None)
+
+                async with PerformanceWriter(session_factory=Session) as writer:
+                    while True:
+                        claimed_ids = SearchStringLease.claim(
+                            experiment_id=experiment.id,
+                            worker_id=worker_id,
+                            lease_duration=duration,
+                            session=session,
+                            limit=batch_size,
+                            max_attempts=max_attempts,
+                        )
+
+                        if not claimed_ids:
+                            if poll_interval is None:
+                                break
+
+                            await asyncio.sleep(poll_interval)
+                            continue
+
+                        leased_ids.update(claimed_ids)
+
+                        for search_string_id in claimed_ids:
+                            search_string = session.get(SearchString, search_string_id)
+                            assert search_string is not None
+
+                            performance = await search_and_evaluate(
+                                search_string=search_string,
+                                context=context,
+                                checkpointed_search=checkpointed_search,
+                                progress=progress,
+                            )
+
+                            await writer.put(performance)
+
+                            progress.advance(overall_task)
+
+                        # the strings are only released once their performances are saved
+                        await writer.flush()
+
+                        for search_string_id in claimed_ids:
+                            SearchStringLease.release(
+                                search_string_id, worker_id, session
+                            )
+                            leased_ids.discard(search_string_id)
+
+                        scheduler.save()
+
+                progress.remove_task(overall_task)
+
+        finally:
+            heartbeat.cancel()
+            scheduler.save()
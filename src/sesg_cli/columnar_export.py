@@ -0,0 +1,116 @@
+from enum import Enum
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Sequence
+
+from sqlalchemy import Boolean, Float, Integer
+from sqlalchemy.types import TypeEngine
+
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+
+class ColumnarFormat(str, Enum):
+    """Enum defining the available columnar export formats.
+
+    Examples:
+        >>> ColumnarFormat.arrow.pyarrow_format
+        'ipc'
+    """
+
+    parquet = "parquet"
+    arrow = "arrow"
+    csv = "csv"
+
+    @property
+    def pyarrow_format(self) -> str:
+        # `pyarrow.dataset` calls the Arrow file format `ipc`
+        return "ipc" if self == ColumnarFormat.arrow else self.value
+
+
+def to_arrow_type(sql_type: TypeEngine) -> "pa.DataType":
+    """Maps a SQLAlchemy column type to the Arrow type used to export it."""
+    import pyarrow as pa
+
+    if isinstance(sql_type, Boolean):
+        return pa.bool_()
+
+    if isinstance(sql_type, Integer):
+        return pa.int64()
+
+    if isinstance(sql_type, Float):
+        return pa.float64()
+
+    return pa.string()
+
+
+def _to_batches(
+    schema: "pa.Schema",
+    data: Iterable[Sequence[Any]],
+    batch_size: int,
+) -> Iterator["pa.RecordBatch"]:
+    import pyarrow as pa
+
+    rows = iter(data)
+
+    while batch := list(islice(rows, batch_size)):
+        columns = list(zip(*batch))
+
+        yield pa.RecordBatch.from_arrays(
+            [
+                pa.array(column, type=field.type)
+                for column, field in zip(columns, schema)
+            ],
+            schema=schema,
+        )
+
+
+def write_result_set(
+    base_dir: Path,
+    columns: Sequence[str],
+    types: Sequence[TypeEngine],
+    data: Iterable[Sequence[Any]],
+    file_format: ColumnarFormat,
+    partition_by: str | None = None,
+    batch_size: int = 10_000,
+) -> None:
+    """Writes the rows to `base_dir` as they are iterated, `batch_size` rows at a time.
+
+    If `partition_by` is one of the columns, the rows are partitioned by its values into
+    hive-style directories (e.g. `name=experiment_1/part-0.parquet`), and the column is
+    only stored on the directory names. Existing files on `base_dir` are replaced.
+
+    Args:
+        base_dir (Path): Directory where the files are written.
+        columns (Sequence[str]): Names of the columns.
+        types (Sequence[TypeEngine]): SQLAlchemy types of the columns, used to type the files.
+        data (Iterable[Sequence[Any]]): Rows to be written.
+        file_format (ColumnarFormat): Format of the files.
+        partition_by (str | None): Column used to partition the rows.
+        batch_size (int): Number of rows written at a time.
+    """  # noqa: E501
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    schema = pa.schema(
+        [(column, to_arrow_type(sql_type)) for column, sql_type in zip(columns, types)]
+    )
+
+    partitioning = None
+    if partition_by is not None and partition_by in columns:
+        partitioning = ds.partitioning(
+            pa.schema([schema.field(partition_by)]),
+            flavor="hive",
+        )
+
+    ds.write_dataset(
+        pa.RecordBatchReader.from_batches(
+            schema, _to_batches(schema, data, batch_size)
+        ),
+        base_dir,
+        format=file_format.pyarrow_format,
+        partitioning=partitioning,
+        basename_template=f"part-{{i}}.{file_format.value}",
+        existing_data_behavior="delete_matching",
+    )
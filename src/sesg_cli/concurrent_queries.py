@@ -0,0 +1,110 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+
+_END = object()
+
+
+@dataclass
+class ConcurrentQueries:
+    """Runs queries concurrently on worker threads, each with its own session, and so its own pooled connection.
+
+    A query starts as soon as it is passed to `stream`, and its rows are fetched `yield_per`
+    at a time from a server-side cursor, and passed to the caller through a bounded queue.
+    So every query runs while the rows of the previous ones are consumed, and at most
+    `max_queued_batches` batches of rows of each query are held in memory.
+
+    Use it as a context manager, which stops the queries that were not fully consumed on
+    exit. If there are fewer workers than queries, the queries must be consumed in the
+    order they were passed to `stream`.
+
+    Args:
+        session_factory (Callable[[], Session]): Creates the session used by each query.
+        max_workers (int | None): Maximum number of queries running at a time. Defaults to the `ThreadPoolExecutor` default.
+        yield_per (int): Number of rows fetched at a time from the database.
+        max_queued_batches (int): Maximum number of batches of rows of each query waiting to be consumed.
+    """  # noqa: E501
+
+    session_factory: Callable[[], Session]
+    max_workers: int | None = None
+    yield_per: int = 1000
+    max_queued_batches: int = 10
+
+    _executor: ThreadPoolExecutor | None = field(default=None, init=False)
+    _stopped: threading.Event = field(default_factory=threading.Event, init=False)
+
+    def __enter__(self) -> "ConcurrentQueries":
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="sesg-query",
+        )
+
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._stopped.set()
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _put(self, rows_queue: queue.Queue, item: Any) -> bool:
+        # gives up if the queries were stopped while the queue is full
+        while not self._stopped.is_set():
+            try:
+                rows_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+
+        return False
+
+    def _run(self, query: Select, rows_queue: queue.Queue) -> None:
+        try:
+            with self.session_factory() as session:
+                result = session.execute(
+                    query.execution_options(yield_per=self.yield_per)
+                )
+
+                for batch in result.partitions():
+                    if not self._put(rows_queue, batch):
+                        return
+
+        except Exception as e:
+            self._put(rows_queue, e)
+
+        else:
+            self._put(rows_queue, _END)
+
+    def _consume(self, rows_queue: queue.Queue) -> Iterator:
+        while True:
+            try:
+                item = rows_queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stopped.is_set():
+                    raise RuntimeError("The queries were stopped.")
+
+                continue
+
+            if item is _END:
+                return
+
+            if isinstance(item, Exception):
+                raise item
+
+            yield from item
+
+    def stream(self, query: Select) -> Iterator:
+        """Starts the query, returning an iterator over its rows."""
+        if self._executor is None or self._stopped.is_set():
+            raise RuntimeError("The queries were not started.")
+
+        rows_queue: queue.Queue = queue.Queue(maxsize=self.max_queued_batches)
+        self._executor.submit(self._run, query, rows_queue)
+
+        return self._consume(rows_queue)
@@ -12,12 +12,24 @@ from .experiment import Experiment
 from .formulation_params import FormulationParams
 from .lda_params import LDAParams
 from .params import Params
+from .reachability_fingerprint import ReachabilityFingerprint
+from .results_view_refresh import ResultsViewRefresh
+from .results_views import results_bt, results_lda
+from .scopus_api_key import ScopusAPIKey
+from .scopus_document import ScopusDocument
+from .scopus_probe import ScopusProbe
+from .scopus_search_cursor import ScopusSearchCursor
+from .scopus_search_page import ScopusSearchPage
 from .search_string import SearchString
+from .search_string_estimate import SearchStringEstimate
+from .search_string_lease import SearchStringLease
 from .search_string_performance import SearchStringPerformance
 from .similar_words_cache import SimilarWordsCache
 from .similar_words_cache_words import SimilarWord
 from .slr import SLR
 from .study import Study
+from .study_reachability import StudyReachability
+from .title_match import TitleMatch
 
 
 __all__ = (
@@ -39,4 +51,17 @@ __all__ = (
     "SearchStringPerformance",
     "SimilarWordsCache",
     "SimilarWord",
+    "ScopusAPIKey",
+    "ScopusSearchCursor",
+    "ScopusSearchPage",
+    "ScopusDocument",
+    "TitleMatch",
+    "SearchStringLease",
+    "ScopusProbe",
+    "StudyReachability",
+    "ReachabilityFingerprint",
+    "SearchStringEstimate",
+    "results_lda",
+    "results_bt",
+    "ResultsViewRefresh",
 )
@@ -1,7 +1,11 @@
 from sqlalchemy import (
+    DDL,
     Column,
+    Connection,
     ForeignKey,
     Table,
+    event,
+    text,
 )
 
 from .base import Base
@@ -21,46 +25,89 @@ experiment_qgs = Table(
     Column("study_id", ForeignKey("study.id"), primary_key=True),
 )
 
-qgs_in_scopus = Table(
-    "qgs_in_scopus",
-    Base.metadata,
-    Column(
-        "search_string_performance_id",
-        ForeignKey("search_string_performance.id"),
-        primary_key=True,
-    ),
-    Column("study_id", ForeignKey("study.id"), primary_key=True),
-)
+# the studies found by a search string are stored as arrays on
+# `search_string_performance`. The following tables are views that unnest
+# these arrays, so they can still be used by read-only relationships and queries.
+PERFORMANCE_STUDIES_VIEWS = {
+    "qgs_in_scopus": "qgs_in_scopus_ids",
+    "gs_in_scopus": "gs_in_scopus_ids",
+    "gs_in_bsb": "gs_in_bsb_ids",
+    "gs_in_sb": "gs_in_sb_ids",
+}
 
-gs_in_scopus = Table(
-    "gs_in_scopus",
-    Base.metadata,
-    Column(
-        "search_string_performance_id",
-        ForeignKey("search_string_performance.id"),
-        primary_key=True,
-    ),
-    Column("study_id", ForeignKey("study.id"), primary_key=True),
-)
 
-gs_in_bsb = Table(
-    "gs_in_bsb",
-    Base.metadata,
-    Column(
-        "search_string_performance_id",
-        ForeignKey("search_string_performance.id"),
-        primary_key=True,
-    ),
-    Column("study_id", ForeignKey("study.id"), primary_key=True),
-)
+def _performance_studies_view(name: str) -> Table:
+    return Table(
+        name,
+        Base.metadata,
+        Column(
+            "search_string_performance_id",
+            ForeignKey("search_string_performance.id"),
+            primary_key=True,
+        ),
+        Column("study_id", ForeignKey("study.id"), primary_key=True),
+        info={"is_view": True},
+    )
 
-gs_in_sb = Table(
-    "gs_in_sb",
-    Base.metadata,
-    Column(
-        "search_string_performance_id",
-        ForeignKey("search_string_performance.id"),
-        primary_key=True,
-    ),
-    Column("study_id", ForeignKey("study.id"), primary_key=True),
-)
+
+qgs_in_scopus = _performance_studies_view("qgs_in_scopus")
+gs_in_scopus = _performance_studies_view("gs_in_scopus")
+gs_in_bsb = _performance_studies_view("gs_in_bsb")
+gs_in_sb = _performance_studies_view("gs_in_sb")
+
+
+class PerformanceStudiesNotMigrated(Exception):
+    """The studies found by each string are still stored on association tables."""
+
+
+def get_unmigrated_performance_studies_tables(connection: Connection) -> list[str]:
+    """Names of the association tables that were not replaced by views yet."""
+    stmt = text(
+        "SELECT relname FROM pg_class WHERE oid = to_regclass(:name) AND relkind = 'r'"
+    )
+
+    return [
+        view
+        for view in PERFORMANCE_STUDIES_VIEWS
+        if connection.execute(stmt, {"name": view}).scalar_one_or_none() is not None
+    ]
+
+
+def create_performance_studies_views_ddl() -> list[DDL]:
+    return [
+        DDL(
+            f"CREATE OR REPLACE VIEW {view} AS "
+            "SELECT ssp.id AS search_string_performance_id, "
+            f"unnest(ssp.{column}) AS study_id "
+            "FROM search_string_performance ssp"
+        )
+        for view, column in PERFORMANCE_STUDIES_VIEWS.items()
+    ]
+
+
+def drop_performance_studies_views_ddl() -> list[DDL]:
+    return [DDL(f"DROP VIEW IF EXISTS {view}") for view in PERFORMANCE_STUDIES_VIEWS]
+
+
+def get_tables() -> list[Table]:
+    """Tables of the database, without the views."""
+    return [t for t in Base.metadata.sorted_tables if not t.info.get("is_view")]
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_views(target, connection, **kw):
+    tables = get_unmigrated_performance_studies_tables(connection)
+    if tables:
+        raise PerformanceStudiesNotMigrated(
+            f"{', '.join(tables)} are still tables, so they cannot be replaced by "
+            "views. Run `sesg db migrate-performance-studies` first."
+        )
+
+    for ddl in create_performance_studies_views_ddl():
+        connection.execute(ddl)
+
+
+@event.listens_for(Base.metadata, "before_drop")
+def _drop_views(target, connection, **kw):
+    for ddl in drop_performance_studies_views_ddl():
+        connection.execute(ddl)
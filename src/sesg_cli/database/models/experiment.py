@@ -61,6 +61,16 @@ class Experiment(Base):
 
         return session.execute(stmt).scalar_one()
 
+    @classmethod
+    def get_by_id(
+        cls,
+        id: int,
+        session: Session,
+    ):
+        stmt = select(Experiment).where(Experiment.id == id)
+
+        return session.execute(stmt).scalar_one()
+
     @classmethod
     def get_or_create_by_name(
         cls,
@@ -80,6 +90,23 @@ class Experiment(Base):
 
         return experiment
 
+    def get_search_strings(
+        self,
+        session: Session,
+    ):
+        from .params import Params
+        from .search_string import SearchString
+
+        stmt = (
+            select(SearchString)
+            .join(SearchString.params_list)
+            .where(Params.experiment_id == self.id)
+            .distinct()
+            .order_by(SearchString.id)
+        )
+
+        return list(session.execute(stmt).scalars().all())
+
     def get_search_strings_without_performance(
         self,
         session: Session,
@@ -94,15 +121,11 @@ class Experiment(Base):
             .where(SearchStringPerformance.id.is_(None))
             .join(SearchString.params_list)
             .where(Params.experiment_id == self.id)
+            .distinct()
+            .order_by(SearchString.id)
         )
 
-        results = session.execute(stmt).scalars().all()
-
-        unique_results: dict[str, SearchString] = {}
-        for r in results:
-            unique_results[r.string] = r
-
-        return list(unique_results.values())
+        return list(session.execute(stmt).scalars().all())
 
     def get_docs(self):
         from sesg.topic_extraction.create_docs import create_docs
@@ -0,0 +1,47 @@
+from sqlalchemy import (
+    ForeignKey,
+    Text,
+    select,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import (
+    Mapped,
+    Session,
+    mapped_column,
+)
+
+from .base import Base
+
+
+class ReachabilityFingerprint(Base):
+    """Hash of the GS and citations the reachability of the SLR was computed with.
+
+    The stored reachability is only used while the hash matches the current one.
+    """
+
+    __tablename__ = "reachability_fingerprint"
+
+    slr_id: Mapped[int] = mapped_column(ForeignKey("slr.id"), primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(Text())
+
+    @classmethod
+    def get_one_or_none(cls, slr_id: int, session: Session) -> str | None:
+        stmt = select(ReachabilityFingerprint.fingerprint).where(
+            ReachabilityFingerprint.slr_id == slr_id
+        )
+
+        return session.execute(stmt).scalar_one_or_none()
+
+    @classmethod
+    def save(cls, slr_id: int, fingerprint: str, session: Session) -> None:
+        """Saves the fingerprint of the SLR, replacing the previous one. Does not commit."""  # noqa: E501
+        stmt = insert(ReachabilityFingerprint).values(
+            slr_id=slr_id,
+            fingerprint=fingerprint,
+        )
+        session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[ReachabilityFingerprint.slr_id],
+                set_={"fingerprint": stmt.excluded.fingerprint},
+            )
+        )
@@ -0,0 +1,111 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    DateTime,
+    Text,
+    func,
+    select,
+    true,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import (
+    Mapped,
+    Session,
+    mapped_column,
+)
+
+from .base import Base
+from .params import Params
+from .results_views import RESULTS_VIEWS, refresh_results_views_ddl
+from .search_string_performance import SearchStringPerformance
+
+
+class ResultsViewRefresh(Base):
+    """Version of the data the results materialized views were last refreshed with.
+
+    The version is made of the max IDs and the counts of `params` and `search_string_performance`,
+    and of the sums of the values of the performances, so the views are only refreshed when params
+    or performances were added, removed or updated.
+    """  # noqa: E501
+
+    __tablename__ = "results_view_refresh"
+
+    view_name: Mapped[str] = mapped_column(Text(), primary_key=True)
+    data_version: Mapped[str] = mapped_column(Text())
+
+    refreshed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default_factory=lambda: datetime.now(timezone.utc),
+    )
+
+    @classmethod
+    def get_data_version(cls, session: Session) -> str:
+        params_version = (
+            select(func.max(Params.id), func.count()).select_from(Params).subquery()
+        )
+        performances_version = (
+            select(
+                func.max(SearchStringPerformance.id),
+                func.count(),
+                *SearchStringPerformance.get_values_aggregates(),
+            )
+            .select_from(SearchStringPerformance)
+            .subquery()
+        )
+
+        # each subquery returns a single row, so they are joined on `true`
+        stmt = select(params_version, performances_version).select_from(
+            params_version.join(performances_version, true())
+        )
+
+        return ":".join(str(value) for value in session.execute(stmt).one())
+
+    @classmethod
+    def refresh_if_stale(cls, session: Session, force: bool = False) -> bool:
+        """Refreshes the results views if params or performances changed since the last refresh, and commits.
+
+        The views are refreshed concurrently, so they can be read while being refreshed.
+
+        Args:
+            session (Session): A db session.
+            force (bool): Refresh the views even if nothing changed.
+
+        Returns:
+            Whether the views were refreshed.
+        """  # noqa: E501
+        data_version = cls.get_data_version(session)
+
+        stmt = select(ResultsViewRefresh.view_name).where(
+            ResultsViewRefresh.data_version == data_version
+        )
+        fresh_views = set(session.execute(stmt).scalars())
+
+        if not force and fresh_views.issuperset(RESULTS_VIEWS):
+            return False
+
+        for ddl in refresh_results_views_ddl():
+            session.execute(ddl)
+
+        stmt = insert(ResultsViewRefresh)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ResultsViewRefresh.view_name],
+            set_={
+                "data_version": stmt.excluded.data_version,
+                "refreshed_at": stmt.excluded.refreshed_at,
+            },
+        )
+
+        session.execute(
+            stmt,
+            [
+                {
+                    "view_name": view,
+                    "data_version": data_version,
+                    "refreshed_at": datetime.now(timezone.utc),
+                }
+                for view in RESULTS_VIEWS
+            ],
+        )
+        session.commit()
+
+        return True
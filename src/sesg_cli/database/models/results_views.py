@@ -0,0 +1,175 @@
+from sqlalchemy import (
+    DDL,
+    Column,
+    Float,
+    Integer,
+    Select,
+    Table,
+    Text,
+    event,
+    select,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeEngine
+
+from .base import Base
+from .bertopic_params import BERTopicParams
+from .experiment import Experiment
+from .formulation_params import FormulationParams
+from .lda_params import LDAParams
+from .params import Params
+from .search_string import SearchString
+from .search_string_performance import SearchStringPerformance
+
+
+# the results of each algorithm are stored on materialized views, with a row for each
+# params, so exporting the results of a SLR scans a single view instead of joining
+# `params`, the algorithm params, `search_string`, `search_string_performance` and
+# `experiment`. The views are refreshed by `ResultsViewRefresh.refresh_if_stale`.
+_RESULTS_COLUMNS = [
+    ("search_string_id", Integer()),
+    ("start_set_precision", Float()),
+    ("start_set_recall", Float()),
+    ("start_set_f1_score", Float()),
+    ("bsb_recall", Float()),
+    ("sb_recall", Float()),
+]
+
+_FORMULATION_COLUMNS = [
+    ("n_similar_w", Integer()),
+    ("n_w_per_topic", Integer()),
+    ("n_scopus_results", Integer()),
+    ("n_qgs_studies_in_scopus", Integer()),
+    ("n_gs_studies_in_scopus", Integer()),
+    ("name", Text()),
+]
+
+
+def _results_view(name: str, algorithm_columns: list[tuple[str, TypeEngine]]) -> Table:
+    return Table(
+        name,
+        Base.metadata,
+        Column("params_id", Integer(), primary_key=True),
+        Column("slr_id", Integer()),
+        *[
+            Column(column, column_type)
+            for column, column_type in [
+                *_RESULTS_COLUMNS,
+                *algorithm_columns,
+                *_FORMULATION_COLUMNS,
+            ]
+        ],
+        info={"is_view": True},
+    )
+
+
+results_lda = _results_view(
+    "results_lda",
+    [("min_df", Float()), ("n_topics", Integer())],
+)
+results_bt = _results_view(
+    "results_bt",
+    [("n_clusters", Integer()), ("n_neighbors", Integer())],
+)
+
+
+def _results_view_query(
+    algorithm_params,
+    algorithm_params_id,
+    algorithm_columns: list,
+) -> Select:
+    return (
+        select(
+            Params.id.label("params_id"),
+            Experiment.slr_id,
+            SearchStringPerformance.search_string_id,
+            SearchStringPerformance.start_set_precision,
+            SearchStringPerformance.start_set_recall,
+            SearchStringPerformance.start_set_f1_score,
+            SearchStringPerformance.bsb_recall,
+            SearchStringPerformance.sb_recall,
+            *algorithm_columns,
+            FormulationParams.n_similar_words_per_word.label("n_similar_w"),
+            FormulationParams.n_words_per_topic.label("n_w_per_topic"),
+            SearchStringPerformance.n_scopus_results,
+            SearchStringPerformance.n_qgs_in_scopus.label("n_qgs_studies_in_scopus"),
+            SearchStringPerformance.n_gs_in_scopus.label("n_gs_studies_in_scopus"),
+            Experiment.name,
+        )
+        .select_from(Params)
+        .join(algorithm_params, algorithm_params.id == algorithm_params_id)
+        .join(FormulationParams, FormulationParams.id == Params.formulation_params_id)
+        .join(SearchString, SearchString.id == Params.search_string_id)
+        .join(
+            SearchStringPerformance,
+            SearchStringPerformance.search_string_id == SearchString.id,
+            isouter=True,
+        )
+        .join(Experiment, Experiment.id == Params.experiment_id)
+    )
+
+
+RESULTS_VIEWS: dict[str, Select] = {
+    results_lda.name: _results_view_query(
+        LDAParams,
+        Params.lda_params_id,
+        [
+            LDAParams.min_document_frequency.label("min_df"),
+            LDAParams.n_topics,
+        ],
+    ),
+    results_bt.name: _results_view_query(
+        BERTopicParams,
+        Params.bertopic_params_id,
+        [
+            BERTopicParams.kmeans_n_clusters.label("n_clusters"),
+            BERTopicParams.umap_n_neighbors.label("n_neighbors"),
+        ],
+    ),
+}
+
+
+def create_results_views_ddl() -> list[DDL]:
+    ddls: list[DDL] = []
+
+    for view, query in RESULTS_VIEWS.items():
+        query_sql = str(query.compile(dialect=postgresql.dialect()))
+
+        ddls.extend(
+            [
+                DDL(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {view} AS {query_sql}"),
+                # required to refresh the view concurrently
+                DDL(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{view}_params_id "
+                    f"ON {view} (params_id)"
+                ),
+                DDL(
+                    f"CREATE INDEX IF NOT EXISTS ix_{view}_slr_id_search_string_id "
+                    f"ON {view} (slr_id, search_string_id)"
+                ),
+            ]
+        )
+
+    return ddls
+
+
+def drop_results_views_ddl() -> list[DDL]:
+    return [DDL(f"DROP MATERIALIZED VIEW IF EXISTS {view}") for view in RESULTS_VIEWS]
+
+
+def refresh_results_views_ddl() -> list[DDL]:
+    return [
+        DDL(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}") for view in RESULTS_VIEWS
+    ]
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_results_views(target, connection, **kw):
+    for ddl in create_results_views_ddl():
+        connection.execute(ddl)
+
+
+@event.listens_for(Base.metadata, "before_drop")
+def _drop_results_views(target, connection, **kw):
+    for ddl in drop_results_views_ddl():
+        connection.execute(ddl)
@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import (
+    DateTime,
+    Integer,
+    Text,
+    select,
+)
+from sqlalchemy.orm import (
+    Mapped,
+    Session,
+    mapped_column,
+)
+
+from .base import Base
+
+
+# https://dev.elsevier.com/api_key_settings.html
+DEFAULT_WEEKLY_QUOTA = 20_000
+
+
+class ScopusAPIKey(Base):
+    __tablename__ = "scopus_api_key"
+
+    id: Mapped[int] = mapped_column(primary_key=True, init=False)
+
+    key: Mapped[str] = mapped_column(Text(), unique=True)
+    n_requests: Mapped[int] = mapped_column(Integer(), default=0)
+
+    quota_limit: Mapped[Optional[int]] = mapped_column(Integer(), default=None)
+    quota_remaining: Mapped[Optional[int]] = mapped_column(Integer(), default=None)
+    quota_reset_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True),
+        default=None,
+    )
+
+    last_used_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True),
+        default=None,
+    )
+
+    @classmethod
+    def get_or_create_many(
+        cls,
+        keys: list[str],
+        session: Session,
+    ) -> list["ScopusAPIKey"]:
+        stmt = select(ScopusAPIKey).where(ScopusAPIKey.key.in_(keys))
+
+        existing = {k.key: k for k in session.execute(stmt).scalars().all()}
+
+        api_keys: list[ScopusAPIKey] = []
+        for key in keys:
+            api_key = existing.get(key)
+
+            if api_key is None:
+                api_key = ScopusAPIKey(key=key)
+                session.add(api_key)
+
+            api_keys.append(api_key)
+
+        session.commit()
+
+        return api_keys
+
+    def get_remaining_quota(self) -> int:
+        """Remaining quota of the key, as reported by the last response seen.
+
+        If the key was never used, or if its quota was reset since the last response,
+        assumes the whole weekly quota is available.
+        """
+        now = datetime.now(timezone.utc)
+
+        if self.quota_reset_at is not None and self.quota_reset_at <= now:
+            return self.quota_limit or DEFAULT_WEEKLY_QUOTA
+
+        if self.quota_remaining is None:
+            return self.quota_limit or DEFAULT_WEEKLY_QUOTA
+
+        return self.quota_remaining
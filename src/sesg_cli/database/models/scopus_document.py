@@ -0,0 +1,106 @@
+from typing import Optional
+
+from sqlalchemy import (
+    ForeignKey,
+    Text,
+    delete,
+    func,
+    select,
+)
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.orm import (
+    Mapped,
+    Session,
+    mapped_column,
+)
+
+from .base import Base
+from .experiment import Experiment
+from .params import Params
+from .scopus_search_cursor import ScopusSearchCursor
+from .scopus_search_page import ScopusSearchPage
+
+
+class ScopusDocument(Base):
+    """Document found on Scopus by a search string of the SLR.
+
+    Once the performance of a string is saved, the entries of its pages are moved here,
+    and the pages are deleted. So each document is stored once per SLR, no matter how
+    many strings found it.
+    """
+
+    __tablename__ = "scopus_document"
+
+    slr_id: Mapped[int] = mapped_column(ForeignKey("slr.id"), primary_key=True)
+    scopus_id: Mapped[str] = mapped_column(Text(), primary_key=True)
+
+    title: Mapped[Optional[str]] = mapped_column(Text(), nullable=True)
+    cover_date: Mapped[Optional[str]] = mapped_column(Text(), nullable=True)
+
+    @classmethod
+    def move_from_pages(
+        cls,
+        search_string_ids: list[int],
+        session: Session,
+    ) -> None:
+        """Moves the entries of the pages of the strings to the documents of their SLRs.
+
+        The pages and cursors of the strings are deleted, so the strings must not be
+        searched again. Does not commit.
+        """
+        if not search_string_ids:
+            return
+
+        string_cursors = select(ScopusSearchCursor.id).where(
+            ScopusSearchCursor.search_string_id.in_(search_string_ids)
+        )
+        string_slrs = (
+            select(Params.search_string_id, Experiment.slr_id)
+            .join(Experiment, Experiment.id == Params.experiment_id)
+            .where(Params.search_string_id.in_(search_string_ids))
+            .distinct()
+            .subquery()
+        )
+
+        entry = func.jsonb_array_elements(
+            ScopusSearchPage.entries,
+            type_=JSONB,
+        ).column_valued("entry")
+        entries = (
+            select(
+                string_slrs.c.slr_id,
+                entry["scopus_id"].astext,
+                entry["title"].astext,
+                entry["cover_date"].astext,
+            )
+            .select_from(ScopusSearchPage)
+            .join(
+                ScopusSearchCursor,
+                ScopusSearchCursor.id == ScopusSearchPage.cursor_id,
+            )
+            .join(
+                string_slrs,
+                string_slrs.c.search_string_id == ScopusSearchCursor.search_string_id,
+            )
+            .where(
+                ScopusSearchPage.cursor_id.in_(string_cursors),
+                entry["scopus_id"].astext.is_not(None),
+            )
+        )
+
+        session.execute(
+            insert(ScopusDocument)
+            .from_select(["slr_id", "scopus_id", "title", "cover_date"], entries)
+            .on_conflict_do_nothing()
+        )
+
+        session.execute(
+            delete(ScopusSearchPage).where(
+                ScopusSearchPage.cursor_id.in_(string_cursors)
+            )
+        )
+        session.execute(
+            delete(ScopusSearchCursor).where(
+                ScopusSearchCursor.search_string_id.in_(search_string_ids)
+            )
+        )
@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Integer,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import (
+    Mapped,
+    Session,
+    mapped_column,
+)
+
+from .base import Base
+
+
+class ScopusProbe(Base):
+    """Cached result of probing a search string with a first-page request.
+
+    A string that was already probed is skipped by `sesg fix-invalid-strings fix`.
+    """
+
+    __tablename__ = "scopus_probe"
+
+    search_string_id: Mapped[int] = mapped_column(
+        ForeignKey("search_string.id"),
+        primary_key=True,
+    )
+
+    is_valid: Mapped[bool] = mapped_column(Boolean())
+    n_results: Mapped[Optional[int]] = mapped_column(Integer(), default=None)
+
+    probed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default_factory=lambda: datetime.now(timezone.utc),
+    )
+
+    @classmethod
+    def save_probe(
+        cls,
+        search_string_id: int,
+        is_valid: bool,
+        n_results: int | None,
+        session: Session,
+    ) -> None:
+        stmt = insert(ScopusProbe).values(
+            search_string_id=search_string_id,
+            is_valid=is_valid,
+            n_results=n_results,
+            probed_at=datetime.now(timezone.utc),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ScopusProbe.search_string_id],
+            set_={
+                "is_valid": stmt.excluded.is_valid,
+                "n_results": stmt.excluded.n_results,
+                "probed_at": stmt.excluded.probed_at,
+            },
+        )
+
+        session.execute(stmt)
@@ -0,0 +1,58 @@
+from typing import TYPE_CHECKING
+
+from sqlalchemy import (
+    ForeignKey,
+    Integer,
+    select,
+)
+from sqlalchemy.orm import (
+    Mapped,
+    Session,
+    mapped_column,
+    relationship,
+)
+
+from .base import Base
+
+
+if TYPE_CHECKING:
+    from .scopus_search_page import ScopusSearchPage
+
+
+class ScopusSearchCursor(Base):
+    """Pagination state of a search string on Scopus.
+
+    The pages fetched so far are saved as `ScopusSearchPage` rows, so an interrupted
+    search can continue from where it stopped.
+    """
+
+    __tablename__ = "scopus_search_cursor"
+
+    id: Mapped[int] = mapped_column(primary_key=True, init=False)
+
+    search_string_id: Mapped[int] = mapped_column(
+        ForeignKey("search_string.id"),
+        unique=True,
+        nullable=False,
+    )
+
+    n_results: Mapped[int] = mapped_column(Integer())
+    n_pages: Mapped[int] = mapped_column(Integer())
+
+    pages: Mapped[list["ScopusSearchPage"]] = relationship(
+        back_populates="cursor",
+        order_by="asc(ScopusSearchPage.page)",
+        default_factory=list,
+    )
+
+    @classmethod
+    def get_one_or_none(
+        cls,
+        search_string_id: int,
+        session: Session,
+    ):
+        stmt = select(ScopusSearchCursor).where(
+            ScopusSearchCursor.search_string_id == search_string_id
+        )
+
+        return session.execute(stmt).scalar_one_or_none()
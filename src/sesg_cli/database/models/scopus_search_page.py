@@ -0,0 +1,91 @@
+from typing import TYPE_CHECKING, Any, Iterator
+
+from sqlalchemy import (
+    ForeignKey,
+    Integer,
+    UniqueConstraint,
+    select,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import (
+    Mapped,
+    Session,
+    mapped_column,
+    relationship,
+)
+
+from .base import Base
+
+
+if TYPE_CHECKING:
+    from sesg.scopus import Page
+
+    from .scopus_search_cursor import ScopusSearchCursor
+
+
+class ScopusSearchPage(Base):
+    __tablename__ = "scopus_search_page"
+
+    id: Mapped[int] = mapped_column(primary_key=True, init=False)
+
+    page: Mapped[int] = mapped_column(Integer())
+    entries: Mapped[list[dict[str, Any]]] = mapped_column(JSONB())
+
+    cursor_id: Mapped[int] = mapped_column(
+        ForeignKey("scopus_search_cursor.id"),
+        nullable=False,
+        init=False,
+    )
+    cursor: Mapped["ScopusSearchCursor"] = relationship(
+        back_populates="pages",
+        init=False,
+    )
+
+    __table_args__ = (UniqueConstraint("cursor_id", "page"),)
+
+    @classmethod
+    def from_page(cls, page: "Page") -> "ScopusSearchPage":
+        return ScopusSearchPage(
+            page=page.current_page,
+            entries=[
+                {
+                    "scopus_id": e.scopus_id,
+                    "title": e.title,
+                    "cover_date": e._rest.get("prism:coverDate"),
+                }
+                for e in page.entries
+            ],
+        )
+
+    @classmethod
+    def get_page_numbers(
+        cls,
+        cursor_id: int,
+        session: Session,
+    ) -> set[int]:
+        stmt = select(ScopusSearchPage.page).where(
+            ScopusSearchPage.cursor_id == cursor_id
+        )
+
+        return set(session.execute(stmt).scalars().all())
+
+    @classmethod
+    def stream_by_cursor(
+        cls,
+        cursor_id: int,
+        session: Session,
+        yield_per: int = 10,
+    ) -> Iterator["ScopusSearchPage"]:
+        """Yields the saved pages of a cursor, loading `yield_per` pages at a time."""
+        stmt = (
+            select(ScopusSearchPage)
+            .where(ScopusSearchPage.cursor_id == cursor_id)
+            .order_by(ScopusSearchPage.page)
+            .execution_options(yield_per=yield_per)
+        )
+
+        yield from session.execute(stmt).scalars()
+
+    @property
+    def titles(self) -> list[str]:
+        return [e["title"] for e in self.entries]
@@ -2,6 +2,7 @@ from typing import TYPE_CHECKING, Optional
 
 from sqlalchemy import (
     Text,
+    func,
     select,
 )
 from sqlalchemy.orm import (
@@ -57,3 +58,48 @@ class SearchString(Base):
         stmt = select(SearchString).where(SearchString.id == id)
 
         return session.execute(stmt).scalar_one()
+
+    @classmethod
+    def get_pending_batch(
+        cls,
+        session: Session,
+        after_id: int = 0,
+        limit: int = 100,
+    ) -> list[tuple["SearchString", int]]:
+        """Gets search strings that were not searched yet, from every experiment.
+
+        Strings are ordered by ID, and only strings with an ID greater than `after_id`
+        are returned, so the pending strings can be paginated.
+
+        Returns:
+            List of tuples with the search string and the ID of the first experiment it belongs to.
+        """  # noqa: E501
+        from .params import Params
+        from .search_string_performance import SearchStringPerformance
+
+        stmt = (
+            select(SearchString, func.min(Params.experiment_id))
+            .join(SearchString.params_list)
+            .join(SearchString.performance, isouter=True)
+            .where(SearchStringPerformance.id.is_(None))
+            .where(SearchString.id > after_id)
+            .group_by(SearchString.id)
+            .order_by(SearchString.id)
+            .limit(limit)
+        )
+
+        return [(s, experiment_id) for s, experiment_id in session.execute(stmt)]
+
+    @classmethod
+    def count_pending(cls, session: Session) -> int:
+        from .params import Params
+        from .search_string_performance import SearchStringPerformance
+
+        stmt = (
+            select(func.count(func.distinct(SearchString.id)))
+            .join(Params, Params.search_string_id == SearchString.id)
+            .join(SearchString.performance, isouter=True)
+            .where(SearchStringPerformance.id.is_(None))
+        )
+
+        return session.execute(stmt).scalar_one()
@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    select,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import (
+    Mapped,
+    Session,
+    mapped_column,
+)
+
+from .base import Base
+
+
+class SearchStringEstimate(Base):
+    """Estimated performance of a search string, evaluated locally against the documents already fetched from Scopus and the GS of a SLR.
+
+    Created by `sesg scopus estimate`, and used to skip strings with a low estimated recall.
+    """  # noqa: E501
+
+    __tablename__ = "search_string_estimate"
+
+    search_string_id: Mapped[int] = mapped_column(
+        ForeignKey("search_string.id"),
+        primary_key=True,
+    )
+    slr_id: Mapped[int] = mapped_column(ForeignKey("slr.id"), primary_key=True)
+
+    n_estimated_results: Mapped[int] = mapped_column(Integer())
+    n_gs_matched: Mapped[int] = mapped_column(Integer())
+    estimated_recall: Mapped[float] = mapped_column(Float())
+    n_indexed_documents: Mapped[int] = mapped_column(Integer())
+
+    estimated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default_factory=lambda: datetime.now(timezone.utc),
+    )
+
+    @classmethod
+    def get_by_slr(
+        cls,
+        slr_id: int,
+        session: Session,
+    ) -> dict[int, "SearchStringEstimate"]:
+        """Maps the ID of each estimated string of the SLR to its estimate."""
+        stmt = select(SearchStringEstimate).where(SearchStringEstimate.slr_id == slr_id)
+
+        return {e.search_string_id: e for e in session.execute(stmt).scalars()}
+
+    @classmethod
+    def save_many(
+        cls,
+        estimates: list["SearchStringEstimate"],
+        session: Session,
+    ) -> None:
+        if not estimates:
+            return
+
+        stmt = insert(SearchStringEstimate)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                SearchStringEstimate.search_string_id,
+                SearchStringEstimate.slr_id,
+            ],
+            set_={
+                "n_estimated_results": stmt.excluded.n_estimated_results,
+                "n_gs_matched": stmt.excluded.n_gs_matched,
+                "estimated_recall": stmt.excluded.estimated_recall,
+                "n_indexed_documents": stmt.excluded.n_indexed_documents,
+                "estimated_at": stmt.excluded.estimated_at,
+            },
+        )
+
+        session.execute(
+            stmt,
+            [
+                {
+                    "search_string_id": e.search_string_id,
+                    "slr_id": e.slr_id,
+                    "n_estimated_results": e.n_estimated_results,
+                    "n_gs_matched": e.n_gs_matched,
+                    "estimated_recall": e.estimated_recall,
+                    "n_indexed_documents": e.n_indexed_documents,
+                    "estimated_at": e.estimated_at,
+                }
+                for e in estimates
+            ],
+        )
+        session.commit()
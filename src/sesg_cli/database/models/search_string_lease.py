@@ -0,0 +1,162 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import (
+    DateTime,
+    ForeignKey,
+    Integer,
+    Text,
+    and_,
+    delete,
+    exists,
+    func,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import (
+    Mapped,
+    Session,
+    mapped_column,
+)
+
+from .base import Base
+
+
+class SearchStringLease(Base):
+    """Lease of a search string by a worker.
+
+    While the lease is not expired, no other worker will search the string. If a
+    worker crashes, its leases expire and the strings are claimed by other workers.
+    """
+
+    __tablename__ = "search_string_lease"
+
+    search_string_id: Mapped[int] = mapped_column(
+        ForeignKey("search_string.id"),
+        primary_key=True,
+    )
+
+    worker_id: Mapped[str] = mapped_column(Text())
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    n_attempts: Mapped[int] = mapped_column(Integer(), default=1)
+
+    @classmethod
+    def claim(
+        cls,
+        experiment_id: int,
+        worker_id: str,
+        lease_duration: timedelta,
+        session: Session,
+        limit: int = 1,
+        max_attempts: int = 3,
+    ) -> list[int]:
+        """Leases search strings of the experiment that were not searched yet.
+
+        Uses `FOR UPDATE SKIP LOCKED`, so concurrent workers never claim the same
+        strings. Strings whose lease expired are claimed again, unless they were
+        already claimed `max_attempts` times.
+
+        Returns:
+            List with the IDs of the claimed search strings.
+        """
+        from .params import Params
+        from .search_string import SearchString
+        from .search_string_performance import SearchStringPerformance
+
+        candidates_stmt = (
+            select(SearchString.id)
+            .join(SearchString.performance, isouter=True)
+            .join(
+                SearchStringLease,
+                SearchStringLease.search_string_id == SearchString.id,
+                isouter=True,
+            )
+            .where(SearchStringPerformance.id.is_(None))
+            .where(
+                or_(
+                    SearchStringLease.search_string_id.is_(None),
+                    and_(
+                        SearchStringLease.expires_at < func.now(),
+                        SearchStringLease.n_attempts < max_attempts,
+                    ),
+                )
+            )
+            .where(
+                exists().where(
+                    Params.search_string_id == SearchString.id,
+                    Params.experiment_id == experiment_id,
+                )
+            )
+            .order_by(SearchString.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True, of=SearchString)
+        )
+
+        candidates = session.execute(candidates_stmt).scalars().all()
+
+        if not candidates:
+            session.commit()
+            return []
+
+        # the upsert only succeeds if the lease is still available,
+        # even if another worker leased the string after the select above
+        stmt = insert(SearchStringLease).values(
+            [
+                {
+                    "search_string_id": search_string_id,
+                    "worker_id": worker_id,
+                    "expires_at": func.now() + lease_duration,
+                    "n_attempts": 1,
+                }
+                for search_string_id in candidates
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SearchStringLease.search_string_id],
+            set_={
+                "worker_id": stmt.excluded.worker_id,
+                "expires_at": stmt.excluded.expires_at,
+                "n_attempts": SearchStringLease.n_attempts + 1,
+            },
+            where=SearchStringLease.expires_at < func.now(),
+        ).returning(SearchStringLease.search_string_id)
+
+        claimed = session.execute(stmt).scalars().all()
+        session.commit()
+
+        return list(claimed)
+
+    @classmethod
+    def renew(
+        cls,
+        search_string_ids: list[int],
+        worker_id: str,
+        lease_duration: timedelta,
+        session: Session,
+    ) -> None:
+        stmt = (
+            update(SearchStringLease)
+            .where(SearchStringLease.search_string_id.in_(search_string_ids))
+            .where(SearchStringLease.worker_id == worker_id)
+            .values(expires_at=func.now() + lease_duration)
+        )
+
+        session.execute(stmt)
+        session.commit()
+
+    @classmethod
+    def release(
+        cls,
+        search_string_id: int,
+        worker_id: str,
+        session: Session,
+    ) -> None:
+        stmt = (
+            delete(SearchStringLease)
+            .where(SearchStringLease.search_string_id == search_string_id)
+            .where(SearchStringLease.worker_id == worker_id)
+        )
+
+        session.execute(stmt)
+        session.commit()
@@ -1,11 +1,17 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterator
 
 from sqlalchemy import (
+    ColumnElement,
     Float,
     ForeignKey,
+    Index,
     Integer,
-    text
+    Numeric,
+    Select,
+    cast,
+    func
 )
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import (
     Mapped,
     mapped_column,
@@ -17,6 +23,8 @@ from .association_tables import gs_in_bsb, gs_in_sb, gs_in_scopus, qgs_in_scopus
 from .base import Base
 
 if TYPE_CHECKING:
+    from sesg_cli.concurrent_queries import ConcurrentQueries
+
     from .search_string import SearchString
     from .study import Study
 
@@ -27,29 +35,71 @@ class ReviewDoesNotExist(Exception):
 
 class SearchStringPerformance(Base):
     __tablename__ = "search_string_performance"
+    __table_args__ = (
+        Index(
+            "ix_search_string_performance_qgs_in_scopus_ids",
+            "qgs_in_scopus_ids",
+            postgresql_using="gin",
+        ),
+        Index(
+            "ix_search_string_performance_gs_in_scopus_ids",
+            "gs_in_scopus_ids",
+            postgresql_using="gin",
+        ),
+        Index(
+            "ix_search_string_performance_gs_in_bsb_ids",
+            "gs_in_bsb_ids",
+            postgresql_using="gin",
+        ),
+        Index(
+            "ix_search_string_performance_gs_in_sb_ids",
+            "gs_in_sb_ids",
+            postgresql_using="gin",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, init=False)
 
     n_scopus_results: Mapped[int] = mapped_column(Integer())
 
     n_qgs_in_scopus: Mapped[int]
+    qgs_in_scopus_ids: Mapped[list[int]] = mapped_column(
+        ARRAY(Integer()),
+    )
     qgs_in_scopus: Mapped[list["Study"]] = relationship(
         secondary=qgs_in_scopus,
+        viewonly=True,
+        init=False,
     )
 
     n_gs_in_scopus: Mapped[int]
+    gs_in_scopus_ids: Mapped[list[int]] = mapped_column(
+        ARRAY(Integer()),
+    )
     gs_in_scopus: Mapped[list["Study"]] = relationship(
         secondary=gs_in_scopus,
+        viewonly=True,
+        init=False,
     )
 
     n_gs_in_bsb: Mapped[int]
+    gs_in_bsb_ids: Mapped[list[int]] = mapped_column(
+        ARRAY(Integer()),
+    )
     gs_in_bsb: Mapped[list["Study"]] = relationship(
         secondary=gs_in_bsb,
+        viewonly=True,
+        init=False,
     )
 
     n_gs_in_sb: Mapped[int]
+    gs_in_sb_ids: Mapped[list[int]] = mapped_column(
+        ARRAY(Integer()),
+    )
     gs_in_sb: Mapped[list["Study"]] = relationship(
         secondary=gs_in_sb,
+        viewonly=True,
+        init=False,
     )
 
     start_set_precision: Mapped[float] = mapped_column(Float())
@@ -83,17 +133,46 @@ class SearchStringPerformance(Base):
             bsb_recall: float,
             sb_recall: float,
             search_string_id: int,
+    ) -> "SearchStringPerformance":
+        return cls.from_studies_ids(
+            n_scopus_results=n_scopus_results,
+            qgs_in_scopus_ids=[s.id for s in qgs_in_scopus],
+            gs_in_scopus_ids=[s.id for s in gs_in_scopus],
+            gs_in_bsb_ids=[s.id for s in gs_in_bsb],
+            gs_in_sb_ids=[s.id for s in gs_in_sb],
+            start_set_precision=start_set_precision,
+            start_set_recall=start_set_recall,
+            start_set_f1_score=start_set_f1_score,
+            bsb_recall=bsb_recall,
+            sb_recall=sb_recall,
+            search_string_id=search_string_id,
+        )
+
+    @classmethod
+    def from_studies_ids(
+            cls,
+            n_scopus_results: int,
+            qgs_in_scopus_ids: list[int],
+            gs_in_scopus_ids: list[int],
+            gs_in_bsb_ids: list[int],
+            gs_in_sb_ids: list[int],
+            start_set_precision: float,
+            start_set_recall: float,
+            start_set_f1_score: float,
+            bsb_recall: float,
+            sb_recall: float,
+            search_string_id: int,
     ) -> "SearchStringPerformance":
         return SearchStringPerformance(
             n_scopus_results=n_scopus_results,
-            qgs_in_scopus=qgs_in_scopus,
-            n_qgs_in_scopus=len(qgs_in_scopus),
-            gs_in_scopus=gs_in_scopus,
-            n_gs_in_scopus=len(gs_in_scopus),
-            gs_in_bsb=gs_in_bsb,
-            n_gs_in_bsb=len(gs_in_bsb),
-            gs_in_sb=gs_in_sb,
-            n_gs_in_sb=len(gs_in_sb),
+            qgs_in_scopus_ids=qgs_in_scopus_ids,
+            n_qgs_in_scopus=len(qgs_in_scopus_ids),
+            gs_in_scopus_ids=gs_in_scopus_ids,
+            n_gs_in_scopus=len(gs_in_scopus_ids),
+            gs_in_bsb_ids=gs_in_bsb_ids,
+            n_gs_in_bsb=len(gs_in_bsb_ids),
+            gs_in_sb_ids=gs_in_sb_ids,
+            n_gs_in_sb=len(gs_in_sb_ids),
             start_set_precision=start_set_precision,
             start_set_recall=start_set_recall,
             start_set_f1_score=start_set_f1_score,
@@ -103,30 +182,82 @@ class SearchStringPerformance(Base):
         )
 
     @staticmethod
-    def get_results(queries: dict[str, str], check_review_query: str, session: Session) -> dict[str, dict]:
+    def get_values_aggregates() -> list[ColumnElement]:
+        """Sums of the values of the performances, which change when any of them is updated.
+
+        The sums of the metrics are rounded, so they do not depend on the order the rows are added in.
+        """  # noqa: E501
+        counts = (
+            SearchStringPerformance.n_scopus_results,
+            SearchStringPerformance.n_qgs_in_scopus,
+            SearchStringPerformance.n_gs_in_scopus,
+            SearchStringPerformance.n_gs_in_bsb,
+            SearchStringPerformance.n_gs_in_sb,
+        )
+        metrics = (
+            SearchStringPerformance.start_set_precision,
+            SearchStringPerformance.start_set_recall,
+            SearchStringPerformance.start_set_f1_score,
+            SearchStringPerformance.bsb_recall,
+            SearchStringPerformance.sb_recall,
+        )
+
+        return [
+            *(func.sum(column) for column in counts),
+            *(func.round(cast(func.sum(column), Numeric()), 6) for column in metrics),
+        ]
+
+    @staticmethod
+    def _stream_query(query: Select, session: Session, yield_per: int) -> Iterator:
+        # executed only when iterated, so the queries use the session one at a time
+        yield from session.execute(query.execution_options(yield_per=yield_per))
+
+    @staticmethod
+    def get_results(
+            queries: dict[str, Select],
+            check_review_query: Select,
+            session: Session,
+            yield_per: int = 1000,
+            concurrent_queries: 'ConcurrentQueries | None' = None,
+    ) -> dict[str, dict]:
         """
         Responsible for retrieving all the data needed to construct a results Excel file.
 
+        The rows are streamed from a server-side cursor, `yield_per` rows at a time, while they are iterated.
+        So, the results must be iterated one at a time, in order, and while the session is open.
+
+        With `concurrent_queries`, the queries are started at once, each on its own connection, instead of when
+        their results are iterated, so they run while the results of the previous ones are consumed. The results
+        must then be iterated while `concurrent_queries` is open.
+
         Args:
             queries: all the queries necessary to compose the final Excel file.
             check_review_query: query to ensure the SLR exists.
             session: A db session.
+            yield_per: number of rows fetched at a time from the database, without `concurrent_queries`.
+            concurrent_queries: runs the queries concurrently, if given.
 
         Returns: a dictionary with the following structure:
             {'{query_name}': {'columns': all the columns that were in the select statement
-                            'data': all the Rows resulting of the query}}
+                            'types': the SQLAlchemy types of the columns
+                            'data': an iterator over the Rows resulting of the query}}
 
         """
         results: dict = dict()
 
-        review_exists: bool = session.execute(text(check_review_query)).scalar()
+        review_exists: bool = session.execute(check_review_query).scalar()
 
         if not review_exists:
             raise ReviewDoesNotExist()
 
         for query_name, query in queries.items():
-            cursor = session.execute(text(query))
-            exec_results = cursor.fetchall()
-            results[query_name] = {'columns': tuple(cursor.keys()), 'data': exec_results}
+            if concurrent_queries is not None:
+                data = concurrent_queries.stream(query)
+            else:
+                data = SearchStringPerformance._stream_query(query, session, yield_per)
+
+            results[query_name] = {'columns': tuple(column.key for column in query.selected_columns),
+                                   'types': tuple(column.type for column in query.selected_columns),
+                                   'data': data}
 
         return results
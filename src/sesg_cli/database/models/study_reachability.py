@@ -0,0 +1,81 @@
+from sqlalchemy import (
+    ForeignKey,
+    Integer,
+    delete,
+    insert,
+    select,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import (
+    Mapped,
+    Session,
+    mapped_column,
+)
+
+from .base import Base
+from .reachability_fingerprint import ReachabilityFingerprint
+
+
+class StudyReachability(Base):
+    """GS studies reachable from a study through snowballing.
+
+    `bsb_ids` holds the studies found by backward snowballing starting from the study,
+    and `sb_ids` the ones found by backward or forward snowballing. Both include the
+    study itself.
+    """
+
+    __tablename__ = "study_reachability"
+
+    study_id: Mapped[int] = mapped_column(ForeignKey("study.id"), primary_key=True)
+    slr_id: Mapped[int] = mapped_column(ForeignKey("slr.id"), index=True)
+
+    bsb_ids: Mapped[list[int]] = mapped_column(ARRAY(Integer()))
+    sb_ids: Mapped[list[int]] = mapped_column(ARRAY(Integer()))
+
+    @classmethod
+    def get_by_slr(
+        cls,
+        slr_id: int,
+        session: Session,
+    ) -> list["StudyReachability"]:
+        stmt = select(StudyReachability).where(StudyReachability.slr_id == slr_id)
+
+        return list(session.execute(stmt).scalars().all())
+
+    @classmethod
+    def replace_for_slr(
+        cls,
+        slr_id: int,
+        reachability: dict[int, tuple[list[int], list[int]]],
+        fingerprint: str,
+        session: Session,
+    ) -> None:
+        """Replaces the reachability of the studies of the SLR, and commits.
+
+        Args:
+            slr_id (int): ID of the SLR.
+            reachability (dict[int, tuple[list[int], list[int]]]): Maps a study ID to its BSB and SB reachable study IDs.
+            fingerprint (str): Hash of the GS and citations the reachability was computed with.
+            session (Session): A db session.
+        """  # noqa: E501
+        session.execute(
+            delete(StudyReachability).where(StudyReachability.slr_id == slr_id)
+        )
+
+        if reachability:
+            session.execute(
+                insert(StudyReachability),
+                [
+                    {
+                        "study_id": study_id,
+                        "slr_id": slr_id,
+                        "bsb_ids": bsb_ids,
+                        "sb_ids": sb_ids,
+                    }
+                    for study_id, (bsb_ids, sb_ids) in reachability.items()
+                ],
+            )
+
+        ReachabilityFingerprint.save(slr_id, fingerprint, session)
+
+        session.commit()
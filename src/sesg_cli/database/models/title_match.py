@@ -0,0 +1,68 @@
+from typing import Optional
+
+from sqlalchemy import (
+    BigInteger,
+    ForeignKey,
+    select,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import (
+    Mapped,
+    Session,
+    mapped_column,
+)
+
+from .base import Base
+
+
+class TitleMatch(Base):
+    """Memo of which GS study (if any) a Scopus title matches.
+
+    Titles are stored as hashes of their processed version. A `study_id` of `None`
+    means the title does not match any study of the SLR's GS.
+    """
+
+    __tablename__ = "title_match"
+
+    slr_id: Mapped[int] = mapped_column(ForeignKey("slr.id"), primary_key=True)
+    title_hash: Mapped[int] = mapped_column(BigInteger(), primary_key=True)
+
+    study_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("study.id"),
+        nullable=True,
+        default=None,
+    )
+
+    @classmethod
+    def get_matches(
+        cls,
+        slr_id: int,
+        title_hashes: list[int],
+        session: Session,
+    ) -> dict[int, int | None]:
+        stmt = select(TitleMatch.title_hash, TitleMatch.study_id).where(
+            TitleMatch.slr_id == slr_id,
+            TitleMatch.title_hash.in_(title_hashes),
+        )
+
+        return dict(session.execute(stmt).tuples())
+
+    @classmethod
+    def save_matches(
+        cls,
+        slr_id: int,
+        matches: dict[int, int | None],
+        session: Session,
+    ) -> None:
+        if not matches:
+            return
+
+        stmt = insert(TitleMatch).on_conflict_do_nothing()
+        session.execute(
+            stmt,
+            [
+                {"slr_id": slr_id, "title_hash": title_hash, "study_id": study_id}
+                for title_hash, study_id in matches.items()
+            ],
+        )
+        session.commit()
@@ -1,11 +1,120 @@
+import heapq
 from itertools import product
+from typing import Iterable, Iterator
+
+from sqlalchemy import (
+    CompoundSelect,
+    Integer,
+    Select,
+    Table,
+    Text,
+    cast,
+    exists,
+    func,
+    literal,
+    null,
+    select,
+    true,
+    union_all,
+)
+
+from sesg_cli.database.models import (
+    SLR,
+    Experiment,
+    Params,
+    SearchStringPerformance,
+    Study,
+    experiment_qgs,
+    results_bt,
+    results_lda,
+    studies_citations,
+)
+
+
+# columns that can be used to order the results
+_METRIC_COLUMNS = {
+    column.key: column
+    for column in (
+        SearchStringPerformance.start_set_precision,
+        SearchStringPerformance.start_set_recall,
+        SearchStringPerformance.start_set_f1_score,
+        SearchStringPerformance.bsb_recall,
+        SearchStringPerformance.sb_recall,
+    )
+}
+
+
+_NO_ROW = object()
 
 
 class AlgorithmBaseQueryNotImplemented(Exception):
     """There is no base query for the algorithm provided."""
 
 
+class MetricNotAvailable(Exception):
+    """The metric provided can not be used to order the results."""
+
+
+class _TopRows:
+    """
+    Keeps the `n` best rows according to a metric in a heap, in the same order of
+    Postgres' `order by {metric} desc`, where nulls come first. Of tied rows, the first ones pushed are kept.
+    """
+
+    def __init__(self, n: int, metric_idx: int):
+        self._n = n
+        self._metric_idx = metric_idx
+        self._heap: list = []
+        self._n_pushed = 0
+
+    def push(self, row):
+        value = row[self._metric_idx]
+
+        # the root of the heap is the worst row kept
+        entry = ((value is None, value if value is not None else 0), -self._n_pushed, row)
+        self._n_pushed += 1
+
+        if len(self._heap) < self._n:
+            heapq.heappush(self._heap, entry)
+        elif self._heap and entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def rows(self) -> Iterator:
+        for *_, row in sorted(self._heap, key=lambda entry: entry[:2], reverse=True):
+            yield row
+
+
+class _TopRowsPerExperiment:
+    """Keeps the `n` best rows of each experiment, adding the position of each row in its experiment."""
+
+    def __init__(self, n: int, metric_idx: int, name_idx: int):
+        self._n = n
+        self._metric_idx = metric_idx
+        self._name_idx = name_idx
+        self._top_rows: dict[str, _TopRows] = {}
+
+    def push(self, row):
+        name = row[self._name_idx]
+
+        if name not in self._top_rows:
+            self._top_rows[name] = _TopRows(self._n, self._metric_idx)
+
+        self._top_rows[name].push(row)
+
+    def rows(self) -> Iterator:
+        for name in sorted(self._top_rows):
+            for i, row in enumerate(self._top_rows[name].rows()):
+                yield (*row, i + 1)
+
+
 class ResultQuery:
+    """
+    Builds the queries used to compose the results Excel files of a SLR.
+
+    The queries are SQLAlchemy selects where the SLR name is a bound parameter, so the SQL sent to the database
+    is the same for every SLR, and its compiled form and plan can be reused.
+    """
+
     def __init__(
             self,
             slr: str,
@@ -13,119 +122,32 @@ class ResultQuery:
             bonus_algorithms: list[str] | None = None,
             row_num: int = 1,
     ):
-        self.check_review: str = f"""select
-                                case 
-                                    when count(*)>0 then true
-                                    else false
-                                end	
-                            from experiment e 
-                            join slr s on s.id = e.slr_id 
-                            where s."name" = '{slr}'"""
-
-        self._qgs_query: str = f"""select e."name", s.id, s.title 
-                                    from study s 
-                                    join experiment_qgs eq on eq.study_id = s.id
-                                    join experiment e on e.id = eq.experiment_id 
-                                    join slr on slr.id = e.slr_id 
-                                    where slr."name" = '{slr}'"""
-
-        self._results_queries: dict[str, str] = {
-            'lda': f"""select distinct on (ssp.search_string_id) ssp.search_string_id,
-                    ssp.start_set_precision,
-                    ssp.start_set_recall,
-                    ssp.start_set_f1_score,
-                    ssp.bsb_recall,
-                    ssp.sb_recall,
-                    lp.min_document_frequency as min_df,
-                    lp.n_topics as n_topics,
-                    fp.n_similar_words_per_word as n_similar_w,
-                    fp.n_words_per_topic as n_w_per_topic,
-                    ssp.n_scopus_results as n_scopus_results,
-                    ssp.n_qgs_in_scopus as n_qgs_studies_in_scopus,
-                    ssp.n_gs_in_scopus as n_gs_studies_in_scopus,
-                    e."name"
-                    from params
-                    join lda_params lp ON lp.id = params.lda_params_id
-                    join formulation_params fp ON fp.id = params.formulation_params_id
-                    join search_string ON search_string.id = params.search_string_id
-                    left join search_string_performance ssp ON ssp.search_string_id = search_string.id
-                    join experiment e ON e.id = params.experiment_id
-                    join slr s on s.id = e.slr_id
-                    where s."name" = '{slr}'""",
-            'bt': f"""select distinct on (ssp.search_string_id) ssp.search_string_id,
-                    ssp.start_set_precision,
-                    ssp.start_set_recall,
-                    ssp.start_set_f1_score,
-                    ssp.bsb_recall,
-                    ssp.sb_recall,
-                    bp.kmeans_n_clusters as n_clusters,
-                    bp.umap_n_neighbors as n_neighbors,
-                    fp.n_similar_words_per_word as n_similar_w,
-                    fp.n_words_per_topic as n_w_per_topic,
-                    ssp.n_scopus_results as n_scopus_results,
-                    ssp.n_qgs_in_scopus as n_qgs_studies_in_scopus,
-                    ssp.n_gs_in_scopus as n_gs_studies_in_scopus,
-                    e."name"
-                    from params
-                    join bertopic_params bp ON bp.id = params.bertopic_params_id 
-                    join formulation_params fp ON fp.id = params.formulation_params_id
-                    join search_string ON search_string.id = params.search_string_id
-                    left join search_string_performance ssp ON ssp.search_string_id = search_string.id
-                    join experiment e ON e.id = params.experiment_id
-                    join slr s on s.id = e.slr_id
-                    where s."name" = '{slr}'"""
+        self.check_review: Select = select(
+            exists()
+            .where(Experiment.slr_id == SLR.id)
+            .where(SLR.name == slr)
+        )
+
+        self.data_version: Select = self._generate_data_version_query(slr)
+
+        self._qgs_query: Select = (
+            select(Experiment.name, Study.id, Study.title)
+            .select_from(Study)
+            .join(experiment_qgs, experiment_qgs.c.study_id == Study.id)
+            .join(Experiment, Experiment.id == experiment_qgs.c.experiment_id)
+            .join(SLR, SLR.id == Experiment.slr_id)
+            .where(SLR.name == slr)
+        )
+
+        # the materialized view with the results of each algorithm
+        self._results_views: dict[str, Table] = {
+            'lda': results_lda,
+            'bt': results_bt,
         }
-        self._results_queries_by_row: dict[str, str] = {
-            'lda': f"""select 
-                            ssp.search_string_id as search_string_id,
-                            ssp.start_set_precision,
-                            ssp.start_set_recall,
-                            ssp.start_set_f1_score,
-                            ssp.bsb_recall,
-                            ssp.sb_recall,
-                            lp.min_document_frequency as min_df,
-                            lp.n_topics as n_topics,
-                            fp.n_similar_words_per_word as n_similar_w,
-                            fp.n_words_per_topic as n_w_per_topic,
-                            ssp.n_scopus_results as n_scopus_results,
-                            ssp.n_qgs_in_scopus as n_qgs_studies_in_scopus,
-                            ssp.n_gs_in_scopus as n_gs_studies_in_scopus,
-                            e."name",
-                            ROW_NUMBER() over (partition by e."name" order by ssp.{'placeholder'} desc) as row_num
-                        from params
-                            join lda_params lp ON lp.id = params.lda_params_id
-                            join formulation_params fp ON fp.id = params.formulation_params_id
-                            join search_string ON search_string.id = params.search_string_id
-                            left join search_string_performance ssp ON ssp.search_string_id = search_string.id
-                            join experiment e ON e.id = params.experiment_id
-                            join slr s on s.id = e.slr_id
-                        where 
-                            s."name" = '{slr}'""",
-            'bt': f"""select
-                            ssp.search_string_id as search_string_id,
-                            ssp.start_set_precision,
-                            ssp.start_set_recall,
-                            ssp.start_set_f1_score,
-                            ssp.bsb_recall,
-                            ssp.sb_recall,
-                            bp.kmeans_n_clusters as n_clusters,
-                            bp.umap_n_neighbors as n_neighbors,
-                            fp.n_similar_words_per_word as n_similar_w,
-                            fp.n_words_per_topic as n_w_per_topic,
-                            ssp.n_scopus_results as n_scopus_results,
-                            ssp.n_qgs_in_scopus as n_qgs_studies_in_scopus,
-                            ssp.n_gs_in_scopus as n_gs_studies_in_scopus,
-                            e."name",
-                            ROW_NUMBER() over (partition by e."name" order by ssp.{'placeholder'} desc) as row_num
-                        from params
-                            join bertopic_params bp ON bp.id = params.bertopic_params_id 
-                            join formulation_params fp ON fp.id = params.formulation_params_id
-                            join search_string ON search_string.id = params.search_string_id
-                            left join search_string_performance ssp ON ssp.search_string_id = search_string.id
-                            join experiment e ON e.id = params.experiment_id
-                            join slr s on s.id = e.slr_id
-                        where 
-                            s."name" = '{slr}'""",
+
+        self._results_queries: dict[str, Select] = {
+            algorithm: self._generate_base_query(slr, results_view)
+            for algorithm, results_view in self._results_views.items()
         }
 
         self._slr: str = slr
@@ -140,90 +162,319 @@ class ResultQuery:
         if bonus_metrics:
             self._metrics.extend(bonus_metrics)
 
+        if not set(self._metrics).issubset(_METRIC_COLUMNS):
+            raise MetricNotAvailable()
+
     def _set_algorithms(self, bonus_algorithms: list[str] | None):
         self._algorithms: list[str] = ['lda', 'bt']
 
         if bonus_algorithms:
             self._algorithms.extend(bonus_algorithms)
 
-    def _generate_top_ten_query(self, algorithm: str, metric: str) -> str:
+    @staticmethod
+    def _generate_data_version_query(slr: str) -> Select:
+        """
+        Generates the query of the version of the SLR data the results are made of: the max IDs and the counts of its
+        params and their performances, the sums of the values of the performances, and the counts of its QGS studies
+        and citations. Any of them changes when params, performances, QGS studies or citations are added or removed,
+        or when performances are updated.
+
+        Args:
+            slr: the SLR name.
+
+        Returns: A select returning a single row.
         """
-        Generates queries for the top 10 best strings according to the algorithm base query
-        and the metric to order the results.
+        slr_params = (
+            select(Params.id, Params.search_string_id)
+            .join(Experiment, Experiment.id == Params.experiment_id)
+            .join(SLR, SLR.id == Experiment.slr_id)
+            .where(SLR.name == slr)
+            .subquery()
+        )
+
+        params_version = (
+            select(func.max(slr_params.c.id), func.count())
+            .select_from(slr_params)
+            .subquery()
+        )
+        performances_version = (
+            select(func.max(SearchStringPerformance.id), func.count(), *SearchStringPerformance.get_values_aggregates())
+            .where(SearchStringPerformance.search_string_id.in_(select(slr_params.c.search_string_id)))
+            .subquery()
+        )
+        qgs_version = (
+            select(func.count())
+            .select_from(experiment_qgs)
+            .join(Experiment, Experiment.id == experiment_qgs.c.experiment_id)
+            .join(SLR, SLR.id == Experiment.slr_id)
+            .where(SLR.name == slr)
+            .subquery()
+        )
+        citations_version = (
+            select(func.count())
+            .select_from(studies_citations)
+            .join(Study, Study.id == studies_citations.c.study_id)
+            .join(SLR, SLR.id == Study.slr_id)
+            .where(SLR.name == slr)
+            .subquery()
+        )
+
+        # each subquery returns a single row, so they are joined on `true`
+        return (
+            select(params_version, performances_version, qgs_version, citations_version)
+            .select_from(
+                params_version
+                .join(performances_version, true())
+                .join(qgs_version, true())
+                .join(citations_version, true())
+            )
+        )
+
+    @staticmethod
+    def _generate_base_query(slr: str, results_view: Table) -> Select:
+        """
+        Generates the query with all the results of an algorithm, ordered by the search string.
 
         Args:
-            algorithm: `lda` or `bt` (bertopic).
-            metric: metrics avaible to order the results.
+            slr: name of the SLR.
+            results_view: the materialized view with the results of the algorithm.
+
+        Returns: the select statement.
+
+        """
+        columns = [column for column in results_view.c if column.key not in ('params_id', 'slr_id')]
 
-        Returns: the query added of the algorithm base query as subquery, the order by and limit statements.
+        return (
+            select(*columns)
+            .join_from(results_view, SLR, SLR.id == results_view.c.slr_id)
+            .where(SLR.name == slr)
+            .order_by(results_view.c.search_string_id)
+        )
 
+    @staticmethod
+    def _distinct_by_search_string(data: Iterable) -> Iterator:
         """
-        algorithm_query = self._results_queries.get(algorithm, None)
+        Yields the first row of each search string, like `distinct on (ssp.search_string_id)`.
+        The rows are ordered by search string, and the rows without performance have a null search string,
+        so they are collapsed into one row.
+        """
+        previous_search_string_id = _NO_ROW
+
+        for row in data:
+            if row[0] != previous_search_string_id or previous_search_string_id is _NO_ROW:
+                previous_search_string_id = row[0]
+                yield row
 
-        if not algorithm_query:
-            raise AlgorithmBaseQueryNotImplemented()
+    @staticmethod
+    def _push_rows(data: Iterable, top_rows_list: list) -> Iterator:
+        for row in data:
+            for top_rows in top_rows_list:
+                top_rows.push(row)
 
-        return f"select * from ({algorithm_query}) results " \
-               f"order by {metric} desc limit 10"
+            yield row
 
-    def _generate_query_by_row(self, algorithm: str, metric: str) -> str:
+    def get_queries(self) -> dict[str, Select]:
         """
-        Generates queries to get the best X results from each experiment according to the algorithm base query
-        and the metric to order the results..
+        Generates a dictionary with the queries needed to compose the Excel file for analysis.
+        Each algorithm base query is executed only once, and the top lists are derived from its results
+        by `derive_results` and `derive_results_by_row`.
+
+        Returns: A dict with the queries needed, they are:
+            - {algorithm}: all the {algorithm} results, ordered by the search string;
+            - qgs: all the experiments' QGSs;
+
+        """
+        queries: dict[str, Select] = {}
+
+        for algorithm in self._algorithms:
+            algorithm_query = self._results_queries.get(algorithm, None)
+
+            if algorithm_query is None:
+                raise AlgorithmBaseQueryNotImplemented()
+
+            queries[algorithm] = algorithm_query
+
+        queries['qgs'] = self._qgs_query
+
+        return queries
+
+    def _generate_statistics_queries(self, algorithm: str, columns: tuple[str, ...]) -> tuple[Select, Select]:
+        results_view = self._results_views[algorithm]
+        columns_with_results = (
+            select(results_view.c.search_string_id, *[results_view.c[column] for column in columns])
+            .join_from(results_view, SLR, SLR.id == results_view.c.slr_id)
+            .where(SLR.name == self._slr)
+            .where(results_view.c.n_scopus_results > 0)
+        )
+
+        # each search string is considered once, or once for each experiment it was generated in
+        performances = columns_with_results.distinct().subquery()
+        performances_by_experiment = columns_with_results.add_columns(results_view.c.name).distinct().subquery()
+
+        def aggregates(subquery) -> list:
+            return [
+                aggregate
+                for column in columns
+                for aggregate in (
+                    func.avg(subquery.c[column]).label(f'mean_{column}'),
+                    func.stddev_samp(subquery.c[column]).label(f'stdev_{column}'),
+                )
+            ]
+
+        overall_query = select(
+            literal(algorithm).label('algorithm'),
+            cast(null(), Text).label('name'),
+            *aggregates(performances),
+        )
+
+        by_experiment_query = (
+            select(
+                literal(algorithm).label('algorithm'),
+                performances_by_experiment.c.name,
+                *aggregates(performances_by_experiment),
+            )
+            .group_by(performances_by_experiment.c.name)
+        )
+
+        return overall_query, by_experiment_query
+
+    def get_statistics_query(self, columns: tuple[str, ...]) -> CompoundSelect:
+        """
+        Generates a single query with the mean and the sample standard deviation of the columns of
+        `search_string_performance`, for the search strings of each algorithm with Scopus results.
 
         Args:
-            algorithm: `lda` or `bt` (bertopic).
-            metric: metrics avaible to order the results.
+            columns: the columns of `search_string_performance` to be aggregated.
 
-        Returns: the query added of the algorithm base query as subquery and the order by statement.
+        Returns: the query, with the `algorithm`, `name`, `mean_{column}` and `stdev_{column}` columns.
+        The rows with a null `name` aggregate all the experiments, and the others aggregate each experiment.
 
         """
-        algorithm_query = self._results_queries_by_row.get(algorithm, None)
+        queries = []
+        for algorithm in self._algorithms:
+            if algorithm not in self._results_views:
+                raise AlgorithmBaseQueryNotImplemented()
 
-        if not algorithm_query:
-            raise AlgorithmBaseQueryNotImplemented()
+            queries.extend(self._generate_statistics_queries(algorithm, columns))
 
-        algorithm_query = algorithm_query.replace('placeholder', metric)
+        return union_all(*queries)
 
-        return f"""select * from ({algorithm_query}) results
-                    where row_num <= {self._row_num} 
-                    order by "name" asc"""
+    def _derive_sheets(
+            self,
+            results: dict[str, dict],
+            top_ten: bool,
+            top_per_experiment: bool,
+    ) -> tuple[dict[str, dict], dict[str, dict]]:
+        """
+        Derives the sheets of both Excel files from the results of the queries in `get_queries`, keeping only the
+        top lists that were asked for. The rows are consumed only once, as they are streamed from the database,
+        and every top list is kept in a heap while the algorithm results are iterated.
 
-    def get_queries(self) -> dict[str, str]:
+        Returns: the sheets of the top ten Excel file, and the ones of the top per experiment Excel file.
+        The `{algorithm}` and `qgs` sheets are the same objects on both.
         """
-        Generates a dictionary with all the queries needed to compose the Excel file for analysis.
+        sheets: dict[str, dict] = {}
+        sheets_by_row: dict[str, dict] = {}
+        top_sheets: dict[str, dict] = {}
+
+        for algorithm in self._algorithms:
+            columns = results[algorithm]['columns']
+            types = results[algorithm]['types']
+
+            top_rows_by_metric = {}
+            if top_ten:
+                top_rows_by_metric = {metric: _TopRows(10, columns.index(metric)) for metric in self._metrics}
+
+            top_rows_per_experiment_by_metric = {}
+            if top_per_experiment:
+                top_rows_per_experiment_by_metric = {
+                    metric: _TopRowsPerExperiment(self._row_num, columns.index(metric), columns.index('name'))
+                    for metric in self._metrics
+                }
+
+            # the repeated search strings are also considered on the top lists of each experiment,
+            # but not on the top ten lists
+            data = self._push_rows(results[algorithm]['data'], list(top_rows_per_experiment_by_metric.values()))
+            data = self._push_rows(self._distinct_by_search_string(data), list(top_rows_by_metric.values()))
+
+            sheets[algorithm] = sheets_by_row[algorithm] = {'columns': columns, 'types': types, 'data': data}
+
+            for metric, top_rows in top_rows_by_metric.items():
+                top_sheets[f'top_ten_{algorithm}_{metric}'] = {'columns': columns,
+                                                               'types': types,
+                                                               'data': top_rows.rows()}
+
+            for metric, top_rows in top_rows_per_experiment_by_metric.items():
+                top_sheets[f'top_{self._row_num}_{algorithm}_{metric}'] = {
+                    'columns': (*columns, 'row_num'),
+                    'types': (*types, Integer()),
+                    'data': top_rows.rows(),
+                }
 
-        Returns: A dict with the queries needed, they are:
+        for metric, algorithm in product(self._metrics, self._algorithms):
+            if top_ten:
+                sheet_name = f'top_ten_{algorithm}_{metric}'
+                sheets[sheet_name] = top_sheets[sheet_name]
+
+            if top_per_experiment:
+                sheet_name = f'top_{self._row_num}_{algorithm}_{metric}'
+                sheets_by_row[sheet_name] = top_sheets[sheet_name]
+
+        sheets['qgs'] = sheets_by_row['qgs'] = results['qgs']
+
+        return sheets, sheets_by_row
+
+    def derive_results(self, results: dict[str, dict]) -> dict[str, dict]:
+        """
+        Derives all the sheets of the Excel file for analysis from the results of the queries in `get_queries`.
+
+        The rows are consumed only once, as they are streamed from the database: the top lists are kept in heaps
+        while the algorithm results are iterated, so they must be iterated in order.
+
+        Args:
+            results: the results of the queries, as returned by `SearchStringPerformance.get_results`.
+
+        Returns: A dict with the results of each sheet, they are:
             - {algorithm}: all the {algorithm} results;
-            - qgs: all the experiments' QGSs;
             - top_ten_{algorithm}_{metric}: top ten {algorithm} results ordered by the {metric};
+            - qgs: all the experiments' QGSs;
 
         """
-        for metric, algorithm in product(self._metrics, self._algorithms):
-            self._results_queries[f'top_ten_{algorithm}_{metric}'] = self._generate_top_ten_query(algorithm,
-                                                                                                  metric)
-        self._results_queries['qgs'] = self._qgs_query
+        sheets, _ = self._derive_sheets(results, top_ten=True, top_per_experiment=False)
 
-        return self._results_queries
+        return sheets
 
-    def get_queries_by_row(self) -> dict[str, str]:
+    def derive_results_by_row(self, results: dict[str, dict]) -> dict[str, dict]:
         """
-        Generates a dictionary with all the queries needed to compose the Excel file for analysis,
+        Derives all the sheets of the Excel file for analysis from the results of the queries in `get_queries`,
         by getting the best X results from each experiment.
 
-        Returns: A dict with the queries needed, they are:
+        As in `derive_results`, the rows are consumed only once, so the sheets must be iterated in order.
+
+        Args:
+            results: the results of the queries, as returned by `SearchStringPerformance.get_results`.
+
+        Returns: A dict with the results of each sheet, they are:
             - {algorithm}: all the {algorithm} results;
-            - qgs: all the experiments' QGSs;
             - top_{row_num}_{algorithm}_{metric}: top {row_num} results of each exp of each {algorithm}
-            ordered by the {metric};
+            ordered by the {metric}, with the position of each result in its experiment on the `row_num` column;
+            - qgs: all the experiments' QGSs;
         """
-        for metric, algorithm in product(self._metrics, self._algorithms):
-            self._results_queries[
-                f'top_{self._row_num}_{algorithm}_{metric}'
-            ] = self._generate_query_by_row(algorithm, metric)
+        _, sheets = self._derive_sheets(results, top_ten=False, top_per_experiment=True)
 
-        self._results_queries['qgs'] = self._qgs_query
+        return sheets
 
-        return self._results_queries
+    def derive_all_results(self, results: dict[str, dict]) -> tuple[dict[str, dict], dict[str, dict]]:
+        """
+        Derives the sheets of both `derive_results` and `derive_results_by_row` from a single fetch of the results
+        of the queries in `get_queries`.
 
+        The `{algorithm}` and `qgs` sheets are the same on both, and are returned as the same objects, since their
+        rows are consumed only once. So, they must be written to both Excel files while they are iterated.
 
+        Args:
+            results: the results of the queries, as returned by `SearchStringPerformance.get_results`.
+
+        Returns: the sheets of `derive_results`, and the ones of `derive_results_by_row`.
+        """
+        return self._derive_sheets(results, top_ten=True, top_per_experiment=True)
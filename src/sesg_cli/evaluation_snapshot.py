@@ -0,0 +1,220 @@
+import json
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session
+
+from sesg_cli.database.models import Study, experiment_qgs, studies_citations
+
+
+if TYPE_CHECKING:
+    from sesg.evaluation import Study as EvaluationStudy
+
+
+# directory where the snapshots are cached
+cache_dir = Path(
+    os.environ.get("SESG_CACHE_DIR", Path.home() / ".cache" / "sesg")
+).expanduser()
+
+
+@dataclass
+class SnapshotStudy:
+    id: int
+    title: str
+    references_ids: list[int]
+
+
+@dataclass
+class EvaluationSnapshot:
+    """GS and QGS of an experiment, as plain data needed to evaluate its search strings.
+
+    Loaded with a single query, and cached on `cache_dir` as a JSON file. The cached
+    file is used while the fingerprint of the GS, citations and QGS does not change.
+
+    Args:
+        slr_id (int): ID of the SLR.
+        experiment_id (int): ID of the experiment.
+        fingerprint (str): Hash of the GS, citations and QGS when the snapshot was taken.
+        gs (list[SnapshotStudy]): GS studies, along with the IDs of their references.
+        qgs_ids (list[int]): IDs of the QGS studies.
+    """  # noqa: E501
+
+    slr_id: int
+    experiment_id: int
+    fingerprint: str
+    gs: list[SnapshotStudy]
+    qgs_ids: list[int]
+
+    @classmethod
+    def from_db(
+        cls,
+        slr_id: int,
+        experiment_id: int,
+        fingerprint: str,
+        session: Session,
+    ) -> "EvaluationSnapshot":
+        references = (
+            select(
+                studies_citations.c.study_id,
+                func.array_agg(
+                    aggregate_order_by(
+                        studies_citations.c.reference_id,
+                        studies_citations.c.reference_id,
+                    )
+                ).label("references_ids"),
+            )
+            .where(
+                studies_citations.c.study_id.in_(
+                    select(Study.id).where(Study.slr_id == slr_id)
+                )
+            )
+            .group_by(studies_citations.c.study_id)
+            .subquery()
+        )
+
+        qgs = select(experiment_qgs.c.study_id).where(
+            experiment_qgs.c.experiment_id == experiment_id
+        )
+
+        stmt = (
+            select(
+                Study.id,
+                Study.title,
+                references.c.references_ids,
+                Study.id.in_(qgs).label("in_qgs"),
+            )
+            .join(references, references.c.study_id == Study.id, isouter=True)
+            .where(Study.slr_id == slr_id)
+            .order_by(Study.id)
+        )
+
+        gs: list[SnapshotStudy] = []
+        qgs_ids: list[int] = []
+        for study_id, title, references_ids, in_qgs in session.execute(stmt):
+            gs.append(SnapshotStudy(study_id, title, list(references_ids or [])))
+
+            if in_qgs:
+                qgs_ids.append(study_id)
+
+        return EvaluationSnapshot(
+            slr_id=slr_id,
+            experiment_id=experiment_id,
+            fingerprint=fingerprint,
+            gs=gs,
+            qgs_ids=qgs_ids,
+        )
+
+    @classmethod
+    def from_json(cls, path: Path) -> "EvaluationSnapshot":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        return EvaluationSnapshot(
+            slr_id=data["slr_id"],
+            experiment_id=data["experiment_id"],
+            fingerprint=data["fingerprint"],
+            gs=[SnapshotStudy(**s) for s in data["gs"]],
+            qgs_ids=data["qgs_ids"],
+        )
+
+    def to_json(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # written to a temporary file first,
+        # so a concurrent run never reads a partial snapshot
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f)
+
+        tmp_path.replace(path)
+
+    def to_evaluation_studies(
+        self,
+    ) -> tuple[list["EvaluationStudy"], list["EvaluationStudy"]]:
+        """Creates the GS and QGS used by `sesg.evaluation.EvaluationFactory`."""
+        from sesg.evaluation import Study as EvaluationStudy
+
+        titles = {s.id: s.title for s in self.gs}
+
+        gs = [
+            EvaluationStudy(
+                id=s.id,
+                title=s.title,
+                references=[
+                    EvaluationStudy(id=ref_id, title=titles[ref_id])
+                    for ref_id in s.references_ids
+                ],
+            )
+            for s in self.gs
+        ]
+
+        qgs_ids = set(self.qgs_ids)
+        qgs = [s for s in gs if s.id in qgs_ids]
+
+        return gs, qgs
+
+
+def get_fingerprint(slr_id: int, experiment_id: int, session: Session) -> str:
+    """Hash of the GS, citations and QGS of the experiment, computed on the database."""
+    stmt = text(
+        """
+        SELECT md5(concat(
+            (
+                SELECT string_agg(s.id || ':' || s.title, '|' ORDER BY s.id)
+                FROM study s
+                WHERE s.slr_id = :slr_id
+            ),
+            '#',
+            (
+                SELECT string_agg(
+                    c.study_id || ':' || c.reference_id,
+                    '|' ORDER BY c.study_id, c.reference_id
+                )
+                FROM studies_citations c
+                JOIN study s ON s.id = c.study_id
+                WHERE s.slr_id = :slr_id
+            ),
+            '#',
+            (
+                SELECT string_agg(q.study_id::text, '|' ORDER BY q.study_id)
+                FROM experiment_qgs q
+                WHERE q.experiment_id = :experiment_id
+            )
+        ))
+        """
+    )
+
+    return session.execute(
+        stmt,
+        {"slr_id": slr_id, "experiment_id": experiment_id},
+    ).scalar_one()
+
+
+def load_evaluation_snapshot(
+    slr_id: int,
+    experiment_id: int,
+    session: Session,
+) -> EvaluationSnapshot:
+    """Loads the snapshot from the cache, taking a new one if the GS, citations or QGS changed."""  # noqa: E501
+    fingerprint = get_fingerprint(slr_id, experiment_id, session)
+    path = cache_dir / "evaluation" / f"slr-{slr_id}-experiment-{experiment_id}.json"
+
+    if path.exists():
+        try:
+            snapshot = EvaluationSnapshot.from_json(path)
+
+            if snapshot.fingerprint == fingerprint:
+                return snapshot
+
+        except (json.JSONDecodeError, KeyError, TypeError):
+            # a corrupted snapshot is replaced by a new one
+            pass
+
+    snapshot = EvaluationSnapshot.from_db(slr_id, experiment_id, fingerprint, session)
+    snapshot.to_json(path)
+
+    return snapshot
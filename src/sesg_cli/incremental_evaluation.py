@@ -0,0 +1,104 @@
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from sesg.evaluation import EvaluationFactory
+    from sesg.evaluation.evaluation_factory import Evaluation
+
+    from sesg_cli.snowballing_reachability import SnowballingReachability
+    from sesg_cli.title_matching import TitleMatcher
+
+
+@dataclass
+class IncrementalEvaluation:
+    """Evaluates a search string consuming the Scopus results page by page.
+
+    Only the processed titles and the number of results are kept, instead of the whole
+    entries, and they are matched against the GS and QGS on `evaluate`, all at once, as
+    `EvaluationFactory.evaluate` does. The TF-IDF model of `sesg` is fitted on all the
+    titles, so matching each page separately could find different studies.
+
+    If a `title_matcher` is given, each page is matched as it is added instead, and
+    only the IDs of the studies found so far are kept. It does not use the rule of
+    `sesg` (see `TitleMatcher`).
+
+    If a `reachability` is given, the studies found by snowballing are taken from it,
+    instead of walking the citation graph.
+
+    Args:
+        evaluation_factory (EvaluationFactory): Factory holding the GS and QGS of the experiment.
+        title_matcher (TitleMatcher | None): Matcher of titles against the GS.
+        reachability (SnowballingReachability | None): Precomputed snowballing reachability of the GS.
+    """  # noqa: E501
+
+    evaluation_factory: "EvaluationFactory"
+    title_matcher: "TitleMatcher | None" = None
+    reachability: "SnowballingReachability | None" = None
+
+    n_scopus_results: int = field(default=0, init=False)
+    processed_titles: list[str] = field(default_factory=list, init=False)
+    gs_in_scopus_ids: set[int] = field(default_factory=set, init=False)
+    qgs_in_scopus_ids: set[int] = field(default_factory=set, init=False)
+
+    def add_titles(self, titles: list[str]) -> None:
+        """Adds the titles of a page."""
+        from sesg.evaluation.evaluation_factory import process_title
+
+        factory = self.evaluation_factory
+        self.n_scopus_results += len(titles)
+
+        if self.title_matcher is None:
+            self.processed_titles.extend(process_title(title) for title in titles)
+
+            return
+
+        gs_ids = self.title_matcher.match_titles(titles)
+
+        self.gs_in_scopus_ids.update(gs_ids)
+        self.qgs_in_scopus_ids.update(s.id for s in factory.qgs if s.id in gs_ids)
+
+    def _match_titles(self) -> None:
+        factory = self.evaluation_factory
+
+        self.gs_in_scopus_ids.update(
+            s.id for s in factory.get_gs_in_scopus(self.processed_titles)
+        )
+        self.qgs_in_scopus_ids.update(
+            s.id for s in factory.get_qgs_in_scopus(self.processed_titles)
+        )
+
+    def evaluate(self) -> "Evaluation":
+        """Creates the evaluation with the results consumed so far."""
+        from sesg.evaluation.evaluation_factory import Evaluation
+
+        factory = self.evaluation_factory
+
+        if self.title_matcher is None:
+            self._match_titles()
+
+        gs_in_scopus = [s for s in factory.gs if s.id in self.gs_in_scopus_ids]
+        qgs_in_scopus = [s for s in factory.qgs if s.id in self.qgs_in_scopus_ids]
+
+        if self.reachability is not None:
+            gs_in_bsb = [
+                factory.studies_dict[id]
+                for id in self.reachability.get_gs_in_bsb(self.gs_in_scopus_ids)
+            ]
+            gs_in_sb = [
+                factory.studies_dict[id]
+                for id in self.reachability.get_gs_in_sb(self.gs_in_scopus_ids)
+            ]
+
+        else:
+            gs_in_bsb = factory.get_gs_in_bsb(gs_in_scopus)
+            gs_in_sb = factory.get_gs_in_sb(gs_in_scopus)
+
+        return Evaluation(
+            qgs_in_scopus=qgs_in_scopus,
+            gs_in_scopus=gs_in_scopus,
+            gs_in_bsb=gs_in_bsb,
+            gs_in_sb=gs_in_sb,
+            gs_size=len(factory.gs),
+            n_scopus_results=self.n_scopus_results,
+        )
@@ -0,0 +1,194 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, TypeVar
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from sesg_cli.database.models import ScopusDocument, SearchStringPerformance
+
+
+T = TypeVar("T")
+
+
+async def write_in_thread(
+    session_factory: Callable[[], Session],
+    write: Callable[[Session], T],
+) -> T:
+    """Runs `write` on a worker thread with a new session, and commits.
+
+    So the event loop keeps fetching pages from Scopus while the database is written.
+    """
+
+    def run() -> T:
+        with session_factory() as session:
+            result = write(session)
+            session.commit()
+
+            return result
+
+    return await asyncio.to_thread(run)
+
+
+@dataclass
+class PerformanceRow:
+    """Values of a `SearchStringPerformance`.
+
+    Holds no ORM objects, so it can be written by a session other than the one that
+    loaded the studies.
+    """
+
+    values: dict[str, Any]
+
+    @classmethod
+    def from_performance(
+        cls,
+        performance: SearchStringPerformance,
+    ) -> "PerformanceRow":
+        return PerformanceRow(
+            values={
+                "n_scopus_results": performance.n_scopus_results,
+                "n_qgs_in_scopus": performance.n_qgs_in_scopus,
+                "qgs_in_scopus_ids": performance.qgs_in_scopus_ids,
+                "n_gs_in_scopus": performance.n_gs_in_scopus,
+                "gs_in_scopus_ids": performance.gs_in_scopus_ids,
+                "n_gs_in_bsb": performance.n_gs_in_bsb,
+                "gs_in_bsb_ids": performance.gs_in_bsb_ids,
+                "n_gs_in_sb": performance.n_gs_in_sb,
+                "gs_in_sb_ids": performance.gs_in_sb_ids,
+                "start_set_precision": performance.start_set_precision,
+                "start_set_recall": performance.start_set_recall,
+                "start_set_f1_score": performance.start_set_f1_score,
+                "bsb_recall": performance.bsb_recall,
+                "sb_recall": performance.sb_recall,
+                "search_string_id": performance.search_string_id,
+            },
+        )
+
+
+def write_performance_rows(rows: list[PerformanceRow], session: Session) -> None:
+    """Inserts the performances in bulk, and commits.
+
+    The studies found by each string are stored as arrays on the performance row, so a
+    single multi-row `INSERT` writes everything. In the same transaction, the pages
+    fetched for the strings are moved to the documents of their SLRs.
+    """
+    if not rows:
+        return
+
+    session.execute(
+        insert(SearchStringPerformance),
+        [row.values for row in rows],
+    )
+    ScopusDocument.move_from_pages(
+        [row.values["search_string_id"] for row in rows],
+        session,
+    )
+    session.commit()
+
+
+_STOP = object()
+
+
+@dataclass
+class PerformanceWriter:
+    """Saves performances on a background task, using a dedicated session.
+
+    Writes run on a worker thread, so the event loop keeps fetching pages from Scopus
+    while the previous performances are saved. Performances queued while a write is
+    running are saved together on the next one. If the queue is full, `put` waits for
+    the writer to catch up.
+
+    Use it as an async context manager, which waits for every queued performance to
+    be saved on exit.
+
+    Args:
+        session_factory (Callable[[], Session]): Creates the session used by the writer.
+        max_queue_size (int): Maximum number of performances waiting to be saved.
+        max_batch_size (int): Maximum number of performances saved by a single write.
+    """
+
+    session_factory: Callable[[], Session]
+    max_queue_size: int = 100
+    max_batch_size: int = 50
+
+    _queue: "asyncio.Queue[PerformanceRow | object]" = field(init=False)
+    _task: "asyncio.Task[None] | None" = field(default=None, init=False)
+
+    def __post_init__(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+
+    async def __aenter__(self) -> "PerformanceWriter":
+        self._task = asyncio.create_task(self._run())
+
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self._task is None:
+            return
+
+        if not self._task.done():
+            await self._queue.put(_STOP)
+
+        # raises the error of the writer, if any
+        await self._task
+
+    def _check_running(self) -> None:
+        if self._task is None:
+            raise RuntimeError("The writer was not started.")
+
+        if self._task.done():
+            # raises the error of the writer, if any
+            self._task.result()
+            raise RuntimeError("The writer was stopped.")
+
+    async def _wait(self, awaitable: Awaitable[Any]) -> None:
+        # waits for `awaitable`, unless the writer stops first, raising its error
+        self._check_running()
+        assert self._task is not None
+
+        waiter = asyncio.ensure_future(awaitable)
+        try:
+            await asyncio.wait(
+                {waiter, self._task},
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+
+        self._check_running()
+
+    async def put(self, performance: SearchStringPerformance) -> None:
+        """Queues the performance to be saved.
+
+        Raises the error of the writer if it stops while waiting for room on the queue.
+        """
+        await self._wait(self._queue.put(PerformanceRow.from_performance(performance)))
+
+    async def flush(self) -> None:
+        """Waits until every queued performance is saved."""
+        await self._wait(self._queue.join())
+
+    def _write(self, rows: list[PerformanceRow]) -> None:
+        with self.session_factory() as session:
+            write_performance_rows(rows, session)
+
+    async def _run(self) -> None:
+        stop = False
+
+        while not stop:
+            items = [await self._queue.get()]
+            while len(items) < self.max_batch_size and not self._queue.empty():
+                items.append(self._queue.get_nowait())
+
+            try:
+                rows = [item for item in items if isinstance(item, PerformanceRow)]
+                stop = len(rows) < len(items)
+
+                await asyncio.to_thread(self._write, rows)
+
+            finally:
+                for _ in items:
+                    self._queue.task_done()
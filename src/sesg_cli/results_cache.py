@@ -0,0 +1,47 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any
+
+from sesg_cli.evaluation_snapshot import cache_dir
+
+
+def get_cache_key(**values: Any) -> str:
+    """Hash of the values identifying a results file, such as the SLR, the options and the data version.
+
+    Examples:
+        >>> get_cache_key(slr="slr", metrics=["bsb_recall"]) == get_cache_key(metrics=["bsb_recall"], slr="slr")
+        True
+    """  # noqa: E501
+    data = json.dumps(values, sort_keys=True, default=str)
+
+    return hashlib.md5(data.encode("utf-8")).hexdigest()
+
+
+def _get_cache_path(cache_key: str, suffix: str) -> Path:
+    return cache_dir / "results" / f"{cache_key}{suffix}"
+
+
+def restore_from_cache(cache_key: str, path: Path) -> bool:
+    """Copies the cached file to `path`, returning whether it was cached."""
+    cache_path = _get_cache_path(cache_key, path.suffix)
+
+    if not cache_path.exists():
+        return False
+
+    shutil.copyfile(cache_path, path)
+
+    return True
+
+
+def save_to_cache(cache_key: str, path: Path) -> None:
+    cache_path = _get_cache_path(cache_key, path.suffix)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # copied to a temporary file first,
+    # so a concurrent run never reads a partial file
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    shutil.copyfile(path, tmp_path)
+    tmp_path.replace(cache_path)
@@ -0,0 +1,187 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from sesg_cli.database.models import ScopusAPIKey, SearchStringPerformance
+
+
+if TYPE_CHECKING:
+    import httpx
+    from sesg.scopus import ScopusClient
+
+
+# points the client to another Scopus-compatible API, such as `sesg scopus mock-server`
+scopus_api_url = os.environ.get("SESG_SCOPUS_API_URL")
+
+# Scopus limits a search to 5000 results, fetched in pages of 25 entries
+MAX_SCOPUS_RESULTS = 5000
+SCOPUS_PAGE_SIZE = 25
+
+
+class NotEnoughQuotaError(Exception):
+    """The available API keys do not have enough quota to complete the run."""
+
+    def __init__(self, required: int, available: int) -> None:
+        self.required = required
+        self.available = available
+
+        super().__init__(
+            f"Estimated {required} requests, but only {available} are available."
+        )
+
+
+def estimate_n_requests_per_string(session: Session) -> float:
+    """Estimates how many requests are needed to search a string.
+
+    Uses the number of pages fetched for the strings that were already searched.
+    If no string was searched yet, assumes a single page per string.
+    """
+    n_pages = func.greatest(
+        func.ceil(
+            func.least(SearchStringPerformance.n_scopus_results, MAX_SCOPUS_RESULTS)
+            / float(SCOPUS_PAGE_SIZE)
+        ),
+        1,
+    )
+
+    stmt = select(func.avg(n_pages)).where(
+        SearchStringPerformance.n_scopus_results >= 0
+    )
+
+    mean_n_pages = session.execute(stmt).scalar_one_or_none()
+
+    if mean_n_pages is None:
+        return 1
+
+    return float(mean_n_pages)
+
+
+def _parse_reset_header(value: str) -> datetime:
+    return datetime.fromtimestamp(int(value), tz=timezone.utc)
+
+
+def is_quota_exceeded(response: "httpx.Response") -> bool:
+    """Whether the response says the weekly quota of the key is exhausted.
+
+    Scopus also answers with 429 when a key exceeds its requests per second, which
+    does not mean its quota is exhausted.
+    """
+    if response.headers.get("X-RateLimit-Remaining") == "0":
+        return True
+
+    return response.headers.get("X-ELS-Status", "").startswith("QUOTA_EXCEEDED")
+
+
+@dataclass
+class ScopusAPIKeyScheduler:
+    """Keeps track of the quota of each API key, persisting it to the database.
+
+    Use [`create_client`][sesg_cli.scopus_api_key_scheduler.ScopusAPIKeyScheduler.create_client]
+    to get a `ScopusClient` that only uses keys with remaining quota, picking the
+    ones with the most remaining quota. Every response seen by the client updates
+    the key usage.
+    """  # noqa: E501
+
+    api_keys: list[ScopusAPIKey]
+    session: Session
+
+    @classmethod
+    def from_keys(
+        cls,
+        keys: list[str],
+        session: Session,
+    ) -> "ScopusAPIKeyScheduler":
+        return ScopusAPIKeyScheduler(
+            api_keys=ScopusAPIKey.get_or_create_many(keys, session),
+            session=session,
+        )
+
+    @property
+    def available_keys(self) -> list[ScopusAPIKey]:
+        keys = [k for k in self.api_keys if k.get_remaining_quota() > 0]
+
+        return sorted(keys, key=lambda k: k.get_remaining_quota(), reverse=True)
+
+    @property
+    def available_quota(self) -> int:
+        return sum(k.get_remaining_quota() for k in self.available_keys)
+
+    def check_quota(self, n_requests: int) -> None:
+        """Raises a `NotEnoughQuotaError` if `n_requests` exceeds the available quota."""  # noqa: E501
+        available = self.available_quota
+
+        if n_requests > available:
+            raise NotEnoughQuotaError(required=n_requests, available=available)
+
+    def select_keys(self, n_requests: int | None = None) -> list[ScopusAPIKey]:
+        """Keys with the most remaining quota whose quota covers `n_requests`.
+
+        The client cycles through its keys evenly, so the keys with little remaining
+        quota are left out, instead of being exhausted along with the others. If
+        `n_requests` is `None`, or exceeds the available quota, every available key
+        is selected.
+        """
+        keys = self.available_keys
+
+        if n_requests is None:
+            return keys
+
+        quota = 0
+        for i, key in enumerate(keys):
+            quota += key.get_remaining_quota()
+
+            if quota >= n_requests:
+                return keys[: i + 1]
+
+        return keys
+
+    def create_client(self, n_requests: int | None = None) -> "ScopusClient":
+        """Creates a client with the keys selected by `select_keys`."""
+        from sesg.scopus import ScopusClient
+
+        client = ScopusClient([k.key for k in self.select_keys(n_requests)])
+
+        for httpx_client in client.clients_list.items:
+            # appended, so the hooks already set on the client are kept
+            httpx_client.event_hooks["response"].append(self._on_response)
+
+            if scopus_api_url is not None:
+                httpx_client.base_url = scopus_api_url
+
+        return client
+
+    def _get_api_key(self, key: str) -> ScopusAPIKey | None:
+        for api_key in self.api_keys:
+            if api_key.key == key:
+                return api_key
+
+        return None
+
+    async def _on_response(self, response: "httpx.Response") -> None:
+        api_key = self._get_api_key(response.request.url.params.get("apiKey", ""))
+
+        if api_key is None:
+            return
+
+        api_key.n_requests += 1
+        api_key.last_used_at = datetime.now(timezone.utc)
+
+        if (limit := response.headers.get("X-RateLimit-Limit")) is not None:
+            api_key.quota_limit = int(limit)
+
+        if (remaining := response.headers.get("X-RateLimit-Remaining")) is not None:
+            api_key.quota_remaining = int(remaining)
+
+        if (reset := response.headers.get("X-RateLimit-Reset")) is not None:
+            api_key.quota_reset_at = _parse_reset_header(reset)
+
+        if response.status_code == 429 and is_quota_exceeded(response):
+            api_key.quota_remaining = 0
+
+    def save(self) -> None:
+        self.session.add_all(self.api_keys)
+        self.session.commit()
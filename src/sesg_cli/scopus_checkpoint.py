@@ -0,0 +1,214 @@
+import asyncio
+from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, TypeVar
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from sesg_cli.database.models import (
+    ScopusSearchCursor,
+    ScopusSearchPage,
+    SearchString,
+)
+from sesg_cli.performance_writer import write_in_thread
+from sesg_cli.scopus_api_key_scheduler import SCOPUS_PAGE_SIZE
+
+
+if TYPE_CHECKING:
+    from sesg.scopus import ScopusClient
+
+
+T = TypeVar("T")
+
+MAX_ATTEMPTS_ON_TRANSIENT_ERROR = 5
+BACKOFF_BASE_DELAY = 1.0
+MAX_CONCURRENT_PAGES = 10
+
+
+def _transient_errors() -> tuple[type[Exception], ...]:
+    from httpx import TransportError
+    from sesg.scopus.client import (
+        TooManyJSONDecodeErrors,
+        TooManyKeyErrors,
+        TooManyScopusInternalErrors,
+        TooManySSLErrors,
+    )
+
+    return (
+        TransportError,
+        TooManyJSONDecodeErrors,
+        TooManyKeyErrors,
+        TooManyScopusInternalErrors,
+        TooManySSLErrors,
+    )
+
+
+async def retry_with_backoff(
+    fn: Callable[..., Awaitable[T]],
+    *args,
+    max_attempts: int = MAX_ATTEMPTS_ON_TRANSIENT_ERROR,
+    base_delay: float = BACKOFF_BASE_DELAY,
+) -> T:
+    """Awaits `fn(*args)`, retrying on transient errors with exponential backoff.
+
+    Waits `base_delay * 2 ** attempt` seconds between attempts, and raises the last
+    error after `max_attempts` attempts.
+    """
+    transient_errors = _transient_errors()
+
+    for attempt in range(max_attempts):
+        try:
+            return await fn(*args)
+
+        except transient_errors:
+            if attempt == max_attempts - 1:
+                raise
+
+            await asyncio.sleep(base_delay * 2**attempt)
+
+    raise RuntimeError("max_attempts must be at least 1")
+
+
+@dataclass
+class CheckpointedSearch:
+    """Searches strings on Scopus saving every fetched page on the database.
+
+    If a search is interrupted, searching the same string again will only fetch the
+    pages that were not saved yet. At most `max_concurrent_pages` pages are fetched at
+    a time.
+
+    Cursors and pages are written on a worker thread, with sessions created by
+    `session_factory`, so the event loop keeps fetching pages while they are saved.
+    `session` is only used to read the saved ones.
+    """
+
+    client: "ScopusClient"
+    session: Session
+    session_factory: Callable[[], Session]
+    max_attempts: int = MAX_ATTEMPTS_ON_TRANSIENT_ERROR
+    base_delay: float = BACKOFF_BASE_DELAY
+    max_concurrent_pages: int = MAX_CONCURRENT_PAGES
+
+    async def _retry(self, fn: Callable[..., Awaitable[T]], *args) -> T:
+        return await retry_with_backoff(
+            fn,
+            *args,
+            max_attempts=self.max_attempts,
+            base_delay=self.base_delay,
+        )
+
+    @staticmethod
+    def _insert_page(
+        cursor_id: int,
+        page: ScopusSearchPage,
+        session: Session,
+    ) -> None:
+        # inserted from its values, so `page` is never attached to the writing session
+        session.execute(
+            insert(ScopusSearchPage),
+            [{"cursor_id": cursor_id, "page": page.page, "entries": page.entries}],
+        )
+
+    @staticmethod
+    def _insert_cursor(
+        cursor: ScopusSearchCursor,
+        first_page: ScopusSearchPage,
+        session: Session,
+    ) -> int:
+        session.add(cursor)
+        session.flush()
+
+        CheckpointedSearch._insert_page(cursor.id, first_page, session)
+
+        return cursor.id
+
+    async def _get_or_create_cursor(
+        self,
+        search_string: SearchString,
+    ) -> ScopusSearchCursor:
+        cursor = ScopusSearchCursor.get_one_or_none(search_string.id, self.session)
+
+        if cursor is not None:
+            return cursor
+
+        first_page, _ = await self._retry(
+            self.client.fetch_first_page,
+            search_string.string,
+        )
+
+        cursor_id = await write_in_thread(
+            self.session_factory,
+            partial(
+                self._insert_cursor,
+                ScopusSearchCursor(
+                    search_string_id=search_string.id,
+                    n_results=first_page.n_results,
+                    n_pages=first_page.n_pages,
+                ),
+                ScopusSearchPage.from_page(first_page),
+            ),
+        )
+
+        cursor = self.session.get(ScopusSearchCursor, cursor_id)
+        assert cursor is not None
+
+        return cursor
+
+    async def search(
+        self,
+        search_string: SearchString,
+    ) -> AsyncIterator[ScopusSearchPage]:
+        """Yields every page of the string, saved ones first.
+
+        Raises:
+            InvalidStringError: If Scopus considers the string invalid.
+            OutOfAPIKeysError: If all API keys are expired. The pages fetched so far are kept.
+        """  # noqa: E501
+        import aiometer
+        from sesg.scopus.client import (
+            MAX_REQUESTS_PER_SECOND_PER_API_KEY,
+            create_params_pagination,
+        )
+
+        cursor = await self._get_or_create_cursor(search_string)
+
+        saved_pages = ScopusSearchPage.get_page_numbers(cursor.id, self.session)
+
+        for page in ScopusSearchPage.stream_by_cursor(cursor.id, self.session):
+            yield page
+
+        # the params of the first page are not included,
+        # since it is always saved along with the cursor
+        params_list = [
+            params
+            for params in create_params_pagination(
+                search_string.string,
+                cursor.n_results,
+            )
+            if params["start"] // SCOPUS_PAGE_SIZE + 1 not in saved_pages
+        ]
+
+        if not params_list:
+            return
+
+        async with aiometer.amap(
+            partial(self._retry, self.client.fetch_and_parse),
+            params_list,
+            max_at_once=self.max_concurrent_pages,
+            max_per_second=len(self.client.clients_list)
+            * MAX_REQUESTS_PER_SECOND_PER_API_KEY,
+        ) as next_pages:
+            async for next_page in next_pages:
+                page = ScopusSearchPage.from_page(next_page)
+                await write_in_thread(
+                    self.session_factory,
+                    partial(self._insert_page, cursor.id, page),
+                )
+
+                # the page is not added to `session`, so it is not saved twice
+                page.cursor_id = cursor.id
+                set_committed_value(page, "cursor", cursor)
+
+                yield page
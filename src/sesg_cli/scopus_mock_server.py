@@ -0,0 +1,330 @@
+"""Local stand-in for the Scopus Search API.
+
+Serves Scopus-compatible responses from a synthetic or recorded corpus, so that
+pagination, retries and concurrency can be exercised without spending quota.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from random import Random
+from typing import Any, Protocol
+from urllib.parse import parse_qs, urlparse
+
+
+MAX_SCOPUS_RESULTS = 5000
+
+_WORDS = (
+    "software engineering systematic literature review mapping study machine "
+    "learning deep neural network model driven development testing requirements "
+    "architecture microservices cloud security privacy agile process quality "
+    "metrics maintenance evolution refactoring code smell defect prediction "
+    "empirical evaluation framework approach tool analysis automated search "
+    "string generation topic modeling natural language processing data mining"
+).split()
+
+
+@dataclass(frozen=True)
+class MockDocument:
+    scopus_id: str
+    title: str
+    year: int
+    cited_by_count: int
+
+    def to_entry(self) -> dict[str, Any]:
+        return {
+            "dc:identifier": f"SCOPUS_ID:{self.scopus_id}",
+            "dc:title": self.title,
+            "prism:coverDate": f"{self.year}-01-01",
+            "citedby-count": str(self.cited_by_count),
+        }
+
+
+class MockCorpus(Protocol):
+    def search(self, query: str) -> list[MockDocument]:
+        ...
+
+
+def _query_seed(query: str, seed: int) -> int:
+    digest = hashlib.md5(f"{seed}:{query}".encode("utf-8")).hexdigest()
+
+    return int(digest[:16], 16)
+
+
+def _year_boundaries(query: str) -> tuple[int, int]:
+    min_year, max_year = 1990, 2023
+
+    if (m := re.search(r"PUBYEAR\s*>\s*(\d{4})", query)) is not None:
+        min_year = int(m.group(1)) + 1
+
+    if (m := re.search(r"PUBYEAR\s*<\s*(\d{4})", query)) is not None:
+        max_year = int(m.group(1)) - 1
+
+    return min_year, max(min_year, max_year)
+
+
+@dataclass
+class SyntheticCorpus:
+    """Generates a deterministic result set for every query.
+
+    The number of results of a query and its documents are derived from a hash of the
+    query, so searching the same string twice returns the same documents.
+
+    Args:
+        max_results (int): Maximum number of results of a query.
+        seed (int): Seed used to generate the documents.
+        gs_titles (list[str]): Titles that may be included in the results of a query.
+        gs_hit_rate (float): Probability of including each of the `gs_titles` in the results of a query.
+    """  # noqa: E501
+
+    max_results: int = 2000
+    seed: int = 0
+    gs_titles: list[str] = field(default_factory=list)
+    gs_hit_rate: float = 0.3
+
+    def search(self, query: str) -> list[MockDocument]:
+        rng = Random(_query_seed(query, self.seed))
+        min_year, max_year = _year_boundaries(query)
+
+        n_results = rng.randint(0, self.max_results)
+        gs_titles = [t for t in self.gs_titles if rng.random() < self.gs_hit_rate]
+        titles = [
+            " ".join(rng.choices(_WORDS, k=rng.randint(4, 12)))
+            for _ in range(max(n_results - len(gs_titles), 0))
+        ]
+        titles.extend(gs_titles)
+        rng.shuffle(titles)
+
+        return [
+            MockDocument(
+                scopus_id=str(_query_seed(title, self.seed) % 10**11),
+                title=title,
+                year=rng.randint(min_year, max_year),
+                cited_by_count=rng.randint(0, 500),
+            )
+            for title in titles
+        ]
+
+
+@dataclass
+class RecordedCorpus:
+    """Serves recorded results, read from a JSON file mapping a query to its entries.
+
+    Each entry must have at least a `dc:title`, as returned by Scopus. Queries that
+    were not recorded have no results.
+    """
+
+    responses: dict[str, list[MockDocument]]
+
+    @classmethod
+    def from_json(cls, path: Path) -> "RecordedCorpus":
+        with open(path, "r", encoding="utf-8") as f:
+            data: dict[str, list[dict[str, Any]]] = json.load(f)
+
+        responses: dict[str, list[MockDocument]] = {}
+        for query, entries in data.items():
+            responses[query] = [
+                MockDocument(
+                    scopus_id=str(entry.get("dc:identifier", i)).removeprefix(
+                        "SCOPUS_ID:"
+                    ),
+                    title=entry["dc:title"],
+                    year=int(str(entry.get("prism:coverDate", "1970"))[:4]),
+                    cited_by_count=int(entry.get("citedby-count", 0)),
+                )
+                for i, entry in enumerate(entries)
+            ]
+
+        return RecordedCorpus(responses=responses)
+
+    def search(self, query: str) -> list[MockDocument]:
+        return self.responses.get(query, [])
+
+
+@dataclass
+class MockScopusSettings:
+    """Behavior of the mock server.
+
+    Args:
+        latency (float): Seconds to wait before answering each request.
+        page_size (int): Number of entries per page. The `sesg` client expects 25.
+        quota_per_key (int | None): Number of requests allowed per API key before answering with 429.
+        max_requests_per_second (float | None): Requests per second allowed per API key before answering with 429.
+        max_query_length (int | None): Queries longer than this are answered with 413.
+        error_rate (float): Probability of answering a request with 500.
+        seed (int): Seed used to decide which requests fail.
+    """  # noqa: E501
+
+    latency: float = 0.0
+    page_size: int = 25
+    quota_per_key: int | None = None
+    max_requests_per_second: float | None = None
+    max_query_length: int | None = None
+    error_rate: float = 0.0
+    seed: int = 0
+
+
+def _is_balanced(query: str) -> bool:
+    depth = 0
+
+    for char in query.replace('\\"', ""):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+
+        if depth < 0:
+            return False
+
+    return depth == 0 and query.count('"') % 2 == 0
+
+
+class MockScopusServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        corpus: MockCorpus,
+        settings: MockScopusSettings,
+    ) -> None:
+        super().__init__(address, _MockScopusRequestHandler)
+
+        self.corpus = corpus
+        self.settings = settings
+        self.quota_reset_at = datetime.now(timezone.utc) + timedelta(days=7)
+
+        self._lock = threading.Lock()
+        self._rng = Random(settings.seed)
+        self._n_requests: dict[str, int] = {}
+        self._last_requests: dict[str, list[float]] = {}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+
+        return f"http://{host}:{port}"
+
+    def _register_request(self, api_key: str) -> tuple[int | None, bool]:
+        """Returns the remaining quota of the key and whether the request was throttled."""  # noqa: E501
+        with self._lock:
+            n_requests = self._n_requests.get(api_key, 0) + 1
+            self._n_requests[api_key] = n_requests
+
+            throttled = False
+            if self.settings.max_requests_per_second is not None:
+                now = time.monotonic()
+                last = [t for t in self._last_requests.get(api_key, []) if now - t < 1]
+                last.append(now)
+                self._last_requests[api_key] = last
+
+                throttled = len(last) > self.settings.max_requests_per_second
+
+            if self.settings.quota_per_key is None:
+                return None, throttled
+
+            return self.settings.quota_per_key - n_requests, throttled
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.settings.error_rate
+
+    def handle_search(
+        self,
+        params: dict[str, str],
+    ) -> tuple[int, dict[str, str], dict[str, Any]]:
+        """Answers a search request, returning the status, headers and body."""
+        time.sleep(self.settings.latency)
+
+        remaining, throttled = self._register_request(params.get("apiKey", ""))
+
+        headers: dict[str, str] = {}
+        if remaining is not None:
+            headers = {
+                "X-RateLimit-Limit": str(self.settings.quota_per_key),
+                "X-RateLimit-Remaining": str(max(remaining, 0)),
+                "X-RateLimit-Reset": str(int(self.quota_reset_at.timestamp())),
+            }
+
+        # like Scopus, only an exhausted quota is reported on the `X-ELS-Status` header
+        if remaining is not None and remaining < 0:
+            headers["X-ELS-Status"] = "QUOTA_EXCEEDED - Quota Exceeded"
+            return 429, headers, _error_body("QUOTA_EXCEEDED", "Quota Exceeded")
+
+        if throttled:
+            return 429, headers, _error_body("TOO_MANY_REQUESTS", "Rate Limit Exceeded")
+
+        query = params.get("query", "")
+        if not query or not _is_balanced(query):
+            return 400, headers, _error_body("INVALID_INPUT", "Error translating query")
+
+        max_query_length = self.settings.max_query_length
+        if max_query_length is not None and len(query) > max_query_length:
+            return 413, headers, _error_body("INVALID_INPUT", "Query is too long")
+
+        if self._should_fail():
+            return 500, headers, _error_body("GENERAL_SYSTEM_ERROR", "Internal error")
+
+        documents = self.corpus.search(query)
+        n_results = len(documents)
+
+        start = int(params.get("start", 0))
+        page_size = self.settings.page_size
+        page = documents[start : min(start + page_size, MAX_SCOPUS_RESULTS)]
+
+        entries = [d.to_entry() for d in page] or [
+            {"@_fa": "true", "error": "Result set was empty"}
+        ]
+
+        body = {
+            "search-results": {
+                "opensearch:totalResults": str(n_results),
+                "opensearch:startIndex": str(start),
+                "opensearch:itemsPerPage": str(len(page)),
+                "opensearch:Query": {"@searchTerms": query},
+                "entry": entries,
+            }
+        }
+
+        return 200, headers, body
+
+
+def _error_body(status_code: str, status_text: str) -> dict[str, Any]:
+    return {
+        "service-error": {
+            "status": {
+                "statusCode": status_code,
+                "statusText": status_text,
+            }
+        }
+    }
+
+
+class _MockScopusRequestHandler(BaseHTTPRequestHandler):
+    server: MockScopusServer
+
+    def do_GET(self) -> None:
+        query_string = urlparse(self.path).query
+        params = {k: v[0] for k, v in parse_qs(query_string).items()}
+
+        status, headers, body = self.server.handle_search(params)
+        content = json.dumps(body).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # requests are not logged to keep the output readable under load
+        return
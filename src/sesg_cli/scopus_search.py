@@ -0,0 +1,184 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable
+
+import typer
+from rich import print
+from rich.progress import BarColumn, Progress, TaskProgressColumn, TextColumn
+from sqlalchemy.orm import Session
+
+from sesg_cli.config import Config
+from sesg_cli.database.models import (
+    Experiment,
+    SearchString,
+    SearchStringPerformance,
+)
+from sesg_cli.evaluation_snapshot import load_evaluation_snapshot
+from sesg_cli.incremental_evaluation import IncrementalEvaluation
+from sesg_cli.scopus_api_key_scheduler import (
+    NotEnoughQuotaError,
+    ScopusAPIKeyScheduler,
+    estimate_n_requests_per_string,
+)
+from sesg_cli.scopus_checkpoint import CheckpointedSearch
+from sesg_cli.snowballing_reachability import SnowballingReachability
+from sesg_cli.title_matching import TitleMatcher
+
+
+if TYPE_CHECKING:
+    from sesg.evaluation import EvaluationFactory
+    from sesg.scopus import ScopusClient
+
+
+def create_client(
+    config: Config,
+    n_strings: int,
+    ignore_quota: bool,
+    session: Session,
+) -> tuple[ScopusAPIKeyScheduler, "ScopusClient"]:
+    scheduler = ScopusAPIKeyScheduler.from_keys(config.scopus_api_keys, session)
+    n_requests = round(n_strings * estimate_n_requests_per_string(session))
+
+    try:
+        scheduler.check_quota(n_requests)
+    except NotEnoughQuotaError as e:
+        print(f"[red]Not enough quota to search the strings. {e}")
+
+        if not ignore_quota:
+            raise typer.Abort()
+
+    return scheduler, scheduler.create_client(n_requests)
+
+
+def create_progress() -> Progress:
+    return Progress(
+        TextColumn(
+            "[progress.description]{task.description}: {task.completed} of {task.total}"
+        ),
+        BarColumn(),
+        TaskProgressColumn(),
+    )
+
+
+@dataclass
+class EvaluationContext:
+    slr_id: int
+    evaluation_factory: "EvaluationFactory"
+    title_matcher: TitleMatcher | None
+    reachability: SnowballingReachability
+
+
+def create_evaluation_context(
+    experiment: Experiment,
+    session: Session,
+    session_factory: Callable[[], Session],
+    fast_title_matching: bool = False,
+) -> EvaluationContext:
+    """Loads what is needed to evaluate the strings of the experiment.
+
+    The titles are matched against the GS with the same rule of `sesg`, unless
+    `fast_title_matching` is set, when a `TitleMatcher` is used instead, saving its
+    matches with sessions created by `session_factory`.
+    """
+    from sesg.evaluation import EvaluationFactory
+
+    snapshot = load_evaluation_snapshot(experiment.slr_id, experiment.id, session)
+    evaluation_gs, evaluation_qgs = snapshot.to_evaluation_studies()
+
+    evaluation_factory = EvaluationFactory(
+        gs=evaluation_gs,
+        qgs=evaluation_qgs,
+    )
+
+    title_matcher = None
+    if fast_title_matching:
+        title_matcher = TitleMatcher(
+            gs=evaluation_gs,
+            slr_id=experiment.slr_id,
+            session=session,
+            session_factory=session_factory,
+        )
+
+    reachability = SnowballingReachability.from_db(experiment.slr_id, session)
+    if reachability is None:
+        reachability = SnowballingReachability.refresh(experiment.slr, session)
+
+    return EvaluationContext(
+        slr_id=experiment.slr_id,
+        evaluation_factory=evaluation_factory,
+        title_matcher=title_matcher,
+        reachability=reachability,
+    )
+
+
+async def search_and_evaluate(
+    search_string: SearchString,
+    context: EvaluationContext,
+    checkpointed_search: CheckpointedSearch,
+    progress: Progress,
+) -> SearchStringPerformance:
+    """Searches the string on Scopus, paginating through all of the results, and evaluates it."""  # noqa: E501
+    from sesg.scopus import InvalidStringError
+
+    progress_task = progress.add_task(
+        "Paginating",
+    )
+
+    incremental_evaluation = IncrementalEvaluation(
+        context.evaluation_factory,
+        title_matcher=context.title_matcher,
+        reachability=context.reachability,
+    )
+
+    try:
+        async for page in checkpointed_search.search(search_string):
+            progress.update(
+                progress_task,
+                total=page.cursor.n_pages,
+                advance=1,
+            )
+
+            incremental_evaluation.add_titles(page.titles)
+
+            if context.title_matcher is not None:
+                await context.title_matcher.save()
+
+        evaluation = incremental_evaluation.evaluate()
+
+        return SearchStringPerformance.from_studies_ids(
+            n_scopus_results=evaluation.n_scopus_results,
+            qgs_in_scopus_ids=[s.id for s in evaluation.qgs_in_scopus],
+            gs_in_scopus_ids=[s.id for s in evaluation.gs_in_scopus],
+            gs_in_bsb_ids=[s.id for s in evaluation.gs_in_bsb],
+            gs_in_sb_ids=[s.id for s in evaluation.gs_in_sb],
+            start_set_precision=evaluation.start_set_precision,
+            start_set_recall=evaluation.start_set_recall,
+            start_set_f1_score=evaluation.start_set_f1_score,
+            bsb_recall=evaluation.bsb_recall,
+            sb_recall=evaluation.sb_recall,
+            search_string_id=search_string.id,
+        )
+
+    except InvalidStringError:
+        print("The following string raised an InvalidStringError")
+        print(search_string.string)
+
+        return SearchStringPerformance(
+            n_scopus_results=-1,
+            qgs_in_scopus_ids=[],
+            gs_in_bsb_ids=[],
+            gs_in_sb_ids=[],
+            n_gs_in_scopus=0,
+            n_qgs_in_scopus=0,
+            gs_in_scopus_ids=[],
+            n_gs_in_bsb=0,
+            n_gs_in_sb=0,
+            start_set_precision=0,
+            start_set_recall=0,
+            start_set_f1_score=0,
+            bsb_recall=0,
+            sb_recall=0,
+            search_string_id=search_string.id,
+        )
+
+    finally:
+        progress.remove_task(progress_task)
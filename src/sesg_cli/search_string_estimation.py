@@ -0,0 +1,258 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from sesg_cli.boolean_query import (
+    FIELDS,
+    And,
+    AndNot,
+    Field,
+    Or,
+    PubYear,
+    Query,
+    Term,
+    parse_query,
+    tokenize_text,
+)
+from sesg_cli.database.models import (
+    SLR,
+    ScopusDocument,
+    SearchString,
+    SearchStringEstimate,
+)
+
+
+_ALL_FIELDS = FIELDS["ALL"]
+
+
+@dataclass
+class DocumentIndex:
+    """Positional inverted index over the title, abstract and keywords of documents.
+
+    Evaluates boolean queries (see `sesg_cli.boolean_query`), returning the IDs of the
+    matched documents. Phrases match documents containing their words in sequence.
+    """
+
+    # field -> word -> document ID -> positions of the word on the field
+    _postings: dict[str, dict[str, dict[int, list[int]]]] = field(
+        default_factory=lambda: {f: defaultdict(dict) for f in _ALL_FIELDS},
+        init=False,
+    )
+    _years: list[int | None] = field(default_factory=list, init=False)
+
+    @property
+    def n_documents(self) -> int:
+        return len(self._years)
+
+    def add_document(
+        self,
+        title: str,
+        abstract: str = "",
+        keywords: str = "",
+        year: int | None = None,
+    ) -> int:
+        """Indexes a document, returning its ID."""
+        document_id = len(self._years)
+        self._years.append(year)
+
+        for field_name, text in (
+            ("title", title),
+            ("abstract", abstract),
+            ("keywords", keywords),
+        ):
+            postings = self._postings[field_name]
+
+            for position, word in enumerate(tokenize_text(text)):
+                postings[word].setdefault(document_id, []).append(position)
+
+        return document_id
+
+    def _match_term(self, term: Term, fields: frozenset[str]) -> set[int]:
+        words = term.words
+        if not words:
+            return set()
+
+        matched: set[int] = set()
+        for field_name in fields:
+            postings = self._postings[field_name]
+
+            words_postings = [postings.get(word, {}) for word in words]
+            candidates = set(min(words_postings, key=len))
+            for word_postings in words_postings:
+                candidates.intersection_update(word_postings)
+
+            if len(words) == 1:
+                matched.update(candidates)
+                continue
+
+            for document_id in candidates:
+                positions = [set(p[document_id]) for p in words_postings]
+
+                if any(
+                    all(start + i in positions[i] for i in range(1, len(words)))
+                    for start in positions[0]
+                ):
+                    matched.add(document_id)
+
+        return matched
+
+    def _filter_years(self, documents: set[int], pub_years: list[PubYear]) -> set[int]:
+        return {
+            document_id
+            for document_id in documents
+            if all(p.matches(self._years[document_id]) for p in pub_years)
+        }
+
+    def _evaluate_or(self, query: Or, fields: frozenset[str]) -> set[int]:
+        matched: set[int] = set()
+        for child in query.children:
+            matched.update(self._evaluate(child, fields))
+
+        return matched
+
+    def _evaluate_and(self, query: And, fields: frozenset[str]) -> set[int]:
+        pub_years = [c for c in query.children if isinstance(c, PubYear)]
+        children = [c for c in query.children if not isinstance(c, PubYear)]
+
+        if not children:
+            return self._filter_years(set(range(self.n_documents)), pub_years)
+
+        matched = self._evaluate(children[0], fields)
+        for child in children[1:]:
+            if not matched:
+                break
+
+            matched &= self._evaluate(child, fields)
+
+        return self._filter_years(matched, pub_years)
+
+    def _evaluate(self, query: Query, fields: frozenset[str]) -> set[int]:
+        if isinstance(query, Term):
+            return self._match_term(query, fields)
+
+        if isinstance(query, Field):
+            return self._evaluate(query.child, query.fields)
+
+        if isinstance(query, PubYear):
+            return self._filter_years(set(range(self.n_documents)), [query])
+
+        if isinstance(query, Or):
+            return self._evaluate_or(query, fields)
+
+        if isinstance(query, AndNot):
+            return self._evaluate(query.include, fields) - self._evaluate(
+                query.exclude, fields
+            )
+
+        if isinstance(query, And):
+            return self._evaluate_and(query, fields)
+
+        raise TypeError(f"Unknown query node {query!r}")
+
+    def search(self, query: Query | str) -> set[int]:
+        """Returns the IDs of the documents matched by the query.
+
+        Examples:
+            >>> index = DocumentIndex()
+            >>> index.add_document("Detecting code smells", year=2010)
+            0
+            >>> index.add_document("Smells of the code", year=2020)
+            1
+            >>> sorted(index.search('TITLE-ABS-KEY("code smell") AND PUBYEAR > 2005'))
+            [0]
+            >>> sorted(index.search('TITLE("code" AND "smell") AND PUBYEAR < 2030'))
+            [0, 1]
+        """
+        if isinstance(query, str):
+            query = parse_query(query)
+
+        return self._evaluate(query, _ALL_FIELDS)
+
+
+def _parse_year(cover_date: str | None) -> int | None:
+    if cover_date is None or not cover_date[:4].isdigit():
+        return None
+
+    return int(cover_date[:4])
+
+
+def _stream_harvested_documents(
+    slr_id: int,
+    session: Session,
+) -> Iterator[ScopusDocument]:
+    stmt = (
+        select(ScopusDocument)
+        .where(ScopusDocument.slr_id == slr_id)
+        .execution_options(yield_per=1000)
+    )
+
+    yield from session.execute(stmt).scalars()
+
+
+@dataclass
+class SearchStringEstimator:
+    """Estimates the performance of search strings without searching them on Scopus.
+
+    Strings are evaluated against an index with the documents already fetched from
+    Scopus by strings of the SLR (only their titles and years are saved), streamed from
+    the database, and the GS of the SLR (with their abstracts and keywords). The
+    estimated recall is the fraction of the GS matched by the string, and the estimated
+    number of results is the number of fetched documents matched, which is a lower
+    bound of the number of results on Scopus.
+    """
+
+    slr_id: int
+    index: DocumentIndex
+    harvested_ids: set[int]
+    gs_ids: dict[int, int]
+
+    @classmethod
+    def build(cls, slr: SLR, session: Session) -> "SearchStringEstimator":
+        index = DocumentIndex()
+        harvested_ids: set[int] = set()
+
+        for document in _stream_harvested_documents(slr.id, session):
+            harvested_ids.add(
+                index.add_document(
+                    title=document.title or "",
+                    year=_parse_year(document.cover_date),
+                )
+            )
+
+        gs_ids: dict[int, int] = {}
+        for study in slr.gs:
+            document_id = index.add_document(
+                title=study.title,
+                abstract=study.abstract,
+                keywords=study.keywords,
+            )
+            gs_ids[document_id] = study.id
+
+        return SearchStringEstimator(
+            slr_id=slr.id,
+            index=index,
+            harvested_ids=harvested_ids,
+            gs_ids=gs_ids,
+        )
+
+    def estimate(self, search_string: SearchString) -> SearchStringEstimate:
+        """Estimates the performance of the string.
+
+        Raises:
+            QuerySyntaxError: If the string could not be parsed.
+        """
+        matched = self.index.search(search_string.string)
+
+        n_gs_matched = sum(1 for document_id in matched if document_id in self.gs_ids)
+
+        return SearchStringEstimate(
+            search_string_id=search_string.id,
+            slr_id=self.slr_id,
+            n_estimated_results=len(matched & self.harvested_ids),
+            n_gs_matched=n_gs_matched,
+            estimated_recall=n_gs_matched / len(self.gs_ids) if self.gs_ids else 0,
+            n_indexed_documents=self.index.n_documents,
+        )
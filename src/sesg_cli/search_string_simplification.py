@@ -0,0 +1,199 @@
+"""Removes redundant terms and groups from search strings, without changing their results.
+
+A query is dropped from an `OR` when another operand already matches every document it
+matches (e.g. `"code" OR ("code" AND "smell")` becomes `"code"`), and from an `AND` when
+it matches every document matched by another operand (e.g. `"code" AND ("code" OR "smell")`
+becomes `"code"`). Duplicated terms and groups are removed the same way, and nested
+groups with the same operator are flattened.
+
+Terms are only equivalent when their lowercased words are exactly the same, so no term
+is ever assumed to match the documents of another one. Scopus loosely matches plurals
+and word variants, so `"smell"` and `"code smells"` may find documents the other does
+not.
+"""  # noqa: E501
+
+from dataclasses import dataclass
+
+from sesg_cli.boolean_query import (
+    And,
+    AndNot,
+    Field,
+    Or,
+    PubYear,
+    Query,
+    Term,
+    parse_query,
+)
+
+
+def _key(query: Query) -> tuple:
+    if isinstance(query, Term):
+        return ("term", tuple(query.text.lower().split()))
+
+    if isinstance(query, And):
+        return ("and", frozenset(_key(c) for c in query.children))
+
+    if isinstance(query, Or):
+        return ("or", frozenset(_key(c) for c in query.children))
+
+    if isinstance(query, AndNot):
+        return ("and_not", _key(query.include), _key(query.exclude))
+
+    if isinstance(query, Field):
+        return ("field", query.name, _key(query.child))
+
+    return ("pubyear", query.operator, query.year)
+
+
+def implies(a: Query, b: Query) -> bool:
+    """Whether every document matched by `a` is also matched by `b`.
+
+    Only checks structural implications, so a `False` does not mean that `a` has
+    documents not matched by `b`.
+
+    Examples:
+        >>> implies(Term("Code  Smell"), Term("code smell"))
+        True
+        >>> implies(Term("smell"), Or((Term("code"), Term("smell"))))
+        True
+        >>> implies(Term("code smells"), Term("smell"))
+        False
+    """
+    if _key(a) == _key(b):
+        return True
+
+    if isinstance(a, Or):
+        return all(implies(c, b) for c in a.children)
+
+    if isinstance(b, And):
+        return all(implies(a, c) for c in b.children)
+
+    if isinstance(a, And) and any(implies(c, b) for c in a.children):
+        return True
+
+    if isinstance(b, Or) and any(implies(a, c) for c in b.children):
+        return True
+
+    if isinstance(a, AndNot):
+        return implies(a.include, b)
+
+    if isinstance(a, Field) and isinstance(b, Field):
+        return a.name == b.name and implies(a.child, b.child)
+
+    return False
+
+
+def _flatten(
+    children: tuple[Query, ...], operator: type[And] | type[Or]
+) -> list[Query]:
+    flattened: list[Query] = []
+
+    for child in children:
+        if isinstance(child, operator):
+            flattened.extend(child.children)
+        else:
+            flattened.append(child)
+
+    return flattened
+
+
+def _remove_redundant(children: list[Query], keep_broader: bool) -> list[Query]:
+    # on an OR, the narrower operand is redundant, and on an AND, the broader one is.
+    # of two equivalent operands, the first one is kept
+    kept: list[Query] = []
+
+    for i, child in enumerate(children):
+        redundant = False
+
+        for j, other in enumerate(children):
+            if i == j:
+                continue
+
+            if keep_broader:
+                narrower, broader = child, other
+            else:
+                narrower, broader = other, child
+
+            if implies(narrower, broader) and (j < i or not implies(broader, narrower)):
+                redundant = True
+                break
+
+        if not redundant:
+            kept.append(child)
+
+    return kept
+
+
+def simplify_query(query: Query) -> Query:
+    """Simplifies the query, keeping the same matched documents.
+
+    Examples:
+        >>> simplify_query(parse_query('("code smell" OR "smells") AND ("test" OR "Test")')).to_string()
+        '("code smell" OR "smells") AND "test"'
+        >>> simplify_query(parse_query('"code" OR ("code" AND "smell")')).to_string()
+        '"code"'
+    """  # noqa: E501
+    if isinstance(query, (Term, PubYear)):
+        return query
+
+    if isinstance(query, Field):
+        return Field(query.name, simplify_query(query.child))
+
+    if isinstance(query, AndNot):
+        return AndNot(simplify_query(query.include), simplify_query(query.exclude))
+
+    operator = type(query)
+    children = _flatten(tuple(simplify_query(c) for c in query.children), operator)
+    children = _remove_redundant(children, keep_broader=operator is Or)
+
+    if len(children) == 1:
+        return children[0]
+
+    return operator(tuple(children))
+
+
+def simplify_search_string(string: str) -> str:
+    """Simplifies a search string, returning it formatted the same way `sesg` does.
+
+    If nothing is simplified, the string is returned as given, so it still matches the
+    strings saved before.
+
+    Raises:
+        QuerySyntaxError: If the string could not be parsed.
+
+    Examples:
+        >>> simplify_search_string('TITLE-ABS-KEY(("code" OR "code") AND ("test")) AND PUBYEAR > 2000')
+        'TITLE-ABS-KEY("code" AND "test") AND PUBYEAR > 2000'
+        >>> simplify_search_string('TITLE-ABS-KEY(("code" OR "smell") AND ("test"))')
+        'TITLE-ABS-KEY(("code" OR "smell") AND ("test"))'
+    """  # noqa: E501
+    query = parse_query(string)
+    simplified_query = simplify_query(query)
+
+    if simplified_query == query:
+        return string
+
+    return simplified_query.to_string()
+
+
+@dataclass
+class SimplificationStats:
+    """Accumulates how much the search strings were shortened."""
+
+    n_strings: int = 0
+    n_simplified: int = 0
+    n_chars_before: int = 0
+    n_chars_after: int = 0
+
+    @property
+    def reduction(self) -> float:
+        if self.n_chars_before == 0:
+            return 0
+
+        return 1 - self.n_chars_after / self.n_chars_before
+
+    def add(self, before: str, after: str) -> None:
+        self.n_strings += 1
+        self.n_simplified += before != after
+        self.n_chars_before += len(before)
+        self.n_chars_after += len(after)
@@ -0,0 +1,200 @@
+from dataclasses import dataclass
+from typing import Iterable
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from sesg_cli.database.models import SLR, ReachabilityFingerprint, StudyReachability
+
+
+def get_fingerprint(slr_id: int, session: Session) -> str:
+    """Hash of the GS and citations of the SLR, computed on the database."""
+    stmt = text(
+        """
+        SELECT md5(concat(
+            (
+                SELECT string_agg(s.id::text, '|' ORDER BY s.id)
+                FROM study s
+                WHERE s.slr_id = :slr_id
+            ),
+            '#',
+            (
+                SELECT string_agg(
+                    c.study_id || ':' || c.reference_id,
+                    '|' ORDER BY c.study_id, c.reference_id
+                )
+                FROM studies_citations c
+                JOIN study s ON s.id = c.study_id
+                WHERE s.slr_id = :slr_id
+            )
+        ))
+        """
+    )
+
+    return session.execute(stmt, {"slr_id": slr_id}).scalar_one()
+
+
+@dataclass
+class SnowballingReachability:
+    """Studies reachable from each GS study through snowballing, stored as bitsets.
+
+    Each study is assigned a bit, and the studies reachable from a study are stored as
+    an `int` with their bits set. The studies found by snowballing from a start set are
+    the union of the bitsets of the studies of the start set, which gives the same
+    results of `EvaluationFactory.get_gs_in_bsb` and `EvaluationFactory.get_gs_in_sb`
+    without walking the citation graph.
+
+    Args:
+        studies_ids (list[int]): ID of the study assigned to each bit.
+        bsb (dict[int, int]): Maps a study ID to the bitset of the studies found by backward snowballing.
+        sb (dict[int, int]): Maps a study ID to the bitset of the studies found by backward or forward snowballing.
+    """  # noqa: E501
+
+    studies_ids: list[int]
+    bsb: dict[int, int]
+    sb: dict[int, int]
+
+    @classmethod
+    def from_adjacency_list(
+        cls,
+        adjacency_list: dict[int, list[int]],
+    ) -> "SnowballingReachability":
+        """Computes the reachability from an adjacency list mapping a study to its references.
+
+        Examples:
+            >>> r = SnowballingReachability.from_adjacency_list({1: [2], 2: [3], 3: [], 4: [3]})
+            >>> r.get_gs_in_bsb([2])
+            [2, 3]
+            >>> r.get_gs_in_sb([2])
+            [1, 2, 3, 4]
+        """  # noqa: E501
+        studies_ids = sorted(
+            set(adjacency_list) | {r for refs in adjacency_list.values() for r in refs}
+        )
+        positions = {study_id: i for i, study_id in enumerate(studies_ids)}
+
+        # backward snowballing: transitive closure of the references,
+        # iterated until no bitset changes, since the graph may have cycles
+        bsb = {study_id: 1 << positions[study_id] for study_id in studies_ids}
+        changed = True
+        while changed:
+            changed = False
+
+            for study_id, references in adjacency_list.items():
+                reachable = bsb[study_id]
+                for reference_id in references:
+                    reachable |= bsb[reference_id]
+
+                if reachable != bsb[study_id]:
+                    bsb[study_id] = reachable
+                    changed = True
+
+        # backward or forward snowballing: connected components of the undirected graph
+        parents = {study_id: study_id for study_id in studies_ids}
+
+        def find(study_id: int) -> int:
+            while parents[study_id] != study_id:
+                parents[study_id] = parents[parents[study_id]]
+                study_id = parents[study_id]
+
+            return study_id
+
+        for study_id, references in adjacency_list.items():
+            for reference_id in references:
+                parents[find(study_id)] = find(reference_id)
+
+        components: dict[int, int] = {}
+        for study_id in studies_ids:
+            root = find(study_id)
+            components[root] = components.get(root, 0) | 1 << positions[study_id]
+
+        sb = {study_id: components[find(study_id)] for study_id in studies_ids}
+
+        return SnowballingReachability(studies_ids=studies_ids, bsb=bsb, sb=sb)
+
+    @classmethod
+    def from_db(
+        cls,
+        slr_id: int,
+        session: Session,
+    ) -> "SnowballingReachability | None":
+        """Loads the reachability of the SLR.
+
+        Returns `None` if it was not computed, or if the GS or the citations of the SLR
+        changed since it was.
+        """
+        fingerprint = ReachabilityFingerprint.get_one_or_none(slr_id, session)
+        if fingerprint != get_fingerprint(slr_id, session):
+            return None
+
+        rows = StudyReachability.get_by_slr(slr_id, session)
+
+        if not rows:
+            return None
+
+        studies_ids = sorted({row.study_id for row in rows})
+        positions = {study_id: i for i, study_id in enumerate(studies_ids)}
+
+        def to_bitset(ids: Iterable[int]) -> int:
+            bitset = 0
+            for study_id in ids:
+                bitset |= 1 << positions[study_id]
+
+            return bitset
+
+        return SnowballingReachability(
+            studies_ids=studies_ids,
+            bsb={row.study_id: to_bitset(row.bsb_ids) for row in rows},
+            sb={row.study_id: to_bitset(row.sb_ids) for row in rows},
+        )
+
+    @classmethod
+    def refresh(
+        cls,
+        slr: SLR,
+        session: Session,
+    ) -> "SnowballingReachability":
+        """Computes the reachability of the SLR from its citation graph and saves it."""
+        reachability = cls.from_adjacency_list(slr.adjacency_list())
+        reachability.save(slr.id, get_fingerprint(slr.id, session), session)
+
+        return reachability
+
+    def _to_ids(self, bitset: int) -> list[int]:
+        ids: list[int] = []
+
+        while bitset:
+            lowest_bit = bitset & -bitset
+            ids.append(self.studies_ids[lowest_bit.bit_length() - 1])
+            bitset ^= lowest_bit
+
+        return ids
+
+    def _union(self, bitsets: dict[int, int], start_set: Iterable[int]) -> int:
+        bitset = 0
+        for study_id in start_set:
+            bitset |= bitsets.get(study_id, 0)
+
+        return bitset
+
+    def get_gs_in_bsb(self, start_set: Iterable[int]) -> list[int]:
+        """IDs of the studies found by backward snowballing on the start set."""
+        return self._to_ids(self._union(self.bsb, start_set))
+
+    def get_gs_in_sb(self, start_set: Iterable[int]) -> list[int]:
+        """IDs of the studies found by backward or forward snowballing on the start set."""  # noqa: E501
+        return self._to_ids(self._union(self.sb, start_set))
+
+    def save(self, slr_id: int, fingerprint: str, session: Session) -> None:
+        StudyReachability.replace_for_slr(
+            slr_id,
+            {
+                study_id: (
+                    self._to_ids(self.bsb[study_id]),
+                    self._to_ids(self.sb[study_id]),
+                )
+                for study_id in self.studies_ids
+            },
+            fingerprint,
+            session,
+        )
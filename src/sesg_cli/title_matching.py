@@ -0,0 +1,195 @@
+import hashlib
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from functools import partial
+from typing import TYPE_CHECKING, Callable
+
+from sqlalchemy.orm import Session
+
+from sesg_cli.database.models import TitleMatch
+from sesg_cli.performance_writer import write_in_thread
+
+
+if TYPE_CHECKING:
+    from sesg.evaluation import Study
+
+
+# same threshold used by `sesg.evaluation.evaluation_factory.similarity_score`
+MAX_LEVENSHTEIN_DISTANCE = 10
+
+NGRAM_SIZE = 3
+
+# number of memoized titles kept in memory before the in-memory memo is cleared
+MAX_IN_MEMORY_MEMO_SIZE = 1_000_000
+
+
+def process_title(title: str) -> str:
+    """Same preprocessing of `sesg.evaluation.evaluation_factory.process_title`.
+
+    Examples:
+        >>> process_title(" A string Here.  \\n")
+        'a string here.'
+    """
+    return title.strip().lower()
+
+
+def hash_title(processed_title: str) -> int:
+    """Hashes a processed title to a signed 64 bits integer.
+
+    Examples:
+        >>> hash_title("a title") == hash_title("a title")
+        True
+    """
+    digest = hashlib.blake2b(processed_title.encode("utf-8"), digest_size=8).digest()
+
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def ngrams(string: str, n: int = NGRAM_SIZE) -> Counter[str]:
+    """Character n-grams of a string, along with how many times each one occurs.
+
+    Examples:
+        >>> sorted(ngrams("abcab").items())
+        [('abc', 1), ('bca', 1), ('cab', 1)]
+        >>> ngrams("aaaa")
+        Counter({'aaa': 2})
+    """
+    return Counter(string[i : i + n] for i in range(len(string) - n + 1))
+
+
+@dataclass
+class TitleMatcher:
+    """Matches Scopus titles against the GS of a SLR.
+
+    A title matches its closest GS study, if the Levenshtein distance between their
+    processed titles is less than `MAX_LEVENSHTEIN_DISTANCE`. The distance is only
+    computed for candidates selected by an exact-title hash index and an n-gram
+    blocking index (using the q-gram lemma, so no match is missed).
+
+    This is not the rule of `sesg`, which checks the distance of each GS study to its
+    TF-IDF nearest title, so the performances found with each rule are not comparable.
+    It is only used when asked for, with `--fast-title-matching`.
+
+    Every title seen is memoized on the `title_match` table, so titles that reappear
+    on the results of other strings of the SLR are not matched again. New matches are
+    kept in memory until `save` is awaited, which writes them on a worker thread.
+
+    Args:
+        gs (list[Study]): GS of the SLR.
+        slr_id (int): ID of the SLR, used to scope the persistent memo.
+        session (Session): A db session, used to read the memo.
+        session_factory (Callable[[], Session]): Creates the sessions used to save the new matches.
+    """  # noqa: E501
+
+    gs: list["Study"]
+    slr_id: int
+    session: Session
+    session_factory: Callable[[], Session]
+
+    _exact_index: dict[str, int] = field(default_factory=dict, init=False)
+    _ngram_index: dict[str, list[tuple[int, int]]] = field(
+        default_factory=dict,
+        init=False,
+    )
+    _gs_titles: list[str] = field(default_factory=list, init=False)
+    _memo: dict[int, int | None] = field(default_factory=dict, init=False)
+    _unsaved: dict[int, int | None] = field(default_factory=dict, init=False)
+
+    def __post_init__(self):
+        ngram_index: dict[str, list[tuple[int, int]]] = defaultdict(list)
+
+        for i, study in enumerate(self.gs):
+            title = process_title(study.title)
+
+            self._gs_titles.append(title)
+            self._exact_index.setdefault(title, study.id)
+
+            for ngram, count in ngrams(title).items():
+                ngram_index[ngram].append((i, count))
+
+        self._ngram_index = dict(ngram_index)
+
+    def _get_candidates(self, title: str) -> list[int]:
+        title_ngrams = ngrams(title)
+
+        shared: dict[int, int] = defaultdict(int)
+        for ngram, count in title_ngrams.items():
+            for i, gs_count in self._ngram_index.get(ngram, []):
+                shared[i] += min(count, gs_count)
+
+        candidates: list[int] = []
+        for i, gs_title in enumerate(self._gs_titles):
+            if abs(len(gs_title) - len(title)) >= MAX_LEVENSHTEIN_DISTANCE:
+                continue
+
+            # q-gram lemma: strings within distance k share at least
+            # max(|a|, |b|) - q + 1 - k * q n-grams
+            min_shared = (
+                max(len(gs_title), len(title))
+                - NGRAM_SIZE
+                + 1
+                - (MAX_LEVENSHTEIN_DISTANCE - 1) * NGRAM_SIZE
+            )
+
+            if shared.get(i, 0) >= min_shared:
+                candidates.append(i)
+
+        return candidates
+
+    def _match(self, title: str) -> int | None:
+        from rapidfuzz.distance import Levenshtein
+
+        if (study_id := self._exact_index.get(title)) is not None:
+            return study_id
+
+        best: tuple[int, int] | None = None
+        for i in self._get_candidates(title):
+            distance = Levenshtein.distance(
+                title,
+                self._gs_titles[i],
+                score_cutoff=MAX_LEVENSHTEIN_DISTANCE,
+            )
+
+            if distance >= MAX_LEVENSHTEIN_DISTANCE:
+                continue
+
+            if best is None or distance < best[0]:
+                best = (distance, self.gs[i].id)
+
+        return best[1] if best is not None else None
+
+    def match_titles(self, titles: list[str]) -> set[int]:
+        """Returns the IDs of the GS studies matched by the given titles."""
+        processed_titles = {hash_title(t): t for t in map(process_title, titles)}
+
+        matches = {h: self._memo[h] for h in processed_titles if h in self._memo}
+
+        unseen = [h for h in processed_titles if h not in matches]
+        if unseen:
+            matches.update(TitleMatch.get_matches(self.slr_id, unseen, self.session))
+
+        new_matches = {
+            h: self._match(title)
+            for h, title in processed_titles.items()
+            if h not in matches
+        }
+        self._unsaved.update(new_matches)
+
+        matches.update(new_matches)
+
+        if len(self._memo) + len(matches) > MAX_IN_MEMORY_MEMO_SIZE:
+            self._memo.clear()
+
+        self._memo.update(matches)
+
+        return {study_id for study_id in matches.values() if study_id is not None}
+
+    async def save(self) -> None:
+        """Saves the matches found since the last call."""
+        matches, self._unsaved = self._unsaved, {}
+
+        if matches:
+            await write_in_thread(
+                self.session_factory,
+                partial(TitleMatch.save_matches, self.slr_id, matches),
+            )